@@ -1,7 +1,13 @@
+import sys
 from airflow import DAG
 from airflow.operators.bash import BashOperator
 from datetime import datetime
 
+# o grafo de etapas vem do run_pipeline; os módulos de cada etapa só são
+# importados quando ela roda, então ler o grafo aqui é barato
+sys.path.insert(0, "/opt/project")
+from run_pipeline import ETAPAS
+
 with DAG(
     dag_id="mobilidade_bh_pipeline",
     start_date=datetime(2026, 1, 2),
@@ -10,10 +16,15 @@ with DAG(
     tags=["case", "mobilidade"],
 ) as dag:
 
-    run_pipeline = BashOperator(
-        task_id="run_pipeline",
-        bash_command="cd /opt/project && python run_pipeline.py",
-    )
-
+    # uma task por etapa: uma falha nos fatos é repetida sem baixar a bronze de novo
+    tasks = {
+        etapa: BashOperator(
+            task_id=etapa,
+            bash_command=f"cd /opt/project && python run_pipeline.py --etapas {etapa}",
+        )
+        for etapa in ETAPAS
+    }
 
-    run_pipeline
+    for etapa, definicao in ETAPAS.items():
+        for dependencia in definicao["depende"]:
+            tasks[dependencia] >> tasks[etapa]
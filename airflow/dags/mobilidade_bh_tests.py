@@ -10,9 +10,15 @@ with DAG(
     tags=["case", "mobilidade","tests"],
 ) as dag:
 
+    # regras de qualidade só nos arquivos da gold novos desde o último relatório
+    verificar_qualidade = BashOperator(
+        task_id="verificar_qualidade",
+        bash_command="cd /opt/project && python -m src.quality.engine --novos",
+    )
+
     run_tests = BashOperator(
         task_id="run_tests",
-        bash_command="cd /opt/project && pytest -q",
+        bash_command="cd /opt/project && pytest -q --ignore=tests/test_data_quality.py",
     )
 
-    run_tests
+    verificar_qualidade >> run_tests
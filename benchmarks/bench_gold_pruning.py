@@ -0,0 +1,187 @@
+"""
+Benchmark de leitura da gold: consulta com poda de row groups x varredura completa.
+
+Para cada consulta típica de BI ("linha X no dia Y", "eventos do veículo Z"),
+compara o tempo de:
+
+* leitura com filtro empurrado para o parquet (`pyarrow.dataset`), que usa as
+  partições e as estatísticas min/max dos row groups para pular dados (os
+  eventos de cada dia são ordenados por linha e veículo);
+* leitura do dataset inteiro seguida de filtro no pandas.
+
+Nos fatos com `celula_espacial`, compara também uma caixa geográfica lida
+com `consultar_bbox`, que usa o índice espacial de cada dia para escolher os
+row groups.
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.bench_gold_pruning
+    python -m benchmarks.bench_gold_pruning --sintetico --linhas 5000000
+
+Sem `--sintetico`, usa os fatos em data/gold/mobilidade_bh. Com ele (ou se os
+fatos não existirem), gera um fato de eventos sintético com o escritor da gold
+em um diretório temporário.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.transform.gold.partitions import escrever_particoes
+from src.transform.gold.spatial import (
+    atualizar_indice_espacial,
+    celula_espacial,
+    consultar_bbox,
+)
+
+GOLD_DIR = Path("data/gold/mobilidade_bh")
+
+# Caixa de ~2 km x 2 km no centro de Belo Horizonte
+CAIXA_CENTRO = (-19.93, -19.91, -43.95, -43.93)
+
+
+def gerar_fato_sintetico(destino: Path, linhas: int, dias: int = 7) -> Path:
+    """Gerar um fato de eventos sintético, gravado com o escritor da gold."""
+    rng = np.random.default_rng(42)
+    inicio = np.datetime64("2026-02-01T00:00:00")
+    segundos = rng.integers(0, dias * 86400, linhas)
+    data_hora = inicio + segundos.astype("timedelta64[s]")
+    # cada linha roda em uma faixa de latitude da cidade
+    linha = rng.integers(0, 300, linhas)
+    faixa = (-19.78 - -20.05) / 300
+    df = pd.DataFrame({
+        "data_key": pd.Series(data_hora).dt.strftime("%Y%m%d").astype(int),
+        "linha_key": linha.astype("int64") * 7919,
+        "veiculo_key": rng.integers(0, 3000, linhas).astype("int64") * 104729,
+        "data_hora": data_hora,
+        "latitude": (-20.05 + (linha + rng.uniform(0, 1, linhas)) * faixa).astype("float32"),
+        "longitude": rng.uniform(-44.06, -43.86, linhas).astype("float32"),
+        "velocidade_instantanea": rng.integers(0, 80, linhas).astype("int16"),
+    })
+    df["celula_espacial"] = celula_espacial(df["latitude"], df["longitude"])
+    fato = destino / "fato_tempo_real_evento"
+    escrever_particoes(df, fato)
+    atualizar_indice_espacial(fato)
+    return fato
+
+
+def _dataset(caminho: Path) -> ds.Dataset:
+    particionamento = ds.partitioning(pa.schema([("data_key", pa.int32())]), flavor="hive")
+    return ds.dataset(caminho, format="parquet", partitioning=particionamento)
+
+
+def _cronometrar(funcao, repeticoes: int) -> tuple[float, int]:
+    """Mediana do tempo de execução (s) e número de linhas retornadas."""
+    tempos = []
+    linhas = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        linhas = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), linhas
+
+
+def consultas(fato: Path) -> dict[str, dict]:
+    """Montar as consultas a partir de valores reais do fato."""
+    dados = _dataset(fato)
+    amostra = dados.head(1, columns=["data_key", "linha_key", "veiculo_key"]).to_pylist()[0]
+    return {
+        "linha X no dia Y": {
+            "data_key": amostra["data_key"],
+            "linha_key": amostra["linha_key"],
+        },
+        "eventos do veículo Z": {"veiculo_key": amostra["veiculo_key"]},
+    }
+
+
+def comparar(fato: Path, repeticoes: int) -> list[dict]:
+    """Comparar leitura com poda e varredura completa para cada consulta."""
+    dados = _dataset(fato)
+    resultados = []
+
+    for nome, condicoes in consultas(fato).items():
+        filtro = None
+        for coluna, valor in condicoes.items():
+            termo = ds.field(coluna) == valor
+            filtro = termo if filtro is None else filtro & termo
+
+        def com_poda():
+            return dados.to_table(filter=filtro).num_rows
+
+        def varredura():
+            df = dados.to_table().to_pandas()
+            mascara = np.ones(len(df), dtype=bool)
+            for coluna, valor in condicoes.items():
+                mascara &= (df[coluna] == valor).to_numpy()
+            return int(mascara.sum())
+
+        t_poda, n_poda = _cronometrar(com_poda, repeticoes)
+        t_total, n_total = _cronometrar(varredura, repeticoes)
+        assert n_poda == n_total, f"{nome}: resultados diferentes"
+        resultados.append({
+            "consulta": nome,
+            "linhas": n_poda,
+            "com_poda_s": round(t_poda, 4),
+            "varredura_s": round(t_total, 4),
+            "ganho": round(t_total / max(t_poda, 1e-9), 1),
+        })
+
+    if "celula_espacial" in dados.schema.names:
+        lat_min, lat_max, lon_min, lon_max = CAIXA_CENTRO
+
+        def com_indice():
+            return len(consultar_bbox(fato, *CAIXA_CENTRO))
+
+        # mesma comparação do consultar_bbox (float32 x limite), em memória
+        na_caixa = (
+            (ds.field("latitude") >= lat_min) & (ds.field("latitude") <= lat_max)
+            & (ds.field("longitude") >= lon_min) & (ds.field("longitude") <= lon_max)
+        )
+
+        def varredura_caixa():
+            return dados.to_table().filter(na_caixa).num_rows
+
+        t_poda, n_poda = _cronometrar(com_indice, repeticoes)
+        t_total, n_total = _cronometrar(varredura_caixa, repeticoes)
+        assert n_poda == n_total, "caixa no centro: resultados diferentes"
+        resultados.append({
+            "consulta": "caixa no centro",
+            "linhas": n_poda,
+            "com_poda_s": round(t_poda, 4),
+            "varredura_s": round(t_total, 4),
+            "ganho": round(t_total / max(t_poda, 1e-9), 1),
+        })
+
+    return resultados
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sintetico", action="store_true")
+    parser.add_argument("--linhas", type=int, default=2_000_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fatos = [
+            GOLD_DIR / nome
+            for nome in ("fato_mco_viagem", "fato_tempo_real_evento")
+            if (GOLD_DIR / nome).is_dir()
+        ]
+        if args.sintetico or not fatos:
+            print(f"Gerando fato sintético com {args.linhas} linhas...")
+            fatos = [gerar_fato_sintetico(Path(tmp), args.linhas)]
+
+        for fato in fatos:
+            print(f"\nFato: {fato}")
+            print(pd.DataFrame(comparar(fato, args.repeticoes)).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Benchmark das etapas do pipeline sobre dados sintéticos.
+
+Para cada escala, gera uma bronze sintética (`benchmarks.synthetic_data`) em
+um diretório temporário e roda, cada uma em um subprocesso próprio:
+
+* silver: `run_silver`;
+* dimensoes: `build_dimensions.main`;
+* fatos: `build_facts.main`.
+
+De cada etapa são medidos o tempo de parede, o tempo de CPU, o pico de
+memória (RSS máximo do processo e dos seus filhos) e as linhas gravadas em
+cada saída. O resultado é comparado com a linha de base gravada por
+`--salvar-baseline`: tempo ou memória acima da tolerância, ou linhas
+diferentes (a geração é determinística), contam como regressão e o comando
+termina com erro.
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.bench_pipeline --escalas 10k 100k --salvar-baseline
+    python -m benchmarks.bench_pipeline --escalas 10k 100k
+    python -m benchmarks.bench_pipeline --escalas 10m --streaming --workers 4
+
+A linha de base depende da máquina: grave-a no mesmo ambiente em que as
+comparações vão rodar.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from benchmarks.synthetic_data import gerar_bronze
+
+RAIZ = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).with_name("baseline.json")
+
+ESCALAS = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+    "100m": 100_000_000,
+}
+ETAPAS = ["silver", "dimensoes", "fatos"]
+
+# Regressão: acima de (1 + TOLERANCIA) x linha de base e de uma folga absoluta,
+# para que o ruído das escalas pequenas não conte
+TOLERANCIA = 0.25
+FOLGA_SEGUNDOS = 0.5
+FOLGA_RSS_MB = 32
+
+BRONZE = Path("data/bronze/mobilidade_bh")
+SILVER = Path("data/silver/mobilidade_bh")
+GOLD = Path("data/gold/mobilidade_bh")
+
+
+def _pico_rss_kb() -> int:
+    """
+    Pico de memória residente deste processo, em KiB.
+
+    No Linux usa o VmHWM de /proc/self/status: o `ru_maxrss` sobrevive ao
+    exec e herdaria o pico do processo que gerou os dados.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _executar_etapa(etapa: str, streaming: bool, workers: int) -> dict:
+    """Rodar uma etapa neste processo e medir tempo e memória."""
+    inicio = time.perf_counter()
+    cpu = time.process_time()
+
+    if etapa == "silver":
+        from src.transform.silver.clean_data import run_silver
+
+        run_silver(streaming=streaming, workers=workers)
+    elif etapa == "dimensoes":
+        from src.transform.gold.build_dimensions import main
+
+        main()
+    elif etapa == "fatos":
+        from src.transform.gold.build_facts import main
+
+        main()
+    else:
+        raise ValueError(f"Etapa desconhecida: {etapa}")
+
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "cpu_segundos": round(time.process_time() - cpu + filhos.ru_utime + filhos.ru_stime, 3),
+        # processos da silver (workers > 1) entram pelo RUSAGE_CHILDREN
+        "pico_rss_mb": round(max(_pico_rss_kb(), filhos.ru_maxrss) / 1024, 1),
+    }
+
+
+def _linhas(caminho: Path) -> int:
+    """Linhas de um parquet ou de um dataset particionado, pelos metadados."""
+    arquivos = sorted(caminho.rglob("*.parquet")) if caminho.is_dir() else [caminho]
+    return sum(pq.read_metadata(a).num_rows for a in arquivos)
+
+
+def linhas_saida(base: Path, etapa: str) -> dict[str, int]:
+    """Linhas gravadas em cada saída da etapa."""
+    if etapa == "silver":
+        saidas = sorted((base / SILVER).glob("*.parquet"))
+    elif etapa == "dimensoes":
+        saidas = sorted((base / GOLD).glob("dim_*.parquet"))
+    else:
+        saidas = sorted(
+            p for p in (base / GOLD).iterdir()
+            if p.is_dir() and p.name.startswith(("fato_", "agg_"))
+        )
+    return {p.name: _linhas(p) for p in saidas}
+
+
+def medir_etapa(base: Path, etapa: str, streaming: bool = False, workers: int = 1) -> dict:
+    """
+    Rodar uma etapa em um subprocesso, com `base` como diretório de trabalho.
+
+    Raises:
+        RuntimeError: Se a etapa falhar.
+    """
+    comando = [
+        sys.executable, "-m", "benchmarks.bench_pipeline",
+        "--executar-etapa", etapa, "--workers", str(workers),
+    ]
+    if streaming:
+        comando.append("--streaming")
+
+    ambiente = dict(os.environ)
+    ambiente["PYTHONPATH"] = os.pathsep.join(
+        p for p in (str(RAIZ), ambiente.get("PYTHONPATH")) if p
+    )
+    processo = subprocess.run(
+        comando, cwd=base, env=ambiente, capture_output=True, text=True
+    )
+    if processo.returncode:
+        raise RuntimeError(f"Etapa {etapa} falhou:\n{processo.stderr[-4000:]}")
+
+    # a última linha da saída é a medição; o resto são as mensagens da etapa
+    medida = json.loads(processo.stdout.strip().splitlines()[-1])
+    medida["linhas"] = linhas_saida(base, etapa)
+    return medida
+
+
+def executar(
+    escalas: list[str],
+    semente: int = 42,
+    streaming: bool = False,
+    workers: int = 1,
+    pasta: str | None = None,
+) -> dict:
+    """
+    Gerar a bronze e medir todas as etapas em cada escala.
+
+    Args:
+        escalas: Nomes de `ESCALAS` (ex.: ["10k", "1m"]).
+        semente: Semente do gerador sintético.
+        streaming: Silver em blocos (necessário nas escalas maiores).
+        workers: Processos da silver.
+        pasta: Onde criar os diretórios temporários (padrão do sistema).
+
+    Returns:
+        Dicionário {escala: {etapa: medição}}.
+    """
+    resultados = {}
+    for escala in escalas:
+        with tempfile.TemporaryDirectory(prefix=f"bench_{escala}_", dir=pasta) as tmp:
+            base = Path(tmp)
+            inicio = time.perf_counter()
+            gerados = gerar_bronze(str(base / BRONZE), ESCALAS[escala], semente)
+            print(
+                f"Benchmark {escala}: bronze sintética com {sum(gerados.values())} "
+                f"linhas em {time.perf_counter() - inicio:.1f}s"
+            )
+
+            resultados[escala] = {}
+            for etapa in ETAPAS:
+                medida = medir_etapa(base, etapa, streaming, workers)
+                resultados[escala][etapa] = medida
+                print(
+                    f"Benchmark {escala}: {etapa} {medida['segundos']:.2f}s, "
+                    f"pico {medida['pico_rss_mb']:.0f} MB"
+                )
+    return resultados
+
+
+def comparar(resultados: dict, baseline: dict, tolerancia: float = TOLERANCIA) -> list[str]:
+    """
+    Comparar as medições com a linha de base.
+
+    Returns:
+        Descrição de cada regressão encontrada (vazia se nenhuma).
+    """
+    regressoes = []
+    for escala, etapas in resultados.items():
+        for etapa, medida in etapas.items():
+            base = baseline.get(escala, {}).get(etapa)
+            if base is None:
+                continue
+            nome = f"{escala}/{etapa}"
+
+            for campo, folga in (("segundos", FOLGA_SEGUNDOS), ("pico_rss_mb", FOLGA_RSS_MB)):
+                limite = max(base[campo] * (1 + tolerancia), base[campo] + folga)
+                if medida[campo] > limite:
+                    regressoes.append(
+                        f"{nome}: {campo} {medida[campo]} > {limite:.1f} "
+                        f"(linha de base {base[campo]})"
+                    )
+
+            if medida["linhas"] != base["linhas"]:
+                regressoes.append(
+                    f"{nome}: linhas {medida['linhas']} != {base['linhas']}"
+                )
+    return regressoes
+
+
+def _tabela(resultados: dict, baseline: dict) -> pd.DataFrame:
+    linhas = []
+    for escala, etapas in resultados.items():
+        for etapa, medida in etapas.items():
+            base = baseline.get(escala, {}).get(etapa, {})
+            linhas.append({
+                "escala": escala,
+                "etapa": etapa,
+                "segundos": medida["segundos"],
+                "base_s": base.get("segundos"),
+                "cpu_s": medida["cpu_segundos"],
+                "pico_rss_mb": medida["pico_rss_mb"],
+                "base_mb": base.get("pico_rss_mb"),
+                "linhas": sum(medida["linhas"].values()),
+            })
+    return pd.DataFrame(linhas)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--escalas", nargs="+", default=["10k", "100k"], choices=list(ESCALAS))
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--pasta", help="diretório para os dados temporários")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument(
+        "--salvar-baseline", action="store_true",
+        help="gravar as medições como nova linha de base das escalas medidas",
+    )
+    parser.add_argument("--executar-etapa", choices=ETAPAS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar_etapa:
+        # modo subprocesso: roda uma etapa e imprime a medição em JSON
+        medida = _executar_etapa(args.executar_etapa, args.streaming, args.workers)
+        print(json.dumps(medida))
+        return
+
+    anterior = {}
+    if args.baseline.exists():
+        anterior = json.loads(args.baseline.read_text(encoding="utf-8"))
+    opcoes = {"semente": args.semente, "streaming": args.streaming, "workers": args.workers}
+    baseline = anterior.get("escalas", {}) if anterior.get("opcoes") == opcoes else {}
+    if anterior and not baseline:
+        print("Benchmark: linha de base gravada com outras opções, sem comparação")
+
+    resultados = executar(
+        args.escalas, args.semente, args.streaming, args.workers, args.pasta
+    )
+    print()
+    print(_tabela(resultados, baseline).to_string(index=False))
+
+    if args.salvar_baseline:
+        escalas = {**baseline, **resultados}
+        args.baseline.write_text(
+            json.dumps({"opcoes": opcoes, "escalas": escalas}, indent=2), encoding="utf-8"
+        )
+        print(f"\nLinha de base gravada em {args.baseline}")
+        return
+
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    for regressao in regressoes:
+        print(f"Regressão: {regressao}")
+    if regressoes:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
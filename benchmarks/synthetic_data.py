@@ -0,0 +1,255 @@
+"""
+Gerador de CSVs sintéticos da bronze (MCO e Tempo Real).
+
+Os arquivos seguem o layout dos publicados pelo portal: cabeçalhos em
+maiúsculas, MCO separado por ';' com datas dd/mm/aaaa e horários HH:MM, Tempo
+Real com `HR` no formato AAAAMMDDHHMMSS e coordenadas com vírgula decimal. Uma
+fração das linhas é repetida (duplicatas exatas), tem campos vazios ou
+horários fora do padrão (ex.: '5:30'), para exercitar as limpezas da silver.
+
+A geração é determinística: cada bloco de `LINHAS_POR_BLOCO` linhas usa um
+gerador aleatório semeado por (semente, arquivo, bloco), então a mesma escala
+e semente produzem sempre os mesmos bytes (também no .gz, gravado sem nome
+de arquivo nem horário no cabeçalho), e a memória usada não depende da
+escala (10 mil a 100 milhões de linhas).
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.synthetic_data --linhas 1000000 --destino /tmp/bh
+"""
+import argparse
+import gzip
+import io
+import os
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+LINHAS_POR_BLOCO = 1_000_000
+
+# Linhas do Tempo Real por viagem do MCO (proporção aproximada dos arquivos reais)
+EVENTOS_POR_VIAGEM = 10
+
+N_LINHAS = 300
+N_VEICULOS = 3_000
+EMPRESAS = [1, 2, 3, 4, 5]
+CONCESSIONARIAS = [801, 802, 803, 804]
+
+# Limites de BH (graus)
+LATITUDE = (-20.05, -19.78)
+LONGITUDE = (-44.06, -43.86)
+
+FRACAO_DUPLICADAS = 0.01
+FRACAO_NULOS = 0.005
+FRACAO_FORA_PADRAO = 0.001
+
+COLUNAS_MCO = [
+    "VIAGEM", "LINHA", "SUBLINHA", "PC", "CONCESSIONARIA", "SAIDA", "VEICULO",
+    "CHEGADA", "CATRACA SAIDA", "CATRACA CHEGADA", "OCORRENCIA", "JUSTIFICATIVA",
+    "TIPO DIA", "EXTENSAO", "FALHA MECANICA", "EVENTO INSEGURO",
+    "INDICADOR FECHAMENTO", "DATA FECHAMENTO", "TOTAL USUARIOS", "EMPRESA OPERADORA",
+]
+COLUNAS_TR = ["EV", "HR", "LT", "LG", "NV", "VL", "NL", "DG", "SV", "DT"]
+
+# Horários HH:MM de cada minuto do dia, indexados por minuto
+HORARIOS = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(1440)], dtype=object)
+HORARIOS_CURTOS = np.array([f"{m // 60}:{m % 60:02d}" for m in range(1440)], dtype=object)
+
+# Códigos de linha: a maioria numérica ('4103'), algumas com sufixo ('SC01A')
+CODIGOS_LINHA = np.array(
+    [f"{1000 + 7 * i}" if i % 10 else f"SC{i // 10:02d}A" for i in range(N_LINHAS)],
+    dtype=object,
+)
+
+
+def _rng(semente: int, arquivo: int, bloco: int) -> np.random.Generator:
+    return np.random.default_rng([semente, arquivo, bloco])
+
+
+def _anular(rng, df: pd.DataFrame, colunas: list[str]) -> None:
+    """Esvaziar uma fração dos valores das colunas (campo vazio no CSV)."""
+    for coluna in colunas:
+        nulos = rng.random(len(df)) < FRACAO_NULOS
+        if pd.api.types.is_integer_dtype(df[coluna]):
+            # inteiro nulo sem virar float ('10001.0' no CSV)
+            df[coluna] = df[coluna].astype("Int64")
+        # float continua float, para sair com vírgula decimal
+        df.loc[nulos, coluna] = np.nan if pd.api.types.is_float_dtype(df[coluna]) else None
+
+
+def _duplicar(rng, df: pd.DataFrame) -> pd.DataFrame:
+    """Substituir uma fração das linhas por cópias de outras linhas do bloco."""
+    n = len(df)
+    copias = rng.random(n) < FRACAO_DUPLICADAS
+    origem = rng.integers(0, n, n)
+    indice = np.where(copias, origem, np.arange(n))
+    return df.iloc[indice].reset_index(drop=True)
+
+
+def bloco_mco(rng, n: int, datas: pd.DatetimeIndex) -> pd.DataFrame:
+    """Gerar `n` viagens do MCO no layout do portal."""
+    dia = rng.integers(0, len(datas), n)
+    saida = rng.integers(4 * 60, 23 * 60, n)
+    chegada = (saida + rng.integers(30, 120, n)) % 1440
+    linha = rng.integers(0, N_LINHAS, n)
+    catraca = rng.integers(0, 99_000, n)
+    usuarios = rng.poisson(40, n)
+    textos_data = datas.strftime("%d/%m/%Y").to_numpy(dtype=object)
+
+    # horários fora do padrão HH:MM (ex.: '5:30'), tratados pelo caminho lento
+    fora_padrao = rng.random(n) < FRACAO_FORA_PADRAO
+    sim_nao = np.array(["S", "N"], dtype=object)
+
+    df = pd.DataFrame({
+        "VIAGEM": textos_data[dia],
+        "LINHA": CODIGOS_LINHA[linha],
+        "SUBLINHA": rng.integers(1, 4, n),
+        "PC": rng.integers(1, 3, n),
+        "CONCESSIONARIA": np.asarray(CONCESSIONARIAS)[linha % len(CONCESSIONARIAS)],
+        "SAIDA": np.where(fora_padrao, HORARIOS_CURTOS[saida], HORARIOS[saida]),
+        "VEICULO": 10_000 + rng.integers(0, N_VEICULOS, n),
+        "CHEGADA": HORARIOS[chegada],
+        "CATRACA SAIDA": catraca,
+        "CATRACA CHEGADA": catraca + usuarios,
+        "OCORRENCIA": sim_nao[(rng.random(n) < 0.05).astype(int) ^ 1],
+        "JUSTIFICATIVA": sim_nao[(rng.random(n) < 0.02).astype(int) ^ 1],
+        "TIPO DIA": np.where(datas.dayofweek.to_numpy()[dia] >= 5, 2, 1),
+        "EXTENSAO": rng.integers(5_000, 40_000, n),
+        "FALHA MECANICA": sim_nao[(rng.random(n) < 0.01).astype(int) ^ 1],
+        "EVENTO INSEGURO": sim_nao[(rng.random(n) < 0.005).astype(int) ^ 1],
+        "INDICADOR FECHAMENTO": sim_nao[(rng.random(n) < 0.9).astype(int) ^ 1],
+        "DATA FECHAMENTO": textos_data[dia],
+        "TOTAL USUARIOS": usuarios,
+        "EMPRESA OPERADORA": np.asarray(EMPRESAS)[linha % len(EMPRESAS)],
+    }, columns=COLUNAS_MCO)
+
+    _anular(rng, df, ["VEICULO", "CHEGADA", "TOTAL USUARIOS"])
+    return _duplicar(rng, df)
+
+
+def bloco_tempo_real(rng, n: int, datas: pd.DatetimeIndex) -> pd.DataFrame:
+    """Gerar `n` eventos do Tempo Real no layout do portal."""
+    dia = rng.integers(0, len(datas), n)
+    segundo = rng.integers(0, 86_400, n)
+    data_numerica = datas.strftime("%Y%m%d").astype("int64").to_numpy()
+    hr = (
+        data_numerica[dia] * 1_000_000
+        + (segundo // 3600) * 10_000
+        + (segundo // 60 % 60) * 100
+        + segundo % 60
+    )
+    veiculo = rng.integers(0, N_VEICULOS, n)
+
+    df = pd.DataFrame({
+        "EV": np.where(rng.random(n) < 0.95, 105, 101),
+        "HR": hr,
+        "LT": np.round(rng.uniform(*LATITUDE, n), 7),
+        "LG": np.round(rng.uniform(*LONGITUDE, n), 7),
+        "NV": 10_000 + veiculo,
+        "VL": rng.integers(0, 80, n),
+        "NL": 1000 + 7 * (veiculo % N_LINHAS),
+        "DG": rng.integers(0, 360, n),
+        "SV": rng.integers(1, 3, n),
+        "DT": rng.integers(0, 60_000, n),
+    }, columns=COLUNAS_TR)
+
+    _anular(rng, df, ["LT", "LG", "NV", "VL"])
+    return _duplicar(rng, df)
+
+
+@contextmanager
+def _abrir(caminho: str, compressao: str | None):
+    """
+    Abrir o CSV de destino para escrita em texto.
+
+    No .gz, o cabeçalho fica sem nome de arquivo e com mtime zero, para que
+    os bytes não dependam do caminho nem da hora da geração.
+    """
+    if compressao != "gz":
+        with open(caminho, "w", encoding="utf-8", newline="") as f:
+            yield f
+        return
+    with (
+        open(caminho, "wb") as bruto,
+        gzip.GzipFile(filename="", mode="wb", fileobj=bruto, mtime=0) as comprimido,
+        io.TextIOWrapper(comprimido, encoding="utf-8", newline="") as f,
+    ):
+        yield f
+
+
+def _escrever(caminho: str, blocos, sep: str, compressao: str | None) -> int:
+    """Gravar os blocos em sequência no mesmo CSV; retorna as linhas gravadas."""
+    total = 0
+    with _abrir(caminho, compressao) as f:
+        for i, df in enumerate(blocos):
+            df.to_csv(f, sep=sep, decimal=",", index=False, header=i == 0)
+            total += len(df)
+    return total
+
+
+def _blocos(gerar, semente: int, arquivo: int, linhas: int, datas):
+    for bloco, inicio in enumerate(range(0, linhas, LINHAS_POR_BLOCO)):
+        n = min(LINHAS_POR_BLOCO, linhas - inicio)
+        yield gerar(_rng(semente, arquivo, bloco), n, datas)
+
+
+def gerar_bronze(
+    destino: str,
+    linhas: int,
+    semente: int = 42,
+    dias: int = 7,
+    inicio: str = "2026-02-01",
+    sep_mco: str = ";",
+    sep_tr: str = ";",
+    compressao: str | None = None,
+) -> dict[str, int]:
+    """
+    Gravar um MCO e um Tempo Real sintéticos na pasta da bronze.
+
+    Args:
+        destino: Pasta da bronze (ex.: <base>/data/bronze/mobilidade_bh).
+        linhas: Linhas do Tempo Real; o MCO tem 1/EVENTOS_POR_VIAGEM disso.
+        semente: Semente dos geradores aleatórios.
+        dias: Dias cobertos pelos arquivos, a partir de `inicio`.
+        inicio: Primeiro dia (AAAA-MM-DD).
+        sep_mco: Separador do CSV do MCO.
+        sep_tr: Separador do CSV do Tempo Real (com ',' as coordenadas vão
+            entre aspas, por causa da vírgula decimal).
+        compressao: None para `.csv` ou "gz" para `.csv.gz`, como a ingestão.
+
+    Returns:
+        Dicionário {arquivo gravado: linhas}.
+    """
+    os.makedirs(destino, exist_ok=True)
+    datas = pd.date_range(inicio, periods=dias)
+    extensao = ".csv.gz" if compressao == "gz" else ".csv"
+    linhas_mco = max(1, linhas // EVENTOS_POR_VIAGEM)
+
+    gravados = {}
+    for arquivo, (nome, gerar, n, sep) in enumerate([
+        ("mco_consolidado", bloco_mco, linhas_mco, sep_mco),
+        ("onibus_tempo_real", bloco_tempo_real, linhas, sep_tr),
+    ]):
+        caminho = os.path.join(destino, nome + extensao)
+        gravados[nome + extensao] = _escrever(
+            caminho, _blocos(gerar, semente, arquivo, n, datas), sep, compressao
+        )
+    return gravados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerar CSVs sintéticos da bronze.")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--destino", default="data/bronze/mobilidade_bh")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--dias", type=int, default=7)
+    parser.add_argument("--sep-tr", default=";", choices=[";", ","])
+    parser.add_argument("--compressao", choices=["gz"])
+    args = parser.parse_args()
+
+    for arquivo, n in gerar_bronze(
+        args.destino, args.linhas, args.semente, args.dias,
+        sep_tr=args.sep_tr, compressao=args.compressao,
+    ).items():
+        print(f"{arquivo}: {n} linhas")
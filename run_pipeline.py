@@ -1,35 +1,342 @@
-from src.ingest.bronze.download_csv import run_bronze_ingestion
-from src.transform.silver.clean_data import run_silver
-from src.transform.gold.build_dimensions import main as run_gold_dimensions
-from src.transform.gold.build_facts import main as run_gold_facts
+"""
+Pipeline BeAnalytic: grafo de etapas da bronze à gold.
 
+Cada etapa declara as etapas de que depende e os datasets que atende. O
+executor roda em paralelo, em threads, as etapas cujas dependências já
+terminaram (ex.: as cinco dimensões, os fatos do MCO e do Tempo Real). O que está pendente em
+cada etapa é decidido por ela mesma, pelo seu manifesto
+(`src/transform/manifest.py`): a etapa devolve False quando nada mudou e
+aparece como "pulada" no resultado. A bronze sempre roda (downloads sem
+mudança já são evitados por ETag/Last-Modified).
 
+Dentro de uma execução, as tabelas da silver e as dimensões gravadas ficam
+em memória (`src/transform/artifacts.py`) e as etapas seguintes as recebem
+sem reler os parquets.
 
-def main():
-    print("\n*******************************")
-    print("Iniciando a pipeline BeAnalytic")
-    print("*******************************")
+Os módulos de cada etapa só são importados quando ela roda, então
+`--etapas fatos_mco` não carrega o Playwright nem o código da bronze. Cada
+etapa também pode rodar sozinha, como uma task do Airflow
+(`airflow/dags/mobilidade_bh_pipeline.py` monta as tasks a partir de ETAPAS).
 
-    print("\n-----------------------")
-    print("     CAMADA BRONZE     ")
-    print("-----------------------\n")
-    run_bronze_ingestion()
-    
-    print("\n-----------------------")
-    print("     CAMADA SILVER     ")
-    print("-----------------------\n")
-    run_silver()
+Uso:
 
-    print("\n-----------------------")
-    print("     CAMADA GOLD     ")
-    print("-----------------------\n")
-    run_gold_dimensions()
-    run_gold_facts()
+    python run_pipeline.py
+    python run_pipeline.py --a-partir-de silver
+    python run_pipeline.py --etapas fatos_mco fatos_tr
+    python run_pipeline.py --dataset mco
+"""
+import argparse
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-    print("\n*******************************")
-    print("Pipeline finalizado com sucesso")
-    print("*******************************")
+from src.transform.instrumentation import (
+    configurar_perfis,
+    finalizar_execucao,
+    iniciar_execucao,
+    medir,
+)
+
+DATASETS = ("mco", "tempo_real")
+WORKERS = 4
+
+
+def _bronze(opcoes):
+    from src.ingest.bronze.download_csv import run_bronze_ingestion
+
+    run_bronze_ingestion(datasets=opcoes["datasets"])
+
+
+def _silver(opcoes):
+    from src.transform.silver.clean_data import run_silver, silver_atualizada
+
+    if not opcoes["forcar"] and silver_atualizada(opcoes["datasets"]):
+        return False
+    run_silver(forcar=opcoes["forcar"], datasets=opcoes["datasets"])
+    return True
+
+
+def _dimensao(nome):
+    def executar(opcoes):
+        from src.transform.gold.build_dimensions import construir_dimensao
+
+        return construir_dimensao(nome, forcar=opcoes["forcar"])
+    return executar
+
+
+def _fatos_mco(opcoes):
+    from src.transform.gold.build_facts import main
+
+    return main(forcar=opcoes["forcar"], fatos=("mco",))
+
+
+def _fatos_tr(opcoes):
+    from src.transform.gold.build_facts import main
+
+    return main(forcar=opcoes["forcar"], fatos=("tr",))
+
+
+def _trajetorias(opcoes):
+    from src.transform.gold.build_trajectories import main
+
+    return main(workers=opcoes["workers"])
+
+
+def _viagens(opcoes):
+    from src.transform.gold.build_trip_matching import main
+
+    return main(workers=opcoes["workers"])
+
+
+# Etapa -> função (devolve False se não havia nada a fazer), dependências e
+# datasets atendidos
+ETAPAS = {
+    "bronze": {
+        "executar": _bronze,
+        "depende": [],
+        "datasets": {"mco", "tempo_real"},
+    },
+    "silver": {
+        "executar": _silver,
+        "depende": ["bronze"],
+        "datasets": {"mco", "tempo_real"},
+    },
+    "dim_data": {
+        "executar": _dimensao("dim_data"),
+        "depende": ["silver"],
+        "datasets": {"mco", "tempo_real"},
+    },
+    "dim_linha": {
+        "executar": _dimensao("dim_linha"),
+        "depende": ["silver"],
+        "datasets": {"mco", "tempo_real"},
+    },
+    "dim_concessionaria": {
+        "executar": _dimensao("dim_concessionaria"),
+        "depende": ["silver"],
+        "datasets": {"mco"},
+    },
+    "dim_empresa": {
+        "executar": _dimensao("dim_empresa"),
+        "depende": ["silver"],
+        "datasets": {"mco"},
+    },
+    "dim_veiculo": {
+        "executar": _dimensao("dim_veiculo"),
+        "depende": ["silver"],
+        "datasets": {"mco", "tempo_real"},
+    },
+    "fatos_mco": {
+        "executar": _fatos_mco,
+        "depende": ["dim_data", "dim_linha", "dim_concessionaria", "dim_empresa", "dim_veiculo"],
+        "datasets": {"mco"},
+    },
+    "fatos_tr": {
+        "executar": _fatos_tr,
+        "depende": ["dim_data", "dim_linha", "dim_veiculo"],
+        "datasets": {"tempo_real"},
+    },
+    "trajetorias": {
+        "executar": _trajetorias,
+        "depende": ["fatos_tr"],
+        "datasets": {"tempo_real"},
+    },
+    "viagens": {
+        "executar": _viagens,
+        "depende": ["fatos_mco", "fatos_tr"],
+        "datasets": {"mco", "tempo_real"},
+    },
+}
+
+
+def dependentes(etapa: str) -> set[str]:
+    """Etapas que dependem, direta ou indiretamente, de `etapa`."""
+    encontrados = set()
+    for nome, definicao in ETAPAS.items():
+        if etapa in definicao["depende"]:
+            encontrados |= {nome} | dependentes(nome)
+    return encontrados
+
+
+def selecionar_etapas(
+    etapas: list[str] | None = None,
+    a_partir_de: str | None = None,
+    datasets: list[str] | None = None,
+) -> list[str]:
+    """
+    Escolher as etapas a rodar, na ordem declarada em ETAPAS.
+
+    Args:
+        etapas: Rodar só estas etapas. Se None, todas.
+        a_partir_de: Rodar esta etapa e as que dependem dela.
+        datasets: Rodar só as etapas que atendem algum destes datasets.
+
+    Raises:
+        ValueError: Se alguma etapa ou dataset for desconhecido.
+    """
+    desconhecidas = set(etapas or []) | ({a_partir_de} - {None})
+    desconhecidas -= set(ETAPAS)
+    if desconhecidas:
+        raise ValueError(f"Etapa desconhecida: {', '.join(sorted(desconhecidas))}")
+    if set(datasets or []) - set(DATASETS):
+        raise ValueError(f"Dataset desconhecido: {', '.join(datasets)}")
+
+    selecionadas = list(ETAPAS)
+    if a_partir_de:
+        alcance = {a_partir_de} | dependentes(a_partir_de)
+        selecionadas = [e for e in selecionadas if e in alcance]
+    if etapas:
+        selecionadas = [e for e in selecionadas if e in etapas]
+    if datasets:
+        selecionadas = [e for e in selecionadas if ETAPAS[e]["datasets"] & set(datasets)]
+    return selecionadas
+
+
+def executar_etapa(etapa: str, opcoes: dict) -> bool:
+    """
+    Rodar uma etapa.
+
+    A etapa consulta o seu próprio manifesto e só processa o que mudou; o
+    runner não guarda estado próprio sobre o que já foi feito.
+
+    Returns:
+        True se a etapa processou algo, False se não havia nada a fazer.
+    """
+    with medir(etapa) as registro:
+        print(f"Pipeline: iniciando {etapa}")
+        inicio = time.perf_counter()
+        rodou = ETAPAS[etapa]["executar"](opcoes) is not False
+        if rodou:
+            print(f"Pipeline: {etapa} concluída em {time.perf_counter() - inicio:.1f}s")
+        else:
+            print(f"Pipeline: {etapa} - entradas inalteradas, nada a fazer.")
+            registro["pulada"] = True
+    return rodou
+
+
+def executar_etapas(etapas: list[str], opcoes: dict, workers: int = WORKERS) -> dict:
+    """
+    Rodar as etapas respeitando as dependências, em paralelo quando possível.
+
+    Dependências fora de `etapas` são consideradas já satisfeitas. Se uma
+    etapa falhar, as que dependem dela não rodam; as demais seguem.
+
+    Returns:
+        Dicionário {etapa: "ok" | "pulada"}.
+
+    Raises:
+        RuntimeError: Se alguma etapa falhar ou for bloqueada por uma falha.
+    """
+    pendentes = list(etapas)
+    resultados = {}
+    erros = {}
+    bloqueadas = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        rodando = {}
+        while pendentes or rodando:
+            for etapa in list(pendentes):
+                depende = [d for d in ETAPAS[etapa]["depende"] if d in etapas]
+                if any(d in erros or d in bloqueadas for d in depende):
+                    pendentes.remove(etapa)
+                    bloqueadas.append(etapa)
+                elif all(d in resultados for d in depende):
+                    pendentes.remove(etapa)
+                    rodando[executor.submit(executar_etapa, etapa, opcoes)] = etapa
+
+            if not rodando:
+                break
+            feitos, _ = wait(rodando, return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                etapa = rodando.pop(futuro)
+                try:
+                    resultados[etapa] = "ok" if futuro.result() else "pulada"
+                except Exception as e:
+                    erros[etapa] = e
+
+    for etapa, erro in erros.items():
+        print(f"Pipeline: erro em {etapa}: {erro!r}")
+    if bloqueadas:
+        print(f"Pipeline: não executadas por falha anterior: {', '.join(bloqueadas)}")
+    if erros:
+        raise RuntimeError(f"Pipeline falhou nas etapas: {', '.join(erros)}")
+    return resultados
+
+
+def main(
+    etapas: list[str] | None = None,
+    a_partir_de: str | None = None,
+    datasets: list[str] | None = None,
+    forcar: bool = False,
+    workers: int = WORKERS,
+    perfis=None,
+) -> dict:
+    """
+    Rodar a pipeline e gravar o relatório da execução em data/runs/.
+
+    Args:
+        etapas: Rodar só estas etapas (ver ETAPAS).
+        a_partir_de: Rodar esta etapa e todas as que dependem dela.
+        datasets: Rodar só o necessário para estes datasets ("mco",
+            "tempo_real").
+        forcar: Se True, roda as etapas mesmo sem mudanças nas entradas.
+        workers: Etapas independentes rodando ao mesmo tempo; também é o
+            número de processos das etapas que dividem o trabalho por dia
+            (trajetórias e viagens).
+        perfis: Perfis por etapa, ex.: {"silver": "cprofile"} ou
+            "silver:cprofile,fatos_tr:tracemalloc". Se None, usa a variável
+            de ambiente PIPELINE_PERFIL.
+
+    Returns:
+        Dicionário {etapa: "ok" | "pulada"}.
+    """
+    # importado aqui: carrega pandas e pyarrow, desnecessários para ler o grafo
+    from src.transform import artifacts
+
+    selecionadas = selecionar_etapas(etapas, a_partir_de, datasets)
+    opcoes = {"forcar": forcar, "datasets": datasets, "workers": workers}
+
+    configurar_perfis(perfis)
+    iniciar_execucao("run_pipeline", etapas=selecionadas, datasets=datasets, forcar=forcar)
+    status, erro = "ok", None
+
+    try:
+        print("\n*******************************")
+        print("Iniciando a pipeline BeAnalytic")
+        print(f"Etapas: {', '.join(selecionadas)}")
+        print("*******************************\n")
+
+        with artifacts.sessao():
+            resultados = executar_etapas(selecionadas, opcoes, workers)
+
+        print("\n*******************************")
+        print("Pipeline finalizado com sucesso")
+        print("*******************************")
+        return resultados
+    except BaseException as e:
+        status, erro = "erro", e
+        raise
+    finally:
+        relatorio = finalizar_execucao(status, erro)
+        print(f"\nRelatório da execução: {relatorio}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Rodar a pipeline BeAnalytic.")
+    parser.add_argument("--etapas", nargs="+", choices=list(ETAPAS))
+    parser.add_argument("--a-partir-de", choices=list(ETAPAS))
+    parser.add_argument("--dataset", nargs="+", choices=DATASETS)
+    parser.add_argument("--forcar", action="store_true")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument(
+        "--perfil", action="append", metavar="ETAPA:MODO",
+        help="perfilar uma etapa com cprofile ou tracemalloc (ex.: silver:cprofile)",
+    )
+    args = parser.parse_args()
+    main(
+        args.etapas,
+        args.a_partir_de,
+        args.dataset,
+        args.forcar,
+        args.workers,
+        ",".join(args.perfil) if args.perfil else None,
+    )
@@ -0,0 +1,89 @@
+"""
+Compressão dos arquivos da camada bronze.
+
+Os CSVs baixados são gravados comprimidos (gzip ou, se o pacote `zstandard`
+estiver instalado, zstd) enquanto chegam. O arquivo é uma sequência de
+membros gzip / frames zstd independentes: cada trecho fechado é válido por si
+só, o que permite retomar um download interrompido a partir do último trecho
+completo. Os leitores de gzip e zstd descomprimem a sequência inteira como um
+único fluxo, com o conteúdo original byte a byte.
+"""
+import gzip
+import hashlib
+import zlib
+
+# Formato -> extensão acrescentada ao nome do arquivo
+EXTENSOES = {"gz": ".gz", "zst": ".zst"}
+
+NIVEL_GZIP = 6
+NIVEL_ZSTD = 9
+BLOCO_LEITURA = 1024 * 1024
+
+
+def _zstandard():
+    """Importa o `zstandard` só quando o formato zstd é usado."""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ValueError("Formato zstd requer o pacote 'zstandard'") from e
+    return zstandard
+
+
+def formato_do_arquivo(nome):
+    """Formato de compressão pelo nome do arquivo (None se não comprimido)."""
+    for formato, extensao in EXTENSOES.items():
+        if str(nome).endswith(extensao):
+            return formato
+    return None
+
+
+def nome_sem_compressao(nome):
+    """Nome do arquivo sem a extensão de compressão ('x.csv.gz' -> 'x.csv')."""
+    formato = formato_do_arquivo(nome)
+    return str(nome)[: -len(EXTENSOES[formato])] if formato else str(nome)
+
+
+def nome_comprimido(nome, formato):
+    """Nome do arquivo gravado no formato ('x.csv', 'gz' -> 'x.csv.gz')."""
+    return nome + EXTENSOES[formato] if formato else nome
+
+
+def novo_compressor(formato):
+    """
+    Cria um compressor incremental para um novo membro/frame.
+
+    O objeto retornado tem `compress(dados)` e `flush()`; `flush()` encerra o
+    membro, deixando o que foi gravado até ali legível sozinho.
+    """
+    if formato == "gz":
+        return zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if formato == "zst":
+        return _zstandard().ZstdCompressor(level=NIVEL_ZSTD).compressobj()
+    raise ValueError(f"Formato de compressão desconhecido: {formato}")
+
+
+def abrir_leitura(caminho):
+    """
+    Abre um arquivo da bronze para leitura binária, descomprimindo em fluxo.
+
+    Nada é descomprimido para o disco nem para a memória de uma vez: o leitor
+    entrega o conteúdo original conforme é lido.
+    """
+    formato = formato_do_arquivo(caminho)
+    if formato == "gz":
+        return gzip.open(caminho, "rb")
+    if formato == "zst":
+        bruto = open(caminho, "rb")
+        return _zstandard().ZstdDecompressor().stream_reader(
+            bruto, read_across_frames=True, closefd=True
+        )
+    return open(caminho, "rb")
+
+
+def hash_conteudo(caminho):
+    """SHA-256 do conteúdo original (descomprimido) de um arquivo da bronze."""
+    h = hashlib.sha256()
+    with abrir_leitura(caminho) as f:
+        for bloco in iter(lambda: f.read(BLOCO_LEITURA), b""):
+            h.update(bloco)
+    return h.hexdigest()
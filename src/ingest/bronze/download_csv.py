@@ -1,16 +1,558 @@
-from playwright.sync_api import sync_playwright
+"""
+Ingestão da camada bronze: download dos CSVs da mobilidade urbana de BH.
+
+Os endereços dos arquivos são obtidos pela API CKAN do portal
+(dados.pbh.gov.br) e os arquivos são baixados direto por HTTP, em blocos,
+para um arquivo `.part`. Um download interrompido é retomado de onde parou
+(cabeçalho Range) e um arquivo que não mudou no portal não é baixado de novo
+(ETag/Last-Modified). A navegação pelo site com Playwright continua
+disponível como alternativa, caso a API não responda.
+
+Além do MCO mais recente, meses anteriores podem ser baixados para montar o
+histórico (`mco_consolidado_<mês>.csv`). Os downloads rodam em paralelo, com
+novas tentativas em falhas temporárias, e o SHA-256 de cada arquivo fica no
+manifesto da bronze (`_manifest.json`).
+
+Os arquivos são comprimidos enquanto chegam (`.csv.gz`, ou `.csv.zst` com o
+pacote `zstandard`) e nunca existem descomprimidos em disco. A compressão é
+sem perdas: o manifesto guarda também o SHA-256 do conteúdo original
+(`sha256_bruto`), que é o conferido com o informado pelo portal.
+"""
+import argparse
+import hashlib
+import http.client
+import json
 import os
+import random
+import re
+import time
+import unicodedata
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from src.ingest.bronze.compressao import (
+    EXTENSOES,
+    hash_conteudo,
+    nome_comprimido,
+    novo_compressor,
+)
+from src.transform.manifest import (
+    carregar_manifesto,
+    impressao_digital,
+    mesma_impressao,
+    salvar_manifesto,
+)
 
 BASE_URL = "https://dados.pbh.gov.br/group/mobilidade-urbana"
+CKAN_API = "https://dados.pbh.gov.br/api/3/action"
 OUTPUT_DIR = "data/bronze/mobilidade_bh"
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+MANIFESTO = os.path.join(OUTPUT_DIR, "_manifest.json")
+
+TIMEOUT = 60
+TAMANHO_BLOCO = 1024 * 1024
+
+# Compressão da bronze ("gz", "zst" ou None) e bytes originais por trecho
+# comprimido independente (ponto de retomada de um download interrompido)
+FORMATO_BRONZE = "gz"
+TAMANHO_TRECHO = 64 * 1024 * 1024
+
+# Novas tentativas em falhas temporárias (espera dobra a cada tentativa)
+TENTATIVAS = 4
+ESPERA_INICIAL = 2.0
+WORKERS = 4
+
+
+def _recurso_mais_recente(recursos):
+    """Último recurso do conjunto (a lista do portal está em ordem cronológica)."""
+    return recursos[-1] if recursos else None
+
+
+def _eh_csv(recurso):
+    nome = (recurso.get("name") or "").upper()
+    return (recurso.get("format") or "").upper() == "CSV" or "CSV" in nome
+
+
+def _recurso_csv(recursos):
+    """Recurso do arquivo CSV do conjunto."""
+    return next((r for r in recursos if _eh_csv(r)), None)
+
+
+# Arquivo bronze -> (título do conjunto no portal, escolha do recurso)
+DATASETS = {
+    "mco_consolidado.csv": (
+        "Mapa de Controle Operacional (MCO) Consolidado",
+        _recurso_mais_recente,
+    ),
+    "onibus_tempo_real.csv": (
+        "Tempo Real Ônibus - Coordenada atualizada",
+        _recurso_csv,
+    ),
+}
+
+# Dataset da pipeline -> prefixo dos seus arquivos na bronze
+PREFIXOS_DATASET = {"mco": "mco_consolidado", "tempo_real": "onibus_tempo_real"}
+
+
+def filtrar_datasets(arquivos, datasets=None) -> list[str]:
+    """
+    Mantém só os arquivos dos datasets pedidos ("mco", "tempo_real").
+
+    Args:
+        arquivos: Nomes de arquivos da bronze (com ou sem compressão).
+        datasets: Datasets a manter. Se vazio ou None, mantém todos.
+    """
+    if not datasets:
+        return list(arquivos)
+    prefixos = tuple(PREFIXOS_DATASET[d] for d in datasets)
+    return [a for a in arquivos if a.startswith(prefixos)]
+
+
+def consultar_ckan(acao, base_url=CKAN_API, **parametros):
+    """
+    Chama uma ação da API CKAN e retorna o campo `result` da resposta.
+
+    Args:
+        acao: Nome da ação (ex.: "package_search", "package_show").
+        base_url: Endereço base da API (".../api/3/action").
+        **parametros: Parâmetros da consulta.
+
+    Raises:
+        ValueError: Se a API responder com `success` falso.
+    """
+    url = f"{base_url}/{acao}?{urllib.parse.urlencode(parametros)}"
+    with urllib.request.urlopen(url, timeout=TIMEOUT) as resposta:
+        corpo = json.load(resposta)
+    if not corpo.get("success"):
+        raise ValueError(f"CKAN {acao} falhou: {corpo.get('error')}")
+    return corpo["result"]
+
+
+def recursos_do_conjunto(titulo, base_url=CKAN_API):
+    """
+    Lista os recursos de um conjunto de dados do portal, pelo título.
+
+    Raises:
+        ValueError: Se o conjunto não for encontrado.
+    """
+    busca = consultar_ckan(
+        "package_search", base_url, q=f'title:"{titulo}"', rows=50
+    )
+    pacote = next(
+        (p for p in busca.get("results", []) if p.get("title") == titulo), None
+    )
+    if pacote is None:
+        raise ValueError(f"Conjunto não encontrado no CKAN: {titulo}")
+
+    pacote = consultar_ckan("package_show", base_url, id=pacote["name"])
+    return pacote.get("resources", [])
+
+
+def resolver_recurso(titulo, escolher, base_url=CKAN_API):
+    """
+    Encontra o recurso de um conjunto de dados do portal pelo título.
+
+    Args:
+        titulo: Título exato do conjunto (como exibido no portal).
+        escolher: Função que recebe a lista de recursos e retorna um deles.
+        base_url: Endereço base da API CKAN.
+
+    Returns:
+        Dicionário do recurso (com a chave "url").
+
+    Raises:
+        ValueError: Se o conjunto ou o recurso não forem encontrados.
+    """
+    recurso = escolher(recursos_do_conjunto(titulo, base_url))
+    if recurso is None or not recurso.get("url"):
+        raise ValueError(f"Recurso não encontrado no conjunto: {titulo}")
+    return recurso
+
+
+def _carregar_meta(caminho):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _salvar_meta(caminho, meta):
+    tmp = caminho + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, caminho)
+
+
+def _gravar_trecho(f, compressor, meta, meta_path):
+    """Fecha o trecho comprimido atual e registra o ponto de retomada."""
+    f.write(compressor.flush())
+    f.flush()
+    os.fsync(f.fileno())
+    meta["bytes_gravados"] = f.tell()
+    _salvar_meta(meta_path, meta)
+
+
+def baixar_arquivo(
+    url,
+    destino,
+    timeout=TIMEOUT,
+    tamanho_bloco=TAMANHO_BLOCO,
+    compressao=None,
+    tamanho_trecho=TAMANHO_TRECHO,
+):
+    """
+    Baixa um arquivo por HTTP em blocos, com retomada e requisição condicional.
+
+    O conteúdo é gravado em `<destino>.part` e só substitui `destino` quando
+    completo. Os cabeçalhos ETag/Last-Modified da resposta ficam em
+    `<destino>.meta.json`:
+
+    * com um `.part` pela metade, pede só o restante (Range + If-Range); se o
+      arquivo mudou no servidor, ele responde com o arquivo inteiro;
+    * com o arquivo completo, pede só se tiver mudado (If-None-Match /
+      If-Modified-Since); a resposta 304 encerra sem baixar nada.
+
+    Com `compressao`, o corpo é comprimido enquanto chega, em trechos
+    independentes de `tamanho_trecho` bytes originais. Ao fechar cada trecho,
+    o `.meta.json` guarda quantos bytes originais (`bytes_brutos`) e
+    comprimidos (`bytes_gravados`) estão completos; a retomada descarta o
+    trecho incompleto e pede o restante a partir de `bytes_brutos`.
+
+    Args:
+        url: Endereço do arquivo.
+        destino: Caminho do arquivo local.
+        timeout: Tempo máximo de espera por resposta (s).
+        tamanho_bloco: Bytes lidos e gravados por vez.
+        compressao: Formato de compressão ("gz", "zst") ou None.
+        tamanho_trecho: Bytes originais por trecho comprimido.
+
+    Returns:
+        True se o arquivo foi baixado, False se não mudou.
+    """
+    parcial = destino + ".part"
+    meta_path = destino + ".meta.json"
+    meta = _carregar_meta(meta_path)
+    validador = meta.get("etag") or meta.get("last_modified")
+
+    cabecalhos = {}
+    inicio = gravados = 0
+    if (
+        os.path.exists(parcial)
+        and meta.get("url") == url
+        and meta.get("compressao") == compressao
+        and validador
+    ):
+        if compressao:
+            inicio = meta.get("bytes_brutos", 0)
+            gravados = meta.get("bytes_gravados", 0)
+        else:
+            inicio = gravados = os.path.getsize(parcial)
+        cabecalhos["Range"] = f"bytes={inicio}-"
+        cabecalhos["If-Range"] = validador
+    elif os.path.exists(destino) and meta.get("url") == url:
+        if meta.get("etag"):
+            cabecalhos["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = meta["last_modified"]
+
+    requisicao = urllib.request.Request(url, headers=cabecalhos)
+    try:
+        resposta = urllib.request.urlopen(requisicao, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return False
+        if e.code == 416:
+            # o .part não corresponde ao arquivo atual: recomeça do zero
+            os.remove(parcial)
+            return baixar_arquivo(
+                url, destino, timeout, tamanho_bloco, compressao, tamanho_trecho
+            )
+        raise
+
+    with resposta:
+        retomado = resposta.status == 206
+        if not retomado:
+            inicio = gravados = 0
+        meta = {
+            "url": url,
+            "etag": resposta.headers.get("ETag"),
+            "last_modified": resposta.headers.get("Last-Modified"),
+            "compressao": compressao,
+        }
+        if compressao:
+            meta.update(bytes_brutos=inicio, bytes_gravados=gravados)
+        # grava os validadores antes do corpo, para permitir retomar o .part
+        _salvar_meta(meta_path, meta)
+
+        # SHA-256 do conteúdo original, calculado enquanto chega
+        sha256 = None if retomado else hashlib.sha256()
+        with open(parcial, "ab" if retomado else "wb") as f:
+            f.truncate(gravados)
+            compressor = novo_compressor(compressao) if compressao else None
+            no_trecho = 0
+            for bloco in iter(lambda: resposta.read(tamanho_bloco), b""):
+                if sha256 is not None:
+                    sha256.update(bloco)
+                if compressor is None:
+                    f.write(bloco)
+                    continue
+                f.write(compressor.compress(bloco))
+                no_trecho += len(bloco)
+                if no_trecho >= tamanho_trecho:
+                    meta["bytes_brutos"] += no_trecho
+                    _gravar_trecho(f, compressor, meta, meta_path)
+                    compressor, no_trecho = novo_compressor(compressao), 0
+            if resposta.length:
+                # conexão encerrada antes do fim do corpo anunciado
+                raise http.client.IncompleteRead(b"", resposta.length)
+            if compressor is not None:
+                f.write(compressor.flush())
+
+    os.replace(parcial, destino)
+    for chave in ("bytes_brutos", "bytes_gravados"):
+        meta.pop(chave, None)
+    meta["tamanho"] = os.path.getsize(destino)
+    # retomado: o início veio de outra resposta, o hash é refeito pelo arquivo
+    meta["sha256_bruto"] = (
+        sha256.hexdigest() if sha256 is not None else hash_conteudo(destino)
+    )
+    _salvar_meta(meta_path, meta)
+    return True
+
+
+def baixar_via_ckan(
+    nome_arquivo, base_url=CKAN_API, output_dir=OUTPUT_DIR, compressao=FORMATO_BRONZE
+):
+    """
+    Resolve o recurso de um arquivo bronze pela API CKAN e faz o download.
+
+    O arquivo é gravado como `nome_arquivo` mais a extensão da compressão.
+
+    Returns:
+        True se o arquivo foi baixado, False se não mudou.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    titulo, escolher = DATASETS[nome_arquivo]
+    recurso = resolver_recurso(titulo, escolher, base_url)
+    nome = nome_comprimido(nome_arquivo, compressao)
+    baixado = baixar_arquivo(
+        recurso["url"], os.path.join(output_dir, nome), compressao=compressao
+    )
+    if baixado:
+        print(f"sucesso: {nome} salvo em {output_dir}")
+    else:
+        print(f"inalterado: {nome} já está atualizado em {output_dir}")
+    return baixado
+
+
+def slug_recurso(recurso):
+    """Identificador do recurso para nome de arquivo (ex.: 'mco_janeiro_2025')."""
+    nome = unicodedata.normalize("NFKD", recurso.get("name") or "")
+    nome = nome.encode("ascii", "ignore").decode().lower()
+    slug = re.sub(r"[^a-z0-9]+", "_", nome).strip("_")
+    return slug or (recurso.get("id") or "recurso")[:8]
+
+
+def planejar_downloads(mco="ultimo", base_url=CKAN_API):
+    """
+    Monta a lista de arquivos bronze a baixar e o recurso de cada um.
+
+    O MCO mais recente é sempre `mco_consolidado.csv`; os meses anteriores
+    selecionados viram `mco_consolidado_<slug>.csv`.
+
+    Args:
+        mco: Recursos do MCO a baixar além do mais recente: "ultimo" (só o
+            mais recente), "todos", um inteiro N (os N mais recentes) ou uma
+            lista de nomes/slugs de recursos.
+        base_url: Endereço base da API CKAN.
+
+    Returns:
+        Dicionário {arquivo bronze: recurso}.
+    """
+    titulo_mco = DATASETS["mco_consolidado.csv"][0]
+    titulo_tr, escolher_tr = DATASETS["onibus_tempo_real.csv"]
+
+    recursos_mco = recursos_do_conjunto(titulo_mco, base_url)
+    if not recursos_mco:
+        raise ValueError(f"Recurso não encontrado no conjunto: {titulo_mco}")
+    recurso_tr = escolher_tr(recursos_do_conjunto(titulo_tr, base_url))
+    if recurso_tr is None:
+        raise ValueError(f"Recurso não encontrado no conjunto: {titulo_tr}")
+
+    planejados = {
+        "mco_consolidado.csv": _recurso_mais_recente(recursos_mco),
+        "onibus_tempo_real.csv": recurso_tr,
+    }
+
+    anteriores = [r for r in recursos_mco[:-1] if _eh_csv(r)]
+    if mco == "todos":
+        historico = anteriores
+    elif isinstance(mco, int):
+        historico = anteriores[-(mco - 1):] if mco > 1 else []
+    elif mco == "ultimo":
+        historico = []
+    else:
+        pedidos = set(mco)
+        historico = [
+            r for r in anteriores if r.get("name") in pedidos or slug_recurso(r) in pedidos
+        ]
+
+    for recurso in historico:
+        planejados[f"mco_consolidado_{slug_recurso(recurso)}.csv"] = recurso
+    return planejados
+
+
+def _temporaria(erro):
+    """Se vale a pena tentar de novo após o erro (rede, timeout, 408/429/5xx)."""
+    if isinstance(erro, urllib.error.HTTPError):
+        return erro.code in (408, 429) or erro.code >= 500
+    # HTTPException: conexão cortada no meio do corpo (IncompleteRead)
+    return isinstance(erro, (OSError, http.client.HTTPException))
+
+
+def baixar_com_retentativas(
+    url, destino, tentativas=TENTATIVAS, espera=ESPERA_INICIAL, compressao=None
+):
+    """
+    Baixa um arquivo, tentando de novo em falhas temporárias.
+
+    Como `baixar_arquivo` retoma o `.part`, cada nova tentativa continua de
+    onde a anterior parou. A espera dobra a cada tentativa, com um pouco de
+    aleatoriedade para não sincronizar os downloads paralelos.
+
+    Returns:
+        True se o arquivo foi baixado, False se não mudou.
+    """
+    for tentativa in range(tentativas):
+        try:
+            return baixar_arquivo(url, destino, compressao=compressao)
+        except (OSError, http.client.HTTPException) as e:
+            if tentativa == tentativas - 1 or not _temporaria(e):
+                raise
+            pausa = espera * 2 ** tentativa * (1 + random.random() / 2)
+            print(f"tentativa {tentativa + 1} de {os.path.basename(destino)} falhou "
+                  f"({e!r}), nova tentativa em {pausa:.1f}s")
+            time.sleep(pausa)
+
+
+def _baixar_e_verificar(nome_arquivo, recurso, output_dir, anterior, compressao=None):
+    """
+    Baixa um arquivo planejado e monta o seu registro no manifesto.
+
+    O SHA-256 só é recalculado se o arquivo mudou desde o registro anterior.
+    Se o portal informar o SHA-256 do recurso, o conteúdo original (antes da
+    compressão) é conferido.
+
+    Raises:
+        ValueError: Se o SHA-256 não bater com o informado pelo portal.
+    """
+    caminho = os.path.join(output_dir, nome_arquivo)
+    baixado = baixar_com_retentativas(recurso["url"], caminho, compressao=compressao)
+
+    if not baixado and anterior and mesma_impressao(caminho, anterior.get("arquivo")):
+        registro = dict(anterior)
+    else:
+        registro = {
+            "arquivo": impressao_digital(caminho),
+            "baixado_em": datetime.now().isoformat(timespec="seconds"),
+        }
+    if "sha256_bruto" not in registro:
+        meta = _carregar_meta(caminho + ".meta.json")
+        registro["sha256_bruto"] = meta.get("sha256_bruto") or hash_conteudo(caminho)
+
+    esperado = (recurso.get("hash") or "").lower().removeprefix("sha256:")
+    if re.fullmatch(r"[0-9a-f]{64}", esperado) and esperado != registro["sha256_bruto"]:
+        os.remove(caminho)
+        raise ValueError(f"SHA-256 de {nome_arquivo} não confere com o portal")
+
+    registro.update({
+        "url": recurso["url"],
+        "recurso_id": recurso.get("id"),
+        "recurso_nome": recurso.get("name"),
+    })
+    return baixado, registro
+
+
+def _remover_outros_formatos(output_dir, nome_arquivo, compressao):
+    """
+    Apaga as cópias de um arquivo bronze gravadas em outros formatos.
+
+    Returns:
+        Nomes dos arquivos nos outros formatos.
+    """
+    outros = [
+        nome_comprimido(nome_arquivo, formato)
+        for formato in (None, *EXTENSOES) if formato != compressao
+    ]
+    for nome in outros:
+        for sufixo in ("", ".part", ".meta.json"):
+            caminho = os.path.join(output_dir, nome + sufixo)
+            if os.path.exists(caminho):
+                os.remove(caminho)
+    return outros
+
+
+def baixar_recursos(
+    planejados, output_dir=OUTPUT_DIR, workers=WORKERS, compressao=FORMATO_BRONZE
+):
+    """
+    Baixa os arquivos planejados em paralelo e atualiza o manifesto da bronze.
+
+    Cada arquivo é gravado com a extensão da compressão (ex.:
+    `mco_consolidado.csv.gz`); depois de baixado, a cópia em outro formato
+    (ex.: o `.csv` de execuções anteriores) é apagada.
+
+    Args:
+        planejados: Dicionário {arquivo bronze: recurso} (ver `planejar_downloads`).
+        output_dir: Pasta da bronze.
+        workers: Downloads simultâneos.
+        compressao: Formato de compressão ("gz", "zst") ou None.
+
+    Returns:
+        Tupla (arquivos baixados, arquivos inalterados, {arquivo: erro}), com
+        os nomes dos arquivos gravados.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifesto_path = os.path.join(output_dir, "_manifest.json")
+    registros = carregar_manifesto(manifesto_path).get("arquivos", {})
+    nomes = {nome: nome_comprimido(nome, compressao) for nome in planejados}
+
+    baixados, inalterados, erros = [], [], {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(planejados)))) as executor:
+        futuros = {
+            executor.submit(
+                _baixar_e_verificar, nomes[nome], recurso, output_dir,
+                registros.get(nomes[nome]), compressao,
+            ): nome
+            for nome, recurso in planejados.items()
+        }
+        for futuro in as_completed(futuros):
+            nome = futuros[futuro]
+            gravado = nomes[nome]
+            try:
+                baixado, registro = futuro.result()
+            except Exception as e:
+                erros[gravado] = e
+                print(f"falha no download de {gravado}: {e!r}")
+                continue
+            for antigo in _remover_outros_formatos(output_dir, nome, compressao):
+                registros.pop(antigo, None)
+            registros[gravado] = registro
+            (baixados if baixado else inalterados).append(gravado)
+            print(f"{'sucesso' if baixado else 'inalterado'}: {gravado} em {output_dir}")
+
+    salvar_manifesto(manifesto_path, {"arquivos": registros})
+    return sorted(baixados), sorted(inalterados), erros
+
 
 def download_resource(page, target_locator, nome_arquivo):
     """
     Recebe um locator (li), abre o menu e faz o download.
     """
-    # abre o dropdown 'EXPLORAR' do item 
+    # abre o dropdown 'EXPLORAR' do item
     target_locator.locator("a.dropdown-toggle").click()
 
     # clica em 'Baixar' e aguarda o evento de download
@@ -22,43 +564,130 @@ def download_resource(page, target_locator, nome_arquivo):
     download.save_as(caminho)
     print(f"sucesso: {nome_arquivo} salvo em {OUTPUT_DIR}")
 
-def run_bronze_ingestion():
-    """Roda o processo de ingestão dos datasets da mobilidade urbana de BH."""
-    
+
+def baixar_com_navegador(arquivos=tuple(DATASETS)):
+    """Baixa os arquivos navegando pelo portal com Playwright (alternativa à API)."""
+    # importado só aqui: o navegador é necessário apenas na alternativa
+    from playwright.sync_api import sync_playwright
+
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         context = browser.new_context(accept_downloads=True)
         page = context.new_page()
 
-        # define um timeout maior 
+        # define um timeout maior
         page.set_default_timeout(2*60*1000)
-        
-        # Acessa a página principal
-        print(f"Acessando {BASE_URL}...")
-        page.goto(BASE_URL)
 
         # ===================================
         # DATASET 1 — MCO (Último da lista)
         # ==================================
-        print("Acessando MCO...")
-        page.get_by_role("link",name="Mapa de Controle Operacional (MCO) Consolidado",exact=True).first.click()
-        
-        # Pega o último li.resource-item da página (o mais recente)
-        target_mco = page.locator("li.resource-item").last
-        download_resource(page, target_mco, "mco_consolidado.csv")
+        if "mco_consolidado.csv" in arquivos:
+            print(f"Acessando {BASE_URL}...")
+            page.goto(BASE_URL)
+
+            print("Acessando MCO...")
+            page.get_by_role("link",name="Mapa de Controle Operacional (MCO) Consolidado",exact=True).first.click()
+
+            # Pega o último li.resource-item da página (o mais recente)
+            target_mco = page.locator("li.resource-item").last
+            download_resource(page, target_mco, "mco_consolidado.csv")
 
         # ============================================
         # DATASET 2 — Tempo Real (Filtrado por texto)
         # ============================================
-        print("Voltando para a página inicial...")
-        page.goto(BASE_URL)
-        
-        print("Entrando em Tempo Real Ônibus - Coordenada atualizada...")
-        page.get_by_role("link",name="Tempo Real Ônibus - Coordenada atualizada",exact=True).first.click()
-        
-        # Pega o li.resource-item que contém o texto exato 'ARQUIVO CSV'
-        target_tempo_real = page.locator("li.resource-item").filter(has_text="ARQUIVO CSV")
-        download_resource(page, target_tempo_real, "onibus_tempo_real.csv")
+        if "onibus_tempo_real.csv" in arquivos:
+            print("Voltando para a página inicial...")
+            page.goto(BASE_URL)
+
+            print("Entrando em Tempo Real Ônibus - Coordenada atualizada...")
+            page.get_by_role("link",name="Tempo Real Ônibus - Coordenada atualizada",exact=True).first.click()
+
+            # Pega o li.resource-item que contém o texto exato 'ARQUIVO CSV'
+            target_tempo_real = page.locator("li.resource-item").filter(has_text="ARQUIVO CSV")
+            download_resource(page, target_tempo_real, "onibus_tempo_real.csv")
 
         browser.close()
 
+
+def run_bronze_ingestion(
+    usar_navegador=False,
+    mco="ultimo",
+    workers=WORKERS,
+    compressao=FORMATO_BRONZE,
+    datasets=None,
+):
+    """
+    Roda o processo de ingestão dos datasets da mobilidade urbana de BH.
+
+    Args:
+        usar_navegador: Se True, usa direto o Playwright. Se False, baixa pela
+            API CKAN e só recorre ao navegador para os arquivos que falharem.
+        mco: Meses do MCO a baixar (ver `planejar_downloads`).
+        workers: Downloads simultâneos.
+        compressao: Formato de compressão dos arquivos ("gz", "zst") ou None.
+            Os arquivos baixados pelo navegador ficam sem compressão.
+        datasets: Baixar só estes datasets ("mco", "tempo_real"); None baixa
+            todos.
+
+    Raises:
+        RuntimeError: Se algum mês histórico do MCO falhar (os arquivos
+            principais ainda têm a alternativa do navegador).
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    if compressao:
+        # falha logo se o formato não estiver disponível (ex.: sem zstandard)
+        novo_compressor(compressao)
+    principais = filtrar_datasets(DATASETS, datasets)
+    if usar_navegador:
+        baixar_com_navegador(principais)
+        return
+
+    try:
+        planejados = planejar_downloads(mco)
+    except (OSError, ValueError) as e:
+        # URLError e HTTPError são subclasses de OSError
+        print(f"falha ao consultar a API CKAN: {e!r}")
+        print("Usando o navegador para os arquivos principais")
+        baixar_com_navegador(principais)
+        return
+    planejados = {n: planejados[n] for n in filtrar_datasets(planejados, datasets)}
+
+    print(f"Bronze: {len(planejados)} arquivos, {workers} downloads simultâneos")
+    _, _, erros = baixar_recursos(planejados, OUTPUT_DIR, workers, compressao)
+
+    principais = [
+        nome for nome in principais if nome_comprimido(nome, compressao) in erros
+    ]
+    if principais:
+        print(f"Usando o navegador para: {', '.join(principais)}")
+        baixar_com_navegador(principais)
+
+    historicos = sorted(set(erros) - set(principais))
+    if historicos:
+        raise RuntimeError(
+            f"Bronze falhou para {len(historicos)} arquivos: {', '.join(historicos)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestão da camada bronze.")
+    parser.add_argument(
+        "--mco", nargs="+", default=["ultimo"],
+        help="'ultimo', 'todos', N (os N meses mais recentes) ou nomes de recursos",
+    )
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--navegador", action="store_true")
+    parser.add_argument("--dataset", nargs="+", choices=list(PREFIXOS_DATASET))
+    parser.add_argument(
+        "--compressao", choices=["gz", "zst", "nenhuma"], default=FORMATO_BRONZE,
+        help="formato dos arquivos na bronze ('zst' requer o pacote zstandard)",
+    )
+    args = parser.parse_args()
+
+    mco = args.mco
+    if len(mco) == 1 and mco[0] in ("ultimo", "todos"):
+        mco = mco[0]
+    elif len(mco) == 1 and mco[0].isdigit():
+        mco = int(mco[0])
+    compressao = None if args.compressao == "nenhuma" else args.compressao
+    run_bronze_ingestion(args.navegador, mco, args.workers, compressao, args.dataset)
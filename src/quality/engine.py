@@ -0,0 +1,467 @@
+"""
+Motor de regras de qualidade de dados da camada gold.
+
+As regras declaradas em `src.quality.rules` são avaliadas por tabela, em duas
+fases:
+
+1. metadados: regras que as estatísticas dos row groups respondem sozinhas
+   (contagem de nulos, min/max dentro do intervalo) ou que dependem só da
+   coluna de partição (`data_key`, que vem do nome da pasta) são resolvidas
+   lendo apenas o rodapé dos arquivos parquet;
+2. varredura: as demais regras da tabela são avaliadas juntas em uma única
+   leitura em lotes, só das colunas necessárias, com operações vetorizadas
+   do Arrow/NumPy.
+
+O resultado é um relatório JSON com o status, o número de violações e alguns
+exemplos de cada regra. Com `dias` ou `novos`, só as partições pedidas (ou
+gravadas desde o último relatório) dos fatos são verificadas.
+"""
+import argparse
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.quality.rules import REGRAS
+from src.transform.gold.partitions import (
+    ARQUIVO_PARTICAO,
+    COLUNA_PARTICAO,
+    listar_particoes,
+    pasta_particao,
+)
+from src.transform.manifest import (
+    carregar_manifesto,
+    impressao_digital,
+    mesma_impressao,
+    salvar_manifesto,
+)
+
+GOLD_DIR = Path("data/gold/mobilidade_bh")
+RELATORIO = Path("data/quality/mobilidade_bh/relatorio.json")
+
+LINHAS_POR_LOTE = 256_000
+MAX_EXEMPLOS = 5
+
+
+def arquivos_tabela(tabela: str, dias=None) -> list[tuple[Path, dict]]:
+    """
+    Arquivos parquet de uma tabela da gold e os valores de partição de cada um.
+
+    Args:
+        tabela: Nome da tabela (dimensão `<tabela>.parquet` ou fato particionado).
+        dias: data_key a considerar nos fatos (todos se None).
+
+    Raises:
+        FileNotFoundError: Se a tabela não existir.
+    """
+    dimensao = GOLD_DIR / f"{tabela}.parquet"
+    if dimensao.exists():
+        return [(dimensao, {})]
+
+    dataset = GOLD_DIR / tabela
+    if not dataset.is_dir():
+        raise FileNotFoundError(f"Tabela não encontrada na gold: {tabela}")
+
+    valores = listar_particoes(dataset)
+    if dias is not None:
+        pedidos = {int(d) for d in dias}
+        valores = [v for v in valores if v in pedidos]
+    return [
+        (pasta_particao(dataset, v) / ARQUIVO_PARTICAO, {COLUNA_PARTICAO: v})
+        for v in valores
+    ]
+
+
+def _exemplos(valores) -> list:
+    """Primeiros valores violadores, em tipos aceitos pelo JSON."""
+    return [
+        v if v is None or isinstance(v, (bool, int, float, str)) else str(v)
+        for v in pa.array(valores)[:MAX_EXEMPLOS].to_pylist()
+    ]
+
+
+def _ler_coluna(tabela: str, coluna: str) -> pa.Array:
+    """Valores distintos e não nulos de uma coluna (tabelas de referência)."""
+    partes = []
+    for arquivo, particao in arquivos_tabela(tabela):
+        if coluna in particao:
+            partes.append(pa.array([particao[coluna]], type=pa.int32()))
+        else:
+            partes.append(pq.read_table(arquivo, columns=[coluna]).column(0).combine_chunks())
+    if not partes:
+        return pa.array([], type=pa.int64())
+    return pc.unique(pa.concat_arrays(partes).drop_null())
+
+
+# ---------------------------------------------------------------------------
+# Fase 1: metadados
+# ---------------------------------------------------------------------------
+
+def _por_metadados(regra: dict, arquivos, metas: dict, referencias: dict):
+    """
+    Tentar responder a regra só com os metadados dos arquivos.
+
+    Returns:
+        Tupla (violações, exemplos) ou None se for preciso ler os dados.
+    """
+    tipo = regra["tipo"]
+    if tipo == "unico":
+        return None
+
+    violacoes = 0
+    exemplos = []
+    for coluna in regra["colunas"]:
+        for arquivo, particao in arquivos:
+            meta = metas[arquivo]
+
+            # coluna de partição: um valor (não nulo) por arquivo
+            if coluna in particao:
+                valor = particao[coluna]
+                if tipo == "intervalo":
+                    fora = not regra["minimo"] <= valor <= regra["maximo"]
+                elif tipo == "chave_estrangeira":
+                    fora = not pc.is_in(
+                        pa.array([valor], type=referencias[regra["nome"]].type),
+                        value_set=referencias[regra["nome"]],
+                    )[0].as_py()
+                else:
+                    fora = False
+                if fora:
+                    violacoes += meta.num_rows
+                    exemplos.append(valor)
+                continue
+
+            if tipo == "chave_estrangeira":
+                return None
+
+            nomes = meta.schema.names
+            if coluna not in nomes:
+                return None
+            indice = nomes.index(coluna)
+            for rg in range(meta.num_row_groups):
+                estatisticas = meta.row_group(rg).column(indice).statistics
+                if estatisticas is None or not estatisticas.has_null_count:
+                    return None
+                if tipo in ("nao_nulo", "taxa_nulos"):
+                    violacoes += estatisticas.null_count
+                elif estatisticas.num_values:
+                    # min/max fora do intervalo: a varredura conta as violações
+                    if not estatisticas.has_min_max or (
+                        estatisticas.min < regra["minimo"]
+                        or estatisticas.max > regra["maximo"]
+                    ):
+                        return None
+
+    if tipo == "taxa_nulos":
+        linhas = sum(metas[arquivo].num_rows for arquivo, _ in arquivos)
+        violacoes, exemplos = _taxa_excedida(regra, violacoes, linhas)
+    return violacoes, exemplos[:MAX_EXEMPLOS]
+
+
+def _taxa_excedida(regra: dict, nulos: int, linhas: int) -> tuple[int, list]:
+    """Violações de `taxa_nulos`: todos os nulos se a fração passar do máximo."""
+    taxa = nulos / linhas if linhas else 0.0
+    if taxa <= regra["maximo"]:
+        return 0, []
+    return nulos, [round(taxa, 4)]
+
+
+# ---------------------------------------------------------------------------
+# Fase 2: varredura (kernels vetorizados por lote)
+# ---------------------------------------------------------------------------
+
+def _kernel_nao_nulo(regra, estado, lote):
+    estado["violacoes"] += sum(lote[c].null_count for c in regra["colunas"])
+
+
+def _kernel_taxa_nulos(regra, estado, lote):
+    coluna = lote[regra["colunas"][0]]
+    estado["violacoes"] += coluna.null_count
+    estado["linhas"] += len(coluna)
+
+
+def _kernel_intervalo(regra, estado, lote):
+    valores = lote[regra["colunas"][0]]
+    fora = pc.or_(
+        pc.less(valores, regra["minimo"]), pc.greater(valores, regra["maximo"])
+    )
+    n = pc.sum(fora).as_py() or 0
+    if n:
+        estado["violacoes"] += n
+        if len(estado["exemplos"]) < MAX_EXEMPLOS:
+            estado["exemplos"] += _exemplos(pc.filter(valores, fora))
+
+
+def _kernel_unico(regra, estado, lote):
+    colunas = [lote[c] for c in regra["colunas"]]
+    validas = colunas[0].is_valid()
+    for coluna in colunas[1:]:
+        validas = pc.and_(validas, coluna.is_valid())
+
+    if len(colunas) == 1 and pa.types.is_integer(colunas[0].type):
+        chaves = pc.filter(colunas[0], validas).to_numpy().astype("int64")
+    else:
+        # combinações de colunas (ou texto) viram um hash de 8 bytes por linha
+        df = pa.table(dict(zip(regra["colunas"], colunas))).filter(validas).to_pandas()
+        chaves = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        estado["hash"] = True
+    estado["chaves"].append(chaves)
+
+
+def _kernel_chave_estrangeira(regra, estado, lote):
+    valores = lote[regra["colunas"][0]]
+    referencia = estado["referencia"]
+    if referencia.type != valores.type:
+        referencia = estado["referencia"] = referencia.cast(valores.type)
+    fora = pc.and_(
+        valores.is_valid(), pc.invert(pc.is_in(valores, value_set=referencia))
+    )
+    n = pc.sum(fora).as_py() or 0
+    if n:
+        estado["violacoes"] += n
+        if len(estado["exemplos"]) < MAX_EXEMPLOS:
+            estado["exemplos"] += _exemplos(pc.filter(valores, fora))
+
+
+KERNELS = {
+    "nao_nulo": _kernel_nao_nulo,
+    "intervalo": _kernel_intervalo,
+    "unico": _kernel_unico,
+    "chave_estrangeira": _kernel_chave_estrangeira,
+    "taxa_nulos": _kernel_taxa_nulos,
+}
+
+
+def _finalizar_unico(estado):
+    """Conta as linhas repetidas a partir das chaves acumuladas."""
+    chaves = np.sort(np.concatenate(estado["chaves"])) if estado["chaves"] else []
+    if len(chaves) < 2:
+        return
+    repetidas = chaves[1:][chaves[1:] == chaves[:-1]]
+    estado["violacoes"] = len(repetidas)
+    if not estado.get("hash"):
+        estado["exemplos"] = _exemplos(np.unique(repetidas))
+
+
+def _varrer(regras: list[dict], arquivos, referencias: dict) -> dict:
+    """
+    Avaliar várias regras de uma tabela em uma única leitura dos arquivos.
+
+    Returns:
+        Dicionário {nome da regra: estado final (violações e exemplos)}.
+    """
+    colunas = sorted({c for regra in regras for c in regra["colunas"]})
+    estados = {
+        regra["nome"]: {
+            "violacoes": 0,
+            "exemplos": [],
+            "chaves": [],
+            "linhas": 0,
+            "referencia": referencias.get(regra["nome"]),
+        }
+        for regra in regras
+    }
+
+    for arquivo, particao in arquivos:
+        lidas = [c for c in colunas if c not in particao]
+        for lote in pq.ParquetFile(arquivo).iter_batches(
+            batch_size=LINHAS_POR_LOTE, columns=lidas
+        ):
+            valores = {c: lote.column(c) for c in lidas}
+            for c in colunas:
+                if c in particao:
+                    valores[c] = pa.array(
+                        np.full(lote.num_rows, particao[c], dtype="int32")
+                    )
+            for regra in regras:
+                KERNELS[regra["tipo"]](regra, estados[regra["nome"]], valores)
+
+    for regra in regras:
+        estado = estados[regra["nome"]]
+        if regra["tipo"] == "unico":
+            _finalizar_unico(estado)
+        elif regra["tipo"] == "taxa_nulos":
+            estado["violacoes"], estado["exemplos"] = _taxa_excedida(
+                regra, estado["violacoes"], estado["linhas"]
+            )
+    return estados
+
+
+# ---------------------------------------------------------------------------
+# Execução
+# ---------------------------------------------------------------------------
+
+def _resultado(regra, status, **campos) -> dict:
+    return {
+        "nome": regra["nome"],
+        "tabela": regra["tabela"],
+        "tipo": regra["tipo"],
+        "colunas": regra["colunas"],
+        "status": status,
+        **campos,
+    }
+
+
+def avaliar_tabela(tabela: str, regras: list[dict], arquivos) -> tuple[list[dict], int]:
+    """
+    Avaliar as regras de uma tabela sobre os arquivos informados.
+
+    Returns:
+        Tupla (resultados das regras, linhas verificadas).
+    """
+    metas = {arquivo: pq.read_metadata(arquivo) for arquivo, _ in arquivos}
+    linhas = sum(meta.num_rows for meta in metas.values())
+
+    referencias = {}
+    resultados = {}
+    pendentes = []
+    for regra in regras:
+        try:
+            if regra["tipo"] == "chave_estrangeira":
+                referencias[regra["nome"]] = _ler_coluna(
+                    regra["referencia"], regra["coluna_referencia"]
+                )
+            resposta = _por_metadados(regra, arquivos, metas, referencias)
+        except Exception as e:
+            resultados[regra["nome"]] = _resultado(regra, "erro", erro=repr(e))
+            continue
+        if resposta is None:
+            pendentes.append(regra)
+            continue
+        violacoes, exemplos = resposta
+        resultados[regra["nome"]] = _resultado(
+            regra, "falha" if violacoes else "ok",
+            violacoes=int(violacoes), exemplos=exemplos, fonte="metadados",
+        )
+
+    if pendentes:
+        try:
+            estados = _varrer(pendentes, arquivos, referencias)
+        except Exception as e:
+            for regra in pendentes:
+                resultados[regra["nome"]] = _resultado(regra, "erro", erro=repr(e))
+        else:
+            for regra in pendentes:
+                estado = estados[regra["nome"]]
+                resultados[regra["nome"]] = _resultado(
+                    regra, "falha" if estado["violacoes"] else "ok",
+                    violacoes=int(estado["violacoes"]),
+                    exemplos=estado["exemplos"][:MAX_EXEMPLOS],
+                    fonte="varredura",
+                )
+
+    return [resultados[regra["nome"]] for regra in regras], linhas
+
+
+def avaliar_regras(
+    regras: list[dict] | None = None,
+    dias=None,
+    novos: bool = False,
+    relatorio: Path | None = RELATORIO,
+) -> dict:
+    """
+    Avaliar as regras de qualidade e gravar o relatório.
+
+    Args:
+        regras: Regras a avaliar (todas de `REGRAS` se None).
+        dias: data_key dos fatos a verificar (todos se None). As dimensões
+            são sempre verificadas por inteiro.
+        novos: Se True, só os arquivos (partições e dimensões) gravados ou
+            alterados desde o relatório anterior são verificados.
+        relatorio: Caminho do relatório JSON (None para não gravar).
+
+    Returns:
+        Relatório com o resultado de cada regra e o campo `ok` (nenhuma
+        regra com falha ou erro).
+    """
+    regras = REGRAS if regras is None else regras
+    anterior = carregar_manifesto(relatorio).get("arquivos", {}) if relatorio else {}
+    verificados = dict(anterior) if novos else {}
+
+    por_tabela = {}
+    for regra in regras:
+        por_tabela.setdefault(regra["tabela"], []).append(regra)
+
+    resultados = []
+    tabelas = {}
+    for tabela, regras_tabela in por_tabela.items():
+        inicio = time.perf_counter()
+        try:
+            arquivos = arquivos_tabela(tabela, dias)
+        except FileNotFoundError as e:
+            resultados += [_resultado(r, "erro", erro=repr(e)) for r in regras_tabela]
+            continue
+
+        digitais = {
+            str(arquivo.relative_to(GOLD_DIR)): impressao_digital(arquivo, com_hash=False)
+            for arquivo, _ in arquivos
+        }
+        if novos:
+            arquivos = [
+                (arquivo, particao) for arquivo, particao in arquivos
+                if not mesma_impressao(
+                    arquivo, anterior.get(str(arquivo.relative_to(GOLD_DIR)))
+                )
+            ]
+        if not arquivos:
+            resultados += [_resultado(r, "pulada", violacoes=0) for r in regras_tabela]
+            continue
+
+        resultados_tabela, linhas = avaliar_tabela(tabela, regras_tabela, arquivos)
+        resultados += resultados_tabela
+        if all(r["status"] == "ok" for r in resultados_tabela):
+            # só arquivos aprovados deixam de ser verificados com `novos`
+            verificados.update(digitais)
+
+        segundos = time.perf_counter() - inicio
+        tabelas[tabela] = {
+            "arquivos": len(arquivos),
+            "linhas": linhas,
+            "segundos": round(segundos, 3),
+        }
+        falhas = sum(r["status"] != "ok" for r in resultados_tabela)
+        print(
+            f"Qualidade: {tabela} - {len(regras_tabela)} regras, {falhas} com "
+            f"problema ({linhas} linhas, {segundos:.2f}s)"
+        )
+
+    saida = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "dias": sorted(int(d) for d in dias) if dias is not None else None,
+        "ok": all(r["status"] in ("ok", "pulada") for r in resultados),
+        "tabelas": tabelas,
+        "regras": resultados,
+        "arquivos": verificados,
+    }
+    if relatorio:
+        salvar_manifesto(relatorio, saida)
+
+    for r in resultados:
+        if r["status"] in ("falha", "erro"):
+            print(
+                f"Qualidade: {r['status']} em {r['nome']}: "
+                f"{r.get('violacoes', r.get('erro'))} {r.get('exemplos', '')}"
+            )
+    return saida
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verificar a qualidade da camada gold.")
+    parser.add_argument(
+        "--dias", nargs="+", type=int, metavar="DATA_KEY",
+        help="partições dos fatos a verificar (padrão: todas)",
+    )
+    parser.add_argument(
+        "--novos", action="store_true",
+        help="só arquivos gravados ou alterados desde o último relatório",
+    )
+    parser.add_argument("--relatorio", type=Path, default=RELATORIO)
+    args = parser.parse_args()
+
+    if not avaliar_regras(dias=args.dias, novos=args.novos, relatorio=args.relatorio)["ok"]:
+        raise SystemExit(1)
@@ -0,0 +1,112 @@
+"""
+Regras de qualidade de dados da camada gold.
+
+Cada regra é um dicionário declarativo (tabela, tipo, colunas e parâmetros),
+avaliado por `src.quality.engine`. Os construtores abaixo só montam o
+dicionário e um nome padrão; para incluir uma verificação basta acrescentar
+uma linha em `REGRAS`.
+
+Tipos de regra:
+
+* `nao_nulo`: nenhuma das colunas tem valor nulo;
+* `intervalo`: valores (não nulos) entre `minimo` e `maximo`, inclusivos;
+* `unico`: a combinação das colunas não se repete (linhas com nulo ignoradas);
+* `chave_estrangeira`: todo valor não nulo existe na coluna da tabela de
+  referência;
+* `taxa_nulos`: a fração de linhas com a coluna nula não passa de `maximo`.
+  Complementa `chave_estrangeira`, que ignora nulos: uma chave que deixou de
+  ser resolvida fica nula em todas as linhas e passaria sem aviso.
+"""
+
+# Fração máxima de linhas sem chave substituta nos fatos
+MAXIMO_NULOS_CHAVE = 0.05
+
+
+def nao_nulo(tabela, *colunas, nome=None):
+    """Regra: as colunas não têm valores nulos."""
+    return {
+        "nome": nome or f"{tabela}_{'_'.join(colunas)}_nao_nulo",
+        "tabela": tabela,
+        "tipo": "nao_nulo",
+        "colunas": list(colunas),
+    }
+
+
+def intervalo(tabela, coluna, minimo, maximo, nome=None):
+    """Regra: os valores da coluna estão entre `minimo` e `maximo`."""
+    return {
+        "nome": nome or f"{tabela}_{coluna}_intervalo",
+        "tabela": tabela,
+        "tipo": "intervalo",
+        "colunas": [coluna],
+        "minimo": minimo,
+        "maximo": maximo,
+    }
+
+
+def unico(tabela, *colunas, nome=None):
+    """Regra: a combinação das colunas identifica cada linha."""
+    return {
+        "nome": nome or f"{tabela}_{'_'.join(colunas)}_unico",
+        "tabela": tabela,
+        "tipo": "unico",
+        "colunas": list(colunas),
+    }
+
+
+def chave_estrangeira(tabela, coluna, referencia, coluna_referencia=None, nome=None):
+    """Regra: os valores da coluna existem na tabela de referência."""
+    return {
+        "nome": nome or f"{tabela}_{coluna}_existe_em_{referencia}",
+        "tabela": tabela,
+        "tipo": "chave_estrangeira",
+        "colunas": [coluna],
+        "referencia": referencia,
+        "coluna_referencia": coluna_referencia or coluna,
+    }
+
+
+def taxa_nulos(tabela, coluna, maximo, nome=None):
+    """Regra: no máximo a fração `maximo` das linhas tem a coluna nula."""
+    return {
+        "nome": nome or f"{tabela}_{coluna}_taxa_nulos",
+        "tabela": tabela,
+        "tipo": "taxa_nulos",
+        "colunas": [coluna],
+        "maximo": maximo,
+    }
+
+
+REGRAS = [
+    # dimensões
+    unico("dim_data", "data_key"),
+    nao_nulo("dim_data", "data_key"),
+    unico("dim_linha", "linha_key"),
+    nao_nulo("dim_linha", "linha"),
+    unico("dim_veiculo", "veiculo_key"),
+    unico("dim_empresa", "empresa_key"),
+    unico("dim_concessionaria", "concessionaria_key"),
+
+    # fato do MCO
+    nao_nulo("fato_mco_viagem", "data_key"),
+    chave_estrangeira("fato_mco_viagem", "data_key", "dim_data"),
+    chave_estrangeira("fato_mco_viagem", "linha_key", "dim_linha"),
+    chave_estrangeira("fato_mco_viagem", "veiculo_key", "dim_veiculo"),
+    chave_estrangeira("fato_mco_viagem", "empresa_key", "dim_empresa"),
+    chave_estrangeira("fato_mco_viagem", "concessionaria_key", "dim_concessionaria"),
+    taxa_nulos("fato_mco_viagem", "linha_key", MAXIMO_NULOS_CHAVE),
+    taxa_nulos("fato_mco_viagem", "veiculo_key", MAXIMO_NULOS_CHAVE),
+    taxa_nulos("fato_mco_viagem", "empresa_key", MAXIMO_NULOS_CHAVE),
+    taxa_nulos("fato_mco_viagem", "concessionaria_key", MAXIMO_NULOS_CHAVE),
+    intervalo("fato_mco_viagem", "hora_saida", 0, 86_399),
+    intervalo("fato_mco_viagem", "hora_chegada", 0, 86_399),
+
+    # fato do Tempo Real
+    nao_nulo("fato_tempo_real_evento", "data_key"),
+    chave_estrangeira("fato_tempo_real_evento", "linha_key", "dim_linha"),
+    chave_estrangeira("fato_tempo_real_evento", "veiculo_key", "dim_veiculo"),
+    taxa_nulos("fato_tempo_real_evento", "linha_key", MAXIMO_NULOS_CHAVE),
+    taxa_nulos("fato_tempo_real_evento", "veiculo_key", MAXIMO_NULOS_CHAVE),
+    intervalo("fato_tempo_real_evento", "latitude", -90, 90),
+    intervalo("fato_tempo_real_evento", "longitude", -180, 180),
+]
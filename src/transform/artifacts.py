@@ -0,0 +1,178 @@
+"""
+Tabelas em memória compartilhadas entre as etapas de uma execução.
+
+Dentro de `sessao()` (aberta pelo run_pipeline), cada parquet gravado ou lido
+pela silver e pelas dimensões fica guardado como tabela Arrow, indexado pelo
+caminho. As etapas seguintes recebem a tabela da memória em vez de decodificar
+o arquivo de novo: a gravação em disco continua acontecendo, só a releitura é
+evitada. Tabelas Arrow são imutáveis, então a mesma tabela pode ser entregue
+a etapas rodando em threads diferentes.
+
+Uma tabela só é usada se o arquivo ainda tem o tamanho e o mtime de quando
+foi guardado, e se tem todas as colunas pedidas (leituras de parte das
+colunas guardam só essas colunas). O total guardado é limitado por
+`PIPELINE_CACHE_MB` (padrão 4096); ao passar do limite, as tabelas usadas há
+mais tempo são descartadas. Fora de uma sessão nada é guardado e as leituras
+vão direto ao disco, como antes.
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.transform.instrumentation import registrar
+
+LIMITE_MB = int(os.environ.get("PIPELINE_CACHE_MB", 4096))
+
+_trava = threading.Lock()
+# caminho -> ((tamanho, mtime_ns) do arquivo, tabela), do menos ao mais usado
+_tabelas = OrderedDict()
+_limite_bytes = None
+
+
+def _chave(caminho) -> str:
+    return str(Path(caminho).resolve())
+
+
+def _impressao(caminho) -> tuple[int, int] | None:
+    try:
+        st = os.stat(caminho)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def ativo() -> bool:
+    """Indica se há uma sessão aberta."""
+    return _limite_bytes is not None
+
+
+@contextmanager
+def sessao(limite_mb: int = LIMITE_MB):
+    """
+    Guardar em memória as tabelas gravadas e lidas enquanto a sessão durar.
+
+    Args:
+        limite_mb: Total de memória (MB) usado pelas tabelas guardadas.
+    """
+    global _limite_bytes
+    with _trava:
+        _tabelas.clear()
+        _limite_bytes = limite_mb * 1024**2
+    try:
+        yield
+    finally:
+        with _trava:
+            _tabelas.clear()
+            _limite_bytes = None
+
+
+def guardar(caminho, tabela: pa.Table) -> None:
+    """Guardar a tabela que acabou de ser gravada em (ou lida de) `caminho`."""
+    if not ativo():
+        return
+    impressao = _impressao(caminho)
+    with _trava:
+        _tabelas.pop(_chave(caminho), None)
+        if impressao is None or tabela.nbytes > _limite_bytes:
+            return
+        _tabelas[_chave(caminho)] = (impressao, tabela)
+
+        total = sum(t.nbytes for _, t in _tabelas.values())
+        while total > _limite_bytes:
+            _, (_, descartada) = _tabelas.popitem(last=False)
+            total -= descartada.nbytes
+
+
+def obter(caminho, columns: list[str] | None = None) -> pa.Table | None:
+    """
+    Tabela guardada para `caminho`, ou None se não houver uma válida.
+
+    Args:
+        caminho: Arquivo parquet.
+        columns: Colunas necessárias (todas se None).
+    """
+    if not ativo():
+        return None
+    chave = _chave(caminho)
+    with _trava:
+        item = _tabelas.get(chave)
+        if item is None:
+            return None
+        impressao, tabela = item
+        if impressao != _impressao(caminho):
+            # o arquivo mudou desde que a tabela foi guardada
+            del _tabelas[chave]
+            return None
+        _tabelas.move_to_end(chave)
+
+    nomes = set(tabela.column_names)
+    if columns is None:
+        # só serve se a tabela guardada tem todas as colunas do arquivo
+        if nomes != set(pq.read_schema(caminho).names):
+            return None
+    elif not set(columns) <= nomes:
+        return None
+    registrar(tabelas_em_memoria=1)
+    return tabela
+
+
+def ler_tabela(
+    caminho,
+    columns: list[str] | None = None,
+    filtro: ds.Expression | None = None,
+) -> pa.Table:
+    """
+    Ler um parquet como tabela Arrow, da memória quando possível.
+
+    Args:
+        caminho: Arquivo parquet.
+        columns: Colunas a ler (todas se None).
+        filtro: Filtro do pyarrow aplicado às linhas. Com filtro, só uma
+            tabela guardada completa é usada (o filtro pode usar colunas fora
+            de `columns`), e a leitura do disco não é guardada.
+    """
+    if filtro is not None:
+        tabela = obter(caminho)
+        if tabela is None:
+            return pq.read_table(caminho, columns=columns, filters=filtro)
+        tabela = tabela.filter(filtro)
+    else:
+        tabela = obter(caminho, columns)
+        if tabela is None:
+            tabela = pq.read_table(caminho, columns=columns)
+            guardar(caminho, tabela)
+    if columns is not None:
+        tabela = tabela.select(columns)
+    return tabela
+
+
+def ler_parquet(
+    caminho,
+    columns: list[str] | None = None,
+    filtro: ds.Expression | None = None,
+) -> pd.DataFrame:
+    """Como `ler_tabela`, convertido para DataFrame."""
+    if not ativo():
+        return pd.read_parquet(caminho, columns=columns, filters=filtro)
+    return ler_tabela(caminho, columns, filtro).to_pandas()
+
+
+def dataset(caminho, columns: list[str] | None = None) -> ds.Dataset:
+    """
+    Dataset do pyarrow sobre a tabela guardada, ou sobre o arquivo.
+
+    Para leituras em lotes: se a tabela (com as colunas `columns`) não
+    estiver em memória, o arquivo é lido do disco aos poucos e nada é
+    guardado.
+    """
+    tabela = obter(caminho, columns)
+    if tabela is None:
+        return ds.dataset(caminho, format="parquet")
+    return ds.dataset(tabela)
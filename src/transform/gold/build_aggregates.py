@@ -0,0 +1,197 @@
+"""
+Construir agregados da camada gold a partir dos fatos.
+
+Os agregados são os rollups usados pelos painéis (viagens e passageiros por
+linha/dia/empresa, falhas mecânicas por veículo/dia, velocidade e eventos por
+linha/hora). Como todos são agrupados por dia, cada agregado é um dataset
+particionado por `data_key`, assim como os fatos: um dia novo no fato gera só
+a partição correspondente do agregado, sem reler nem recalcular o histórico.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from src.transform.gold.partitions import (
+    escrever_particao,
+    ler_dataset,
+    listar_particoes,
+    pasta_particao,
+)
+
+GOLD_DIR = Path("data/gold/mobilidade_bh")
+
+# Fatos de origem (datasets particionados por data_key)
+FATO_MCO = GOLD_DIR / "fato_mco_viagem"
+FATO_TR = GOLD_DIR / "fato_tempo_real_evento"
+
+# Agregados
+AGG_MCO_LINHA_DIA = GOLD_DIR / "agg_mco_linha_dia"
+AGG_FALHA_VEICULO_DIA = GOLD_DIR / "agg_falha_mecanica_veiculo_dia"
+AGG_TR_LINHA_HORA = GOLD_DIR / "agg_tr_linha_hora"
+
+
+def agregar_mco_linha_dia(fato: pd.DataFrame) -> pd.DataFrame:
+    """
+    Viagens e passageiros por linha, dia e empresa.
+
+    Args:
+        fato: Partições do fato de viagens do MCO.
+
+    Returns:
+        Uma linha por (data_key, linha_key, empresa_key), com o número de
+        viagens e a soma de `total_usuarios_viagem`.
+    """
+    return (
+        fato.groupby(["data_key", "linha_key", "empresa_key"], dropna=False, observed=True)
+        .agg(
+            viagens=("total_usuarios_viagem", "size"),
+            total_usuarios=("total_usuarios_viagem", "sum"),
+        )
+        .reset_index()
+        .astype({"viagens": "int32", "total_usuarios": "int64"})
+    )
+
+
+def agregar_falha_veiculo_dia(fato: pd.DataFrame) -> pd.DataFrame:
+    """
+    Falhas mecânicas por veículo e dia.
+
+    Args:
+        fato: Partições do fato de viagens do MCO.
+
+    Returns:
+        Uma linha por (data_key, veiculo_key), com o número de viagens e de
+        viagens com `indicador_falha_mecanica` igual a "S".
+    """
+    falha = (
+        fato["indicador_falha_mecanica"].astype(str).str.strip().str.upper() == "S"
+    )
+    return (
+        fato.assign(falha=falha.astype("int32"))
+        .groupby(["data_key", "veiculo_key"], dropna=False, observed=True)
+        .agg(viagens=("falha", "size"), falhas_mecanicas=("falha", "sum"))
+        .reset_index()
+        .astype({"viagens": "int32", "falhas_mecanicas": "int32"})
+    )
+
+
+def agregar_tr_linha_hora(fato: pd.DataFrame) -> pd.DataFrame:
+    """
+    Eventos e velocidade por linha e hora do dia.
+
+    A soma e a contagem de velocidades são mantidas junto da média, para que
+    o agregado possa ser somado por dia, semana etc. sem distorcer a média.
+
+    Args:
+        fato: Partições do fato de eventos em tempo real.
+
+    Returns:
+        Uma linha por (data_key, linha_key, hora), com o número de eventos, a
+        soma e a contagem de velocidades e a velocidade média.
+    """
+    velocidade = fato["velocidade_instantanea"].astype("float64")
+    agregado = (
+        pd.DataFrame({
+            "data_key": fato["data_key"],
+            "linha_key": fato["linha_key"],
+            "hora": fato["data_hora"].dt.hour.astype("int8"),
+            "velocidade": velocidade,
+        })
+        .groupby(["data_key", "linha_key", "hora"], dropna=False, observed=True)
+        .agg(
+            eventos=("velocidade", "size"),
+            soma_velocidade=("velocidade", "sum"),
+            eventos_com_velocidade=("velocidade", "count"),
+        )
+        .reset_index()
+        .astype({"eventos": "int32", "eventos_com_velocidade": "int32"})
+    )
+    agregado["velocidade_media"] = (
+        agregado["soma_velocidade"]
+        / agregado["eventos_com_velocidade"].replace(0, np.nan)
+    ).astype("float32")
+    return agregado
+
+
+# Agregado -> (fato de origem, colunas lidas do fato, função de agregação)
+AGREGADOS = {
+    AGG_MCO_LINHA_DIA: (
+        FATO_MCO,
+        ["data_key", "linha_key", "empresa_key", "total_usuarios_viagem"],
+        agregar_mco_linha_dia,
+    ),
+    AGG_FALHA_VEICULO_DIA: (
+        FATO_MCO,
+        ["data_key", "veiculo_key", "indicador_falha_mecanica"],
+        agregar_falha_veiculo_dia,
+    ),
+    AGG_TR_LINHA_HORA: (
+        FATO_TR,
+        ["data_key", "linha_key", "data_hora", "velocidade_instantanea"],
+        agregar_tr_linha_hora,
+    ),
+}
+
+
+def agregados_de(fato: Path) -> list[Path]:
+    """Agregados calculados a partir de um fato."""
+    return [a for a, (origem, _, _) in AGREGADOS.items() if Path(origem) == Path(fato)]
+
+
+def agregar_dia(agregado: Path, data_key: int) -> int:
+    """
+    (Re)calcular a partição de um dia de um agregado a partir do fato.
+
+    Só a partição do dia é lida do fato. Se o dia não existir mais no fato, a
+    partição do agregado é mantida.
+
+    Returns:
+        Número de linhas gravadas no agregado.
+    """
+    fato, colunas, agregar = AGREGADOS[agregado]
+    if not pasta_particao(fato, data_key).is_dir():
+        return 0
+
+    resultado = agregar(ler_dataset(fato, columns=colunas, valores=[data_key]))
+    escrever_particao(resultado, agregado, data_key)
+    return len(resultado)
+
+
+def atualizar_agregados(fato: Path, dias=None) -> dict[str, list[int]]:
+    """
+    Atualizar os agregados de um fato com os dias novos ou reconstruídos.
+
+    Além dos dias informados, qualquer dia presente no fato e ausente no
+    agregado (ex.: agregado criado depois do fato) é calculado. Os demais
+    dias não são lidos.
+
+    Args:
+        fato: Dataset do fato que recebeu partições.
+        dias: data_key gravados ou reconstruídos no fato.
+
+    Returns:
+        Dicionário {nome do agregado: dias atualizados}.
+    """
+    existentes_fato = set(listar_particoes(fato))
+    atualizados = {}
+
+    for agregado in agregados_de(fato):
+        faltantes = existentes_fato - set(listar_particoes(agregado))
+        pendentes = sorted(faltantes | {int(d) for d in (dias or [])})
+        for data_key in pendentes:
+            agregar_dia(agregado, data_key)
+
+        atualizados[agregado.name] = pendentes
+        print(f"Gold: {agregado.name} - {len(pendentes)} dias atualizados")
+
+    return atualizados
+
+
+def main() -> None:
+    """Completar todos os agregados com os dias que faltam nos fatos."""
+    for fato in (FATO_MCO, FATO_TR):
+        atualizar_agregados(fato)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,26 +3,139 @@ Construir tabelas de dimensão para a camada gold do data warehouse.
 
 Este módulo cria tabelas de dimensão normalizadas a partir de dados da camada silver,
 seguindo um padrão de esquema em estrela para o pipeline de análise de mobilidade.
+
+Por padrão as dimensões são mantidas de forma incremental: cada parquet de
+dimensão funciona como registro das chaves já atribuídas, e só os valores
+naturais que ainda não estão nele são acrescentados. A reconstrução completa
+a partir da silver fica para `main(reconstruir=True)`.
+
+Cada dimensão é construída por `construir_dimensao`, com o seu próprio
+manifesto e lendo só as colunas de que precisa; o run_pipeline a roda como
+uma etapa do grafo.
 """
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import numpy as np
 import pandas as pd
-import hashlib
+from src.transform import artifacts
+from src.transform.gold.partitions import ler_parquets
+from src.transform.gold.writer import escrever_parquet
+from src.transform.instrumentation import medir, registrar
+from src.transform.manifest import (
+    carregar_manifesto,
+    entradas_alteradas,
+    etapa_inalterada,
+    registrar_etapa,
+    salvar_manifesto,
+    versao_modulos,
+)
+
+# Módulos que definem o conteúdo das dimensões (versão gravada no manifesto)
+MODULOS = [
+    "src.transform.gold.build_dimensions",
+    "src.transform.gold.partitions",
+    "src.transform.gold.writer",
+    "src.transform.silver.clean_data",  # esquema da silver
+]
 
 SILVER_DIR = Path("data/silver/mobilidade_bh")
 GOLD_DIR = Path("data/gold/mobilidade_bh")
-GOLD_DIR.mkdir(parents=True, exist_ok=True)
+MANIFEST_DIR = GOLD_DIR / "_manifest"
 
-MCO_PATH = SILVER_DIR / "mco_consolidado.parquet"
+# A silver do MCO tem um arquivo por mês baixado (o mais recente sem sufixo)
+MCO_PADRAO = "mco_consolidado*.parquet"
 TR_PATH = SILVER_DIR / "onibus_tempo_real.parquet"
 
+# Dimensão -> (chave natural, chave substituta gerada por hash)
+DIMENSOES = {
+    "dim_data": ("data_key", None),
+    "dim_linha": ("linha", "linha_key"),
+    "dim_concessionaria": ("concessionaria_numero", "concessionaria_key"),
+    "dim_empresa": ("empresa_operadora", "empresa_key"),
+    "dim_veiculo": ("veiculo_id", "veiculo_key"),
+}
+
+# Chaves de 63 bits (positivas), -1 reservado para valores vazios
+MASCARA_CHAVE = np.uint64(2**63 - 1)
+CHAVE_VAZIA = -1
+
+
+def _hash_valores(texto: np.ndarray) -> np.ndarray:
+    """Hash determinístico de 64 bits de um array de textos, truncado a 63 bits."""
+    hashes = pd.util.hash_array(texto, categorize=True)
+    return (hashes & MASCARA_CHAVE).astype(np.int64)
+
+
+def generate_hash_keys(
+    valores: pd.Series,
+    dimensao: str = "",
+    reservadas=None,
+) -> pd.Series:
+    """
+    Gera IDs numéricos consistentes para uma coluna inteira de uma vez.
+
+    Os valores são convertidos para texto e passam por um hash de 64 bits
+    vetorizado (o mesmo valor gera sempre a mesma chave). Se dois valores
+    distintos caírem na mesma chave, a colisão é reportada e o valor que vem
+    depois na ordem alfabética recebe um novo hash com sufixo, de forma
+    determinística.
+
+    Args:
+        valores: Valores naturais da dimensão.
+        dimensao: Nome da dimensão, usado no aviso de colisão.
+        reservadas: Chaves já atribuídas a outros valores (registro da
+            dimensão). Um valor novo que caia em uma delas também é tratado
+            como colisão.
+
+    Returns:
+        Série int64 de chaves, com -1 para valores nulos ou vazios.
+    """
+    texto = valores.astype("string")
+    vazio = (texto.isna() | (texto == "")).to_numpy()
+    texto = texto.fillna("").to_numpy(dtype=object)
+
+    chaves = _hash_valores(texto)
+    chaves[vazio] = CHAVE_VAZIA
+
+    # detectar colisões entre valores distintos
+    distintos = (
+        pd.DataFrame({"valor": texto[~vazio], "chave": chaves[~vazio]})
+        .drop_duplicates("valor")
+        .sort_values("valor")
+    )
+    reservadas = set() if reservadas is None else set(reservadas)
+    colididos = distintos[
+        distintos["chave"].duplicated(keep="first")
+        | distintos["chave"].isin(reservadas)
+    ]
+
+    if not colididos.empty:
+        print(
+            f"Aviso: {len(colididos)} colisões de chave em {dimensao or 'dimensão'}; "
+            "reatribuindo com hash com sufixo."
+        )
+        usadas = set(distintos["chave"].tolist()) | reservadas
+        novas = {}
+        for valor in colididos["valor"]:
+            sufixo = 1
+            chave = int(_hash_valores(np.array([f"{valor}#{sufixo}"], dtype=object))[0])
+            while chave in usadas:
+                sufixo += 1
+                chave = int(_hash_valores(np.array([f"{valor}#{sufixo}"], dtype=object))[0])
+            usadas.add(chave)
+            novas[valor] = chave
+
+        # por posição, sem passar por float (que arredondaria as chaves de 63 bits)
+        substitutas = pd.Series(novas, dtype="int64")
+        pos = substitutas.index.get_indexer(texto)
+        chaves[pos >= 0] = substitutas.to_numpy()[pos[pos >= 0]]
+
+    return pd.Series(chaves, index=valores.index, dtype="int64")
+
+
 def generate_hash_key(val) -> int:
     """Gera um ID numérico consistente baseado no valor (seja ele texto ou número)."""
-    if pd.isna(val) or val == "":
-        return -1 
-    
-    val_str = str(val) 
-    
-    return int(hashlib.sha256(val_str.encode('utf-8')).hexdigest(), 16) % 10**8
+    return int(generate_hash_keys(pd.Series([val], dtype=object)).iloc[0])
 
 
 def build_dim_data(mco: pd.DataFrame, tr: pd.DataFrame) -> pd.DataFrame:
@@ -105,7 +218,7 @@ def build_dim_linha(mco: pd.DataFrame, tr: pd.DataFrame) -> pd.DataFrame:
         .reset_index(drop=True)
     )
     
-    dim_linha["linha_key"] = dim_linha["linha"].apply(generate_hash_key)
+    dim_linha["linha_key"] = generate_hash_keys(dim_linha["linha"], "linha")
 
     return dim_linha
 
@@ -128,7 +241,9 @@ def build_dim_concessionaria(mco: pd.DataFrame) -> pd.DataFrame:
         .reset_index(drop=True)
     )
     
-    dim["concessionaria_key"] = dim["concessionaria_numero"].apply(generate_hash_key)
+    dim["concessionaria_key"] = generate_hash_keys(
+        dim["concessionaria_numero"], "concessionaria"
+    )
 
     return dim
 
@@ -151,7 +266,7 @@ def build_dim_empresa(mco: pd.DataFrame) -> pd.DataFrame:
         .reset_index(drop=True)
     )
 
-    dim["empresa_key"] = dim["empresa_operadora"].apply(generate_hash_key)
+    dim["empresa_key"] = generate_hash_keys(dim["empresa_operadora"], "empresa")
 
     return dim
 
@@ -183,44 +298,190 @@ def build_dim_veiculo(mco: pd.DataFrame, tr: pd.DataFrame) -> pd.DataFrame:
         .reset_index(drop=True)
     )
     
-    dim["veiculo_key"] = dim["veiculo_id"].apply(generate_hash_key)
+    dim["veiculo_key"] = generate_hash_keys(dim["veiculo_id"], "veiculo")
 
     return dim
 
 
-def main() -> None:
+# Dimensão -> (função de construção, colunas do MCO, colunas do Tempo Real ou
+# None se a dimensão só vem do MCO)
+CONSTRUCAO = {
+    "dim_data": (build_dim_data, ["viagem_data"], ["data_hora"]),
+    "dim_linha": (build_dim_linha, ["linha_numero"], ["codigo_numero_linha"]),
+    "dim_concessionaria": (build_dim_concessionaria, ["concessionaria_numero"], None),
+    "dim_empresa": (build_dim_empresa, ["empresa_operadora"], None),
+    "dim_veiculo": (build_dim_veiculo, ["numero_ordem_veiculo"], ["numero_ordem_veiculo"]),
+}
+
+
+def _texto_canonico(valores: pd.Series) -> pd.Series:
+    """
+    Chave natural em uma forma de texto comparável entre tipos.
+
+    O registro gravado e os candidatos da silver podem trazer a mesma chave
+    com tipos diferentes (texto, inteiro, float, categoria); em texto
+    canônico 10356, 10356.0 e ' 10356' viram todos '10356'.
+    """
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        valores = valores.astype(valores.cat.categories.dtype)
+    if pd.api.types.is_float_dtype(valores):
+        numeros = valores.dropna()
+        if (numeros % 1 == 0).all():
+            valores = valores.astype("Int64")
+    return valores.astype("string").str.strip()
+
+
+def anexar_novos(
+    registro: pd.DataFrame,
+    candidatos: pd.DataFrame,
+    natural: str,
+    chave: str | None,
+    dimensao: str,
+) -> pd.DataFrame:
+    """
+    Acrescentar ao registro de uma dimensão apenas os valores naturais novos.
+
+    Args:
+        registro: Dimensão já gravada, com as chaves atribuídas anteriormente.
+        candidatos: Dimensão construída a partir da silver atual.
+        natural: Coluna da chave natural.
+        chave: Coluna da chave substituta por hash (None para dim_data).
+        dimensao: Nome da dimensão, usado nos avisos.
+
+    Returns:
+        Registro com os novos valores acrescentados ao final. As chaves dos
+        valores já existentes nunca mudam.
+    """
+    existentes = _texto_canonico(registro[natural])
+    novos = candidatos[~_texto_canonico(candidatos[natural]).isin(existentes)].copy()
+
+    if chave is not None and not novos.empty:
+        novos[chave] = generate_hash_keys(
+            novos[natural], dimensao, reservadas=registro[chave]
+        )
+
+    print(f"{dimensao}: {len(novos)} novos registros")
+    if novos.empty:
+        return registro
+    return pd.concat([registro, novos[registro.columns]], ignore_index=True)
+
+
+def arquivos_mco() -> list[Path]:
+    """Arquivos silver do MCO (todos os meses baixados)."""
+    return sorted(SILVER_DIR.glob(MCO_PADRAO))
+
+
+def entradas_novas(manifesto: dict, entradas, saidas, versao: str) -> list[Path]:
+    """
+    Arquivos da silver novos ou alterados desde a última construção.
+
+    Os valores dos arquivos inalterados já estão nos registros das dimensões.
+    Se a versão do código mudou ou falta algum registro, todas as entradas
+    são devolvidas.
+    """
+    if not all(Path(s).exists() for s in saidas):
+        return list(entradas)
+    return entradas_alteradas(manifesto, entradas, versao)
+
+
+def construir_dimensao(nome: str, forcar: bool = False, reconstruir: bool = False) -> bool:
+    """
+    Construir (ou atualizar) uma dimensão na camada gold.
+
+    Se os arquivos silver que a dimensão lê e o código não mudaram desde a
+    última construção (manifesto em `MANIFEST_DIR/<nome>.json`), nada é
+    refeito; no modo incremental, só os arquivos silver novos ou alterados
+    são lidos.
+
+    Args:
+        nome: Dimensão (chave de DIMENSOES).
+        forcar: Se True, processa a dimensão mesmo sem mudanças na silver.
+        reconstruir: Se True, descarta o registro existente e reconstrói a
+            dimensão do zero a partir da silver. Valores que saíram da silver
+            deixam de existir na dimensão.
+
+    Returns:
+        True se a dimensão foi processada, False se a silver não mudou.
+    """
+    funcao, colunas_mco, colunas_tr = CONSTRUCAO[nome]
+    natural, chave = DIMENSOES[nome]
+    caminho = GOLD_DIR / f"{nome}.parquet"
+    manifesto_path = MANIFEST_DIR / f"{nome}.json"
+
+    entradas = arquivos_mco() + ([TR_PATH] if colunas_tr else [])
+    versao = versao_modulos(*MODULOS)
+    manifesto = carregar_manifesto(manifesto_path)
+
+    if not (forcar or reconstruir) and etapa_inalterada(
+        manifesto, entradas, [caminho], versao
+    ):
+        print(f"{nome}: silver inalterada, nada a reconstruir.")
+        return False
+
+    lidas = entradas
+    if not (forcar or reconstruir):
+        lidas = entradas_novas(manifesto, entradas, [caminho], versao)
+    mco_lidos = [e for e in lidas if e != TR_PATH]
+
+    # Ler só as colunas da silver usadas por esta dimensão
+    print(f"{nome}: lendo a silver ({len(lidas)} de {len(entradas)} arquivos)...")
+    with medir("leitura"):
+        mco = (
+            ler_parquets(mco_lidos, columns=colunas_mco) if mco_lidos
+            else pd.DataFrame(columns=colunas_mco)
+        )
+        tr = (
+            artifacts.ler_parquet(TR_PATH, columns=colunas_tr) if TR_PATH in lidas
+            else pd.DataFrame(columns=colunas_tr or [])
+        )
+        registrar(linhas_entrada=len(mco) + len(tr))
+
+    with medir("construcao"):
+        dim = funcao(mco, tr) if colunas_tr else funcao(mco)
+
+    # Manter as chaves já atribuídas e acrescentar só os valores novos
+    alterada = True
+    if not reconstruir and caminho.exists():
+        with medir("juncao"):
+            registro = artifacts.ler_parquet(caminho)
+            dim = anexar_novos(registro, dim, natural, chave, nome)
+            alterada = len(dim) != len(registro)
+
+    if alterada:
+        with medir("escrita"):
+            GOLD_DIR.mkdir(parents=True, exist_ok=True)
+            # os fatos recebem a dimensão gravada sem reler o arquivo
+            artifacts.guardar(caminho, escrever_parquet(dim, caminho))
+            registrar(linhas_saida=len(dim))
+
+    salvar_manifesto(manifesto_path, registrar_etapa(entradas, versao))
+    return True
+
+
+def main(forcar: bool = False, reconstruir: bool = False, workers: int = len(DIMENSOES)) -> bool:
     """
     Função principal para construir e salvar todas as tabelas de dimensão.
 
-    Lê dados da camada silver e gera tabelas de dimensão na camada gold.
+    Usada pela linha de comando e pelos benchmarks; o run_pipeline roda cada
+    dimensão como uma etapa própria (ver `construir_dimensao`).
+
+    Args:
+        forcar: Se True, processa as dimensões mesmo sem mudanças na silver.
+        reconstruir: Se True, descarta os registros existentes e reconstrói as
+            dimensões do zero a partir da silver.
+        workers: Threads usadas para construir as dimensões, que são
+            independentes entre si e só leem os dados da silver.
+
+    Returns:
+        True se alguma dimensão foi processada, False se a silver não mudou.
     """
-    
     print("Iniciando a construção das dimensões Gold...")
-    
-    # Ler dados da camada silver
-    print("Lendo dados da camada silver...")
-    mco = pd.read_parquet(MCO_PATH)
-    tr = pd.read_parquet(TR_PATH)
-
-    # Construir dimensões
-    print("Construindo dimensões...")
-    dim_data = build_dim_data(mco, tr)
-    dim_linha = build_dim_linha(mco, tr)
-    dim_concessionaria = build_dim_concessionaria(mco)
-    dim_empresa = build_dim_empresa(mco)
-    dim_veiculo = build_dim_veiculo(mco, tr)
-
-    # Salvar dimensões na camada gold
-    print("Salvando dimensões na camada gold...")
-    dim_data.to_parquet(GOLD_DIR / "dim_data.parquet", index=False)
-    dim_linha.to_parquet(GOLD_DIR / "dim_linha.parquet", index=False)
-    dim_concessionaria.to_parquet(
-        GOLD_DIR / "dim_concessionaria.parquet", index=False
-    )
-    dim_empresa.to_parquet(GOLD_DIR / "dim_empresa.parquet", index=False)
-    dim_veiculo.to_parquet(GOLD_DIR / "dim_veiculo.parquet", index=False)
-
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        processadas = list(executor.map(
+            lambda nome: construir_dimensao(nome, forcar, reconstruir), DIMENSOES
+        ))
     print("Dimensões Gold geradas com sucesso.")
+    return any(processadas)
 
 
 if __name__ == "__main__":
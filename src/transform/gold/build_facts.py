@@ -3,17 +3,60 @@ Construir fatos para a camada gold.
 
 Este módulo cria tabelas de fatos para MCO (viagens consolidadas) e eventos
 em tempo real, enriquecendo dados da camada silver com chaves de dimensões.
+Os fatos são datasets parquet particionados por `data_key` (uma pasta por dia).
 """
 
+import argparse
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
+import pyarrow.dataset as ds
 from pathlib import Path
+from src.transform import artifacts
+from src.transform.gold.build_aggregates import (
+    agregados_de,
+    agregar_dia,
+    atualizar_agregados,
+)
+from src.transform.gold.partitions import (
+    ARQUIVO_PARTICAO,
+    escrever_particao,
+    escrever_particoes,
+    ler_parquets,
+    listar_particoes,
+    pasta_particao,
+    publicar_particao,
+)
+from src.transform.gold.spatial import atualizar_indice_espacial, celula_espacial
+from src.transform.gold.writer import escrever_parquet, mesclar_ordenados
+from src.transform.instrumentation import medir, registrar
+from src.transform.manifest import (
+    carregar_manifesto,
+    etapa_inalterada,
+    registrar_etapa,
+    salvar_manifesto,
+    versao_modulos,
+)
+
+# Módulos que definem o conteúdo dos fatos (versão gravada nos manifestos)
+MODULOS = [
+    "src.transform.gold.build_facts",
+    "src.transform.gold.build_aggregates",
+    "src.transform.gold.partitions",
+    "src.transform.gold.writer",
+    "src.transform.gold.spatial",
+    "src.transform.silver.clean_data",  # esquema da silver
+]
 
 # Caminhos para dados da camada silver
 SILVER_DIR = Path("data/silver/mobilidade_bh")
 GOLD_DIR = Path("data/gold/mobilidade_bh")
-GOLD_DIR.mkdir(parents=True, exist_ok=True)
 
-MCO_SILVER = SILVER_DIR / "mco_consolidado.parquet"
+# A silver do MCO tem um arquivo por mês baixado (o mais recente sem sufixo)
+MCO_SILVER_PADRAO = "mco_consolidado*.parquet"
 TR_SILVER = SILVER_DIR / "onibus_tempo_real.parquet"
 
 # Caminhos para dimensões da camada gold
@@ -23,145 +66,735 @@ DIM_CONC = GOLD_DIR / "dim_concessionaria.parquet"
 DIM_EMP = GOLD_DIR / "dim_empresa.parquet"
 DIM_VEIC = GOLD_DIR / "dim_veiculo.parquet"
 
-# Caminhos para fatos da camada gold
-FATO_MCO = GOLD_DIR / "fato_mco_viagem.parquet"
-FATO_TR = GOLD_DIR / "fato_tempo_real_evento.parquet"
+# Caminhos para fatos da camada gold (datasets particionados por data_key)
+FATO_MCO = GOLD_DIR / "fato_mco_viagem"
+FATO_TR = GOLD_DIR / "fato_tempo_real_evento"
+
+# Manifestos usados para pular fatos cujas entradas não mudaram
+MANIFEST_DIR = GOLD_DIR / "_manifest"
+
+# Colunas finais dos fatos
+COLUNAS_FATO_MCO = [
+    "data_key",
+    "linha_key",
+    "concessionaria_key",
+    "empresa_key",
+    "veiculo_key",
+    "sublinha_numero",
+    "ponto_controle_numero",
+    "hora_saida",
+    "hora_chegada",
+    "catraca_saida",
+    "catraca_chegada",
+    "indicador_ocorrencia",
+    "indicador_justificativa",
+    "tipo_dia",
+    "extensao_viagem",
+    "indicador_falha_mecanica",
+    "indicador_evento_inseguro",
+    "indicador_fechamento",
+    "data_fechamento_viagem",
+    "total_usuarios_viagem",
+    "dt_ingestao",
+]
+
+COLUNAS_FATO_TR = [
+    "data_key",
+    "linha_key",
+    "veiculo_key",
+    "codigo_evento",
+    "data_hora",
+    "latitude",
+    "longitude",
+    "celula_espacial",
+    "velocidade_instantanea",
+    "direcao_veiculo",
+    "sentido_veiculo",
+    "distancia_percorrida",
+    "dt_ingestao",
+]
+
+# Colunas da silver do Tempo Real lidas pelo fato
+COLUNAS_SILVER_TR = [
+    c for c in COLUNAS_FATO_TR
+    if c not in ("data_key", "linha_key", "veiculo_key", "celula_espacial")
+] + ["codigo_numero_linha", "numero_ordem_veiculo"]
+
+# Tamanho de lote padrão na leitura em lotes da silver do Tempo Real
+TAMANHO_LOTE_TR = 1_000_000
+
+
+def silver_mco() -> list[Path]:
+    """Arquivos silver do MCO (todos os meses baixados)."""
+    return sorted(SILVER_DIR.glob(MCO_SILVER_PADRAO))
+
+
+def silver_tr() -> list[Path]:
+    """Arquivos silver do Tempo Real."""
+    return [TR_SILVER]
+
+
+def migrar_fato_legado(path: Path, key_col: str = "data_key") -> None:
+    """
+    Converter um fato gravado como arquivo único em dataset particionado.
+
+    O arquivo antigo (`<fato>.parquet`) é mantido com o sufixo `.legado`.
+    """
+    legado = path.with_suffix(".parquet")
+    if not legado.is_file() or path.exists():
+        return
+
+    print(f"Gold: migrando {legado.name} para partições por {key_col}...")
+    escrever_particoes(pd.read_parquet(legado), path, key_col)
+    legado.rename(legado.with_name(legado.name + ".legado"))
 
 
 def incremental_append_by_data_key(
     df_new: pd.DataFrame,
     path: Path,
     key_col: str = "data_key",
-) -> pd.DataFrame:
+) -> list[int]:
     """
     Adicionar registros incrementalmente, evitando duplicatas por chave de data.
 
+    Cada dia novo vira uma partição nova do dataset. Os dias já carregados são
+    descobertos listando as pastas de partição, sem ler nenhum dado, então o
+    custo não cresce com o histórico.
+
     Args:
         df_new: Novo dataframe a adicionar.
-        path: Caminho para arquivo parquet existente.
+        path: Diretório do dataset particionado.
         key_col: Nome da coluna usada como chave de data (padrão: "data_key").
 
     Returns:
-        Dataframe concatenado com registros antigos e novos, ou apenas novos
-        se o arquivo não existir.
+        Valores de `key_col` das partições gravadas.
     """
-    if path.exists():
-        old = pd.read_parquet(path)
-        existing = set(old[key_col].unique().tolist())
-        inc = df_new[~df_new[key_col].isin(existing)]
-        return pd.concat([old, inc], ignore_index=True)
-    return df_new
+    migrar_fato_legado(path, key_col)
+    existing = listar_particoes(path, key_col)
+    inc = df_new[~df_new[key_col].isin(existing)]
+    return escrever_particoes(inc, path, key_col)
+
+
+def fato_inalterado(fato: Path, entradas: list[Path], versao: str) -> bool:
+    """Verifica pelo manifesto se as entradas de um fato mudaram."""
+    manifesto = carregar_manifesto(MANIFEST_DIR / f"{fato.stem}.json")
+    return etapa_inalterada(manifesto, entradas, [fato], versao)
 
 
-def main() -> None:
+def registrar_fato(fato: Path, entradas: list[Path], versao: str) -> None:
+    """Registra no manifesto as entradas consumidas por um fato."""
+    salvar_manifesto(
+        MANIFEST_DIR / f"{fato.stem}.json", registrar_etapa(entradas, versao)
+    )
+
+
+def carregar_dimensoes(nomes=None) -> dict:
     """
-    Construir tabelas de fatos combinando dados silver com tabelas de dimensões.
+    Carregar as dimensões como tabelas de consulta (chave natural -> chave).
 
-    Processa dados de MCO (viagens) e eventos em tempo real, enriquecendo-os
-    com chaves de dimensões e salvando incrementalmente na camada gold.
+    Args:
+        nomes: Dimensões a carregar ("linha", "data", "concessionaria",
+            "empresa", "veiculo"). Se None, todas. O fato do Tempo Real não
+            usa concessionária nem empresa, que só existem com o MCO.
+
+    Returns:
+        Dicionário com uma série de consulta por dimensão (índice = chave
+        natural, valores = chave substituta) e, em "data", o índice de
+        data_key existentes.
     """
-    # Carregar dimensões
-    dim_linha = pd.read_parquet(DIM_LINHA)[["linha", "linha_key"]]
-    dim_data = pd.read_parquet(DIM_DATA)[["data_key"]]
-    dim_conc = pd.read_parquet(DIM_CONC)[["concessionaria_numero", "concessionaria_key"]]
-    dim_emp = pd.read_parquet(DIM_EMP)[["empresa_operadora", "empresa_key"]]
-    dim_veic = pd.read_parquet(DIM_VEIC)[["veiculo_id", "veiculo_key"]]
+    def consulta(caminho, natural, chave):
+        dim = artifacts.ler_parquet(caminho, columns=[natural, chave])
+        return pd.Series(
+            dim[chave].to_numpy(),
+            index=pd.Index(dim[natural].astype(str).str.strip(), name=natural),
+            name=chave,
+        )
 
-    # -----------------------------------------
-    # FATO MCO (viagens)
-    # -----------------------------------------
-    mco = pd.read_parquet(MCO_SILVER)
-
-    # Criar chaves analíticas
-    mco["data_key"] = mco["viagem_data"].dt.strftime("%Y%m%d").astype(int)
-    mco["linha"] = mco["linha_numero"].astype(str).str.strip()
-    mco["veiculo_id"] = mco["numero_ordem_veiculo"].astype(int).astype(str)
-
-    # Enriquecer com chaves de dimensões
-    fato_mco = (
-        mco
-        .merge(dim_linha, on="linha", how="left")
-        .merge(dim_conc, left_on="concessionaria_numero",
-               right_on="concessionaria_numero", how="left")
-        .merge(dim_emp, left_on="empresa_operadora",
-               right_on="empresa_operadora", how="left")
-        .merge(dim_veic, on="veiculo_id", how="left")
+    carregar = {
+        "linha": lambda: consulta(DIM_LINHA, "linha", "linha_key"),
+        "data": lambda: pd.Index(
+            artifacts.ler_parquet(DIM_DATA, columns=["data_key"])["data_key"]
+        ),
+        "concessionaria": lambda: consulta(
+            DIM_CONC, "concessionaria_numero", "concessionaria_key"
+        ),
+        "empresa": lambda: consulta(DIM_EMP, "empresa_operadora", "empresa_key"),
+        "veiculo": lambda: consulta(DIM_VEIC, "veiculo_id", "veiculo_key"),
+    }
+    return {nome: carregar[nome]() for nome in (nomes or carregar)}
+
+
+def calcular_data_key(datas: pd.Series) -> pd.Series:
+    """Calcular data_key (YYYYMMDD) com aritmética, sem formatar texto."""
+    data_key = datas.dt.year * 10000 + datas.dt.month * 100 + datas.dt.day
+    return data_key.astype("Int32")
+
+
+def _consulta_numerica(consulta: pd.Series) -> pd.Series:
+    """Versão da consulta indexada pelo valor inteiro da chave natural."""
+    numeros = pd.to_numeric(consulta.index.to_series(), errors="coerce")
+    # só chaves na forma canônica ('123', não '0123' ou '123.0')
+    canonica = numeros.notna() & (
+        numeros.astype("Int64").astype(str) == consulta.index.to_series()
+    )
+    return pd.Series(
+        consulta.to_numpy()[canonica.to_numpy()],
+        index=pd.Index(numeros[canonica].astype("int64").to_numpy()),
+    )
+
+
+def _float_inteiro(valores: pd.Series) -> bool:
+    """Indica se a coluna é float e todos os valores não nulos são inteiros."""
+    if not pd.api.types.is_float_dtype(valores):
+        return False
+    numeros = valores.dropna().to_numpy(dtype="float64")
+    return bool(np.isfinite(numeros).all() and (numeros % 1 == 0).all())
+
+
+def resolver_chave(
+    valores: pd.Series,
+    consulta: pd.Series,
+    dimensao: str,
+    relatorio: dict | None = None,
+) -> pd.Series:
+    """
+    Mapear chaves naturais do fato para chaves substitutas por consulta ao índice.
+
+    Evita o merge (que copia o fato inteiro) e as colunas de texto
+    temporárias: categorias são resolvidas uma vez por categoria, colunas
+    inteiras são comparadas direto com a forma numérica da chave natural.
+
+    Args:
+        valores: Coluna do fato com a chave natural.
+        consulta: Série de consulta da dimensão (ver `carregar_dimensoes`).
+        dimensao: Nome da dimensão, usado no relatório de não encontrados.
+        relatorio: Se informado, acumula nele as linhas sem correspondência
+            por dimensão em vez de imprimir (usado no processamento em lotes).
+
+    Returns:
+        Série Int64 de chaves substitutas (nula onde não houve correspondência).
+    """
+    consulta = consulta[~consulta.index.duplicated()]
+    chaves = consulta.to_numpy()
+
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        categorias = valores.cat.categories.astype(str).str.strip()
+        pos_categoria = consulta.index.get_indexer(categorias)
+        codigos = valores.cat.codes.to_numpy()
+        pos = np.where(codigos >= 0, pos_categoria[codigos], -1)
+    elif pd.api.types.is_integer_dtype(valores) or _float_inteiro(valores):
+        # floats com valores inteiros (colunas Int lidas como float64) também:
+        # em texto viriam com '.0' e não casariam com a chave natural
+        consulta = _consulta_numerica(consulta)
+        chaves = consulta.to_numpy()
+        presentes = valores.notna().to_numpy()
+        pos = consulta.index.get_indexer(
+            valores.fillna(0).to_numpy(dtype="int64")
+        )
+        pos[~presentes] = -1
+    else:
+        pos = consulta.index.get_indexer(valores.astype(str).str.strip())
+
+    resultado = pd.Series(
+        np.where(pos >= 0, chaves[np.maximum(pos, 0)], 0),
+        index=valores.index,
+    ).astype("Int64")
+    resultado[pos < 0] = pd.NA
+
+    sem_correspondencia = int(((pos < 0) & valores.notna().to_numpy()).sum())
+    if relatorio is not None:
+        relatorio[dimensao] = relatorio.get(dimensao, 0) + sem_correspondencia
+    elif sem_correspondencia:
+        print(f"Gold: {dimensao} - {sem_correspondencia} linhas sem chave na dimensão")
+
+    return resultado
+
+
+def preparar_fato_mco(mco: pd.DataFrame, dims: dict) -> pd.DataFrame:
+    """
+    Enriquecer viagens do MCO com chaves de dimensões.
+
+    Args:
+        mco: Dados silver do MCO.
+        dims: Dimensões retornadas por `carregar_dimensoes`.
+
+    Returns:
+        Fato de viagens, apenas com dias presentes em dim_data.
+    """
+    # Criar chaves analíticas e resolver chaves de dimensões
+    chaves = {
+        "data_key": calcular_data_key(mco["viagem_data"]),
+        "linha_key": resolver_chave(mco["linha_numero"], dims["linha"], "linha"),
+        "concessionaria_key": resolver_chave(
+            mco["concessionaria_numero"], dims["concessionaria"], "concessionaria"
+        ),
+        "empresa_key": resolver_chave(
+            mco["empresa_operadora"], dims["empresa"], "empresa"
+        ),
+        "veiculo_key": resolver_chave(
+            mco["numero_ordem_veiculo"], dims["veiculo"], "veiculo"
+        ),
+    }
+
+    # Selecionar colunas finais
+    fato_mco = pd.DataFrame(
+        {c: chaves[c] if c in chaves else mco[c] for c in COLUNAS_FATO_MCO}
     )
 
+    return fato_mco[fato_mco["data_key"].isin(dims["data"])]
+
+
+def preparar_fato_tr(
+    tr: pd.DataFrame,
+    dims: dict,
+    relatorio: dict | None = None,
+) -> pd.DataFrame:
+    """
+    Enriquecer eventos em tempo real com chaves de dimensões e a célula
+    espacial de cada posição (ver `spatial.celula_espacial`).
+
+    Args:
+        tr: Dados silver do Tempo Real.
+        dims: Dimensões retornadas por `carregar_dimensoes`.
+        relatorio: Acumulador de chaves não encontradas (ver `resolver_chave`).
+
+    Returns:
+        Fato de eventos, apenas com dias presentes em dim_data.
+    """
+    # Criar chaves analíticas e resolver chaves de dimensões
+    chaves = {
+        "data_key": calcular_data_key(tr["data_hora"]),
+        "linha_key": resolver_chave(
+            tr["codigo_numero_linha"], dims["linha"], "linha", relatorio
+        ),
+        "veiculo_key": resolver_chave(
+            tr["numero_ordem_veiculo"], dims["veiculo"], "veiculo", relatorio
+        ),
+        "celula_espacial": celula_espacial(tr["latitude"], tr["longitude"]),
+    }
+
     # Selecionar colunas finais
-    fato_mco = fato_mco[[
-        "data_key",
-        "linha_key",
-        "concessionaria_key",
-        "empresa_key",
-        "veiculo_key",
-        "sublinha_numero",
-        "ponto_controle_numero",
-        "hora_saida",
-        "hora_chegada",
-        "catraca_saida",
-        "catraca_chegada",
-        "indicador_ocorrencia",
-        "indicador_justificativa",
-        "tipo_dia",
-        "extensao_viagem",
-        "indicador_falha_mecanica",
-        "indicador_evento_inseguro",
-        "indicador_fechamento",
-        "data_fechamento_viagem",
-        "total_usuarios_viagem",
-        "dt_ingestao",
-    ]].copy()
+    fato_tr = pd.DataFrame(
+        {c: chaves[c] if c in chaves else tr[c] for c in COLUNAS_FATO_TR}
+    )
+
+    return fato_tr[fato_tr["data_key"].isin(dims["data"])]
+
+
+def filtro_dias_novos(coluna: str, existentes) -> ds.Expression | None:
+    """
+    Montar o filtro de leitura da silver que exclui os dias já carregados.
+
+    Os dias existentes são agrupados em intervalos contínuos e o filtro é a
+    união dos intervalos complementares (`coluna < início` ou `coluna >= fim`),
+    uma forma que o leitor de parquet consegue comparar com as estatísticas
+    min/max de cada row group e pular os grupos que só têm dias carregados.
+
+    Args:
+        coluna: Coluna de data/hora da silver.
+        existentes: data_key das partições já gravadas.
+
+    Returns:
+        Expressão do pyarrow, ou None se não houver dias carregados.
+    """
+    dias = sorted(pd.Timestamp(str(d)) for d in set(existentes))
+    if not dias:
+        return None
+
+    # intervalos [início, fim) de dias consecutivos já carregados
+    intervalos = []
+    for dia in dias:
+        if intervalos and intervalos[-1][1] == dia:
+            intervalos[-1][1] = dia + pd.Timedelta(days=1)
+        else:
+            intervalos.append([dia, dia + pd.Timedelta(days=1)])
+
+    campo = ds.field(coluna)
+    filtro = campo < intervalos[0][0]
+    for (_, fim), (proximo, _) in zip(intervalos, intervalos[1:]):
+        filtro = filtro | ((campo >= fim) & (campo < proximo))
+    return filtro | (campo >= intervalos[-1][1])
+
+
+def build_fato_mco(dims: dict) -> list[int]:
+    """Construir o fato de viagens do MCO e adicioná-lo incrementalmente."""
+    # só os dias ainda não carregados são lidos da silver
+    migrar_fato_legado(FATO_MCO)
+    filtro = filtro_dias_novos("viagem_data", listar_particoes(FATO_MCO))
+    with medir("leitura"):
+        mco = ler_parquets(silver_mco(), filtro=filtro)
+        registrar(linhas_saida=len(mco))
+    with medir("juncao"):
+        registrar(linhas_entrada=len(mco))
+        fato_mco = preparar_fato_mco(mco, dims)
+        registrar(linhas_saida=len(fato_mco))
 
     # Adicionar incrementalmente por dia
-    fato_mco = fato_mco[fato_mco["data_key"].isin(dim_data["data_key"])]
-    fato_mco_out = incremental_append_by_data_key(fato_mco, FATO_MCO, "data_key")
-    fato_mco_out.to_parquet(FATO_MCO, index=False)
+    with medir("escrita"):
+        novos = incremental_append_by_data_key(fato_mco, FATO_MCO, "data_key")
+    print(f"Gold: {FATO_MCO.name} - {len(novos)} dias novos")
+    return novos
 
-    # -----------------------------------------
-    # FATO Tempo Real (eventos)
-    # -----------------------------------------
-    tr = pd.read_parquet(TR_SILVER)
-
-    # Criar chaves analíticas
-    tr["data_key"] = tr["data_hora"].dt.strftime("%Y%m%d").astype(int)
-    tr["linha"] = tr["codigo_numero_linha"].dropna().astype(int).astype(str)\
-        .str.strip()
-    tr["veiculo_id"] = tr["numero_ordem_veiculo"].astype(int).astype(str)
-
-    # Enriquecer com chaves de dimensões
-    fato_tr = (
-        tr
-        .merge(dim_linha, on="linha", how="left")
-        .merge(dim_veic, on="veiculo_id", how="left")
+
+def build_fato_tr_em_lotes(dims: dict, tamanho_lote: int = TAMANHO_LOTE_TR) -> list[int]:
+    """
+    Construir o fato de eventos em tempo real lendo a silver em lotes.
+
+    A silver é percorrida lote a lote pelo scanner do pyarrow (apenas as
+    colunas usadas). Cada lote é enriquecido com as tabelas de consulta das
+    dimensões, e a parte de cada dia é ordenada pelas chaves de cluster e
+    gravada como um run em uma pasta de preparação. No fim, os runs de cada
+    dia são mesclados em blocos (`writer.mesclar_ordenados`) na partição, que
+    é publicada atomicamente. O pico de memória depende do tamanho do lote, e
+    não do total nem do tamanho de um dia.
+
+    Args:
+        dims: Dimensões retornadas por `carregar_dimensoes`.
+        tamanho_lote: Número máximo de linhas por lote.
+
+    Returns:
+        Valores de data_key das partições gravadas.
+    """
+    migrar_fato_legado(FATO_TR)
+    existentes = set(listar_particoes(FATO_TR))
+    preparo = FATO_TR / f"_preparo-{uuid.uuid4().hex}"
+
+    # a silver vem da memória se a tabela já foi gravada ou lida nesta execução
+    silver = artifacts.dataset(TR_SILVER, COLUNAS_SILVER_TR)
+    filtro = filtro_dias_novos("data_hora", existentes)
+    runs = {}
+    relatorio = {}
+    linhas = 0
+    inicio = time.perf_counter()
+
+    try:
+        lotes = silver.to_batches(
+            columns=COLUNAS_SILVER_TR, filter=filtro, batch_size=tamanho_lote
+        )
+        while True:
+            with medir("leitura"):
+                lote = next(lotes, None)
+                if lote is not None:
+                    df = lote.to_pandas()
+                    registrar(linhas_saida=len(df))
+            if lote is None:
+                break
+
+            linhas += lote.num_rows
+            with medir("juncao"):
+                registrar(linhas_entrada=len(df))
+                fato_tr = preparar_fato_tr(df, dims, relatorio)
+                fato_tr = fato_tr[~fato_tr["data_key"].isin(existentes)]
+                registrar(linhas_saida=len(fato_tr))
+
+            with medir("escrita"):
+                for data_key, parte in fato_tr.groupby("data_key", sort=True, observed=True):
+                    # cada parte vira um run já ordenado pelas chaves de cluster
+                    dia = runs.setdefault(int(data_key), [])
+                    pasta = pasta_particao(preparo / "runs", int(data_key))
+                    pasta.mkdir(parents=True, exist_ok=True)
+                    dia.append(pasta / f"run-{len(dia):05d}.parquet")
+                    escrever_parquet(
+                        parte.drop(columns=["data_key"]), dia[-1], FATO_TR.name
+                    )
+                registrar(linhas_entrada=len(fato_tr))
+
+        gravadas = sorted(runs)
+        with medir("mescla"):
+            for data_key in gravadas:
+                pasta = pasta_particao(preparo, data_key)
+                pasta.mkdir(parents=True)
+                mesclar_ordenados(
+                    runs[data_key], pasta / ARQUIVO_PARTICAO, FATO_TR.name, tamanho_lote
+                )
+                publicar_particao(pasta, pasta_particao(FATO_TR, data_key))
+    finally:
+        shutil.rmtree(preparo, ignore_errors=True)
+
+    duracao = time.perf_counter() - inicio
+    for dimensao, n in relatorio.items():
+        if n:
+            print(f"Gold: {dimensao} - {n} linhas sem chave na dimensão")
+    print(
+        f"Gold: {FATO_TR.name} - {linhas} eventos lidos em {duracao:.1f}s "
+        f"({linhas / max(duracao, 1e-9):,.0f} linhas/s), {len(gravadas)} dias novos"
     )
+    return gravadas
 
-    # Selecionar colunas finais
-    fato_tr = fato_tr[[
-        "data_key",
-        "linha_key",
-        "veiculo_key",
-        "codigo_evento",
-        "data_hora",
-        "latitude",
-        "longitude",
-        "velocidade_instantanea",
-        "direcao_veiculo",
-        "sentido_veiculo",
-        "distancia_percorrida",
-        "dt_ingestao",
-    ]].copy()
+
+def build_fato_tr(dims: dict, tamanho_lote: int | None = None) -> list[int]:
+    """
+    Construir o fato de eventos em tempo real e adicioná-lo incrementalmente.
+
+    Args:
+        dims: Dimensões retornadas por `carregar_dimensoes`.
+        tamanho_lote: Se informado, processa a silver em lotes desse tamanho
+            (ver `build_fato_tr_em_lotes`). Se None, lê tudo de uma vez.
+    """
+    if tamanho_lote is not None:
+        return build_fato_tr_em_lotes(dims, tamanho_lote)
+
+    # só os dias ainda não carregados são lidos da silver
+    migrar_fato_legado(FATO_TR)
+    filtro = filtro_dias_novos("data_hora", listar_particoes(FATO_TR))
+    with medir("leitura"):
+        tr = artifacts.ler_parquet(TR_SILVER, filtro=filtro)
+        registrar(linhas_saida=len(tr))
+    with medir("juncao"):
+        registrar(linhas_entrada=len(tr))
+        fato_tr = preparar_fato_tr(tr, dims)
+        registrar(linhas_saida=len(fato_tr))
 
     # Adicionar incrementalmente por dia
-    fato_tr = fato_tr[fato_tr["data_key"].isin(dim_data["data_key"])]
-    fato_tr_out = incremental_append_by_data_key(fato_tr, FATO_TR, "data_key")
-    fato_tr_out.to_parquet(FATO_TR, index=False)
+    with medir("escrita"):
+        novos = incremental_append_by_data_key(fato_tr, FATO_TR, "data_key")
+    print(f"Gold: {FATO_TR.name} - {len(novos)} dias novos")
+    return novos
+
+
+# Fato -> (arquivos silver, coluna de data na silver, preparação, dataset gold)
+FATOS = {
+    "mco": (silver_mco, "viagem_data", preparar_fato_mco, FATO_MCO),
+    "tr": (silver_tr, "data_hora", preparar_fato_tr, FATO_TR),
+}
+
+
+def filtro_dia(coluna: str, data_key: int) -> ds.Expression:
+    """Filtro de parquet que seleciona um único dia pela coluna de data."""
+    inicio = pd.Timestamp(str(data_key))
+    campo = ds.field(coluna)
+    return (campo >= inicio) & (campo < inicio + pd.Timedelta(days=1))
+
+
+# Dimensões de um processo do backfill, carregadas uma vez por
+# `_carregar_dimensoes_processo` (initializer do pool)
+_dims_processo = None
+
+
+def _carregar_dimensoes_processo() -> None:
+    """Carregar as dimensões uma vez em cada processo do backfill."""
+    global _dims_processo
+    _dims_processo = carregar_dimensoes()
+
+
+def reconstruir_dia(
+    fato: str,
+    data_key: int,
+    politica: str,
+    dims: dict | None = None,
+) -> int | None:
+    """
+    Reconstruir uma partição de um fato a partir da silver.
+
+    Só o dia pedido é lido da silver (filtro aplicado na leitura do parquet).
+    A partição nova é gravada em pasta temporária e trocada atomicamente, e o
+    mesmo dia é recalculado nos agregados do fato.
+
+    Args:
+        fato: Fato a reconstruir ("mco", "tr").
+        data_key: Dia a reconstruir (YYYYMMDD).
+        politica: "sobrescrever" ou "manter" (ver `backfill`).
+        dims: Dimensões retornadas por `carregar_dimensoes`. Se None, usa as
+            do processo (carregadas pelo initializer do backfill) ou as
+            carrega.
+
+    Returns:
+        Número de linhas gravadas, ou None se o dia foi mantido ou não tem
+        dados na silver.
+    """
+    silver, coluna, preparar, destino = FATOS[fato]
+
+    if politica == "manter" and data_key in listar_particoes(destino):
+        return None
+
+    df = ler_parquets(silver(), filtro=filtro_dia(coluna, data_key))
+    if df.empty:
+        return None
+
+    if dims is None:
+        dims = _dims_processo if _dims_processo is not None else carregar_dimensoes()
+    parte = preparar(df, dims)
+    parte = parte[parte["data_key"] == data_key]
+    if parte.empty:
+        return None
+
+    escrever_particao(parte, destino, data_key)
+    for agregado in agregados_de(destino):
+        agregar_dia(agregado, data_key)
+    return len(parte)
+
+
+def backfill(
+    data_inicio: int,
+    data_fim: int,
+    politica: str = "sobrescrever",
+    fatos: tuple[str, ...] = ("mco", "tr"),
+    workers: int = 1,
+) -> dict[tuple[str, int], int | None]:
+    """
+    Reconstruir os fatos de um intervalo de dias, um dia por vez.
+
+    Cada (fato, dia) é independente e pode rodar em paralelo. Rodar o mesmo
+    intervalo de novo, com a mesma silver e as mesmas dimensões, gera os
+    mesmos arquivos.
+
+    Args:
+        data_inicio: Primeiro data_key do intervalo (YYYYMMDD, inclusivo).
+        data_fim: Último data_key do intervalo (YYYYMMDD, inclusivo).
+        politica: "sobrescrever" substitui partições existentes; "manter" só
+            cria os dias que ainda não existem.
+        fatos: Fatos a reconstruir ("mco", "tr").
+        workers: Número de processos.
+
+    Returns:
+        Dicionário {(fato, data_key): linhas gravadas ou None}.
+
+    Raises:
+        ValueError: Se a política ou o fato não forem reconhecidos.
+        RuntimeError: Se algum dia falhar. Os demais dias são processados
+            normalmente antes do erro ser levantado.
+    """
+    if politica not in ("sobrescrever", "manter"):
+        raise ValueError(f"Política de backfill inválida: {politica}")
+    desconhecidos = set(fatos) - set(FATOS)
+    if desconhecidos:
+        raise ValueError(f"Fatos desconhecidos: {sorted(desconhecidos)}")
+
+    dias = pd.read_parquet(DIM_DATA, columns=["data_key"])["data_key"]
+    dias = sorted(int(d) for d in dias if data_inicio <= d <= data_fim)
+    tarefas = [(fato, dia) for fato in fatos for dia in dias]
+    print(f"Backfill: {len(dias)} dias x {len(fatos)} fatos ({politica})")
+
+    for destino in (FATOS[f][3] for f in fatos):
+        migrar_fato_legado(destino)
+        destino.mkdir(parents=True, exist_ok=True)
+
+    resultados = {}
+    erros = {}
+    if workers > 1 and len(tarefas) > 1:
+        # cada processo carrega as dimensões uma vez, e não uma por dia
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tarefas)),
+            initializer=_carregar_dimensoes_processo,
+        ) as executor:
+            futuros = {
+                executor.submit(reconstruir_dia, fato, dia, politica): (fato, dia)
+                for fato, dia in tarefas
+            }
+            for futuro in as_completed(futuros):
+                try:
+                    resultados[futuros[futuro]] = futuro.result()
+                except Exception as e:
+                    erros[futuros[futuro]] = e
+    elif tarefas:
+        dims = carregar_dimensoes()
+        for fato, dia in tarefas:
+            try:
+                resultados[(fato, dia)] = reconstruir_dia(fato, dia, politica, dims)
+            except Exception as e:
+                erros[(fato, dia)] = e
+
+    gravados = sum(1 for linhas in resultados.values() if linhas is not None)
+    print(f"Backfill: {gravados} partições gravadas")
+    if "tr" in fatos:
+        atualizar_indice_espacial(FATO_TR, dias)
+    for (fato, dia), erro in sorted(erros.items()):
+        print(f"Backfill: erro em {fato} {dia}: {erro!r}")
+    if erros:
+        raise RuntimeError(f"Backfill falhou em {len(erros)} partições")
+
+    return resultados
+
+
+def main(
+    forcar: bool = False,
+    tamanho_lote_tr: int | None = TAMANHO_LOTE_TR,
+    fatos: tuple[str, ...] = tuple(FATOS),
+) -> bool:
+    """
+    Construir tabelas de fatos combinando dados silver com tabelas de dimensões.
+
+    Processa dados de MCO (viagens) e eventos em tempo real, enriquecendo-os
+    com chaves de dimensões e salvando incrementalmente na camada gold. Um fato
+    cujas entradas (silver e dimensões) não mudaram desde a última execução
+    não é reprocessado. Os agregados de cada fato recebem só os dias novos.
+
+    Args:
+        forcar: Se True, processa os fatos mesmo sem mudanças nas entradas.
+        tamanho_lote_tr: Linhas por lote na leitura da silver do Tempo Real.
+            Se None, a silver é lida inteira em memória.
+        fatos: Fatos a construir ("mco", "tr"). Os dois são independentes, e
+            o run_pipeline roda cada um em uma etapa própria, em paralelo.
+
+    Returns:
+        True se algum fato foi processado, False se todos foram pulados.
+    """
+    GOLD_DIR.mkdir(parents=True, exist_ok=True)
+    versao = versao_modulos(*MODULOS)
+    entradas_mco = [*silver_mco(), DIM_LINHA, DIM_DATA, DIM_CONC, DIM_EMP, DIM_VEIC]
+    entradas_tr = [TR_SILVER, DIM_LINHA, DIM_DATA, DIM_VEIC]
+
+    # Carregar dimensões (o Tempo Real não usa concessionária nem empresa)
+    with medir("carga_dimensoes"):
+        dims = carregar_dimensoes(
+            None if "mco" in fatos else ["linha", "data", "veiculo"]
+        )
+    processados = []
+
+    # -----------------------------------------
+    # FATO MCO (viagens)
+    # -----------------------------------------
+    if "mco" in fatos:
+        with medir(FATO_MCO.name):
+            novos_mco = []
+            if not forcar and fato_inalterado(FATO_MCO, entradas_mco, versao):
+                print(f"Gold: entradas de {FATO_MCO.name} inalteradas, pulando.")
+            else:
+                novos_mco = build_fato_mco(dims)
+                registrar_fato(FATO_MCO, entradas_mco, versao)
+                processados.append("mco")
+            with medir("agregados"):
+                atualizar_agregados(FATO_MCO, novos_mco)
+            registrar(dias_novos=len(novos_mco))
+
+    # -----------------------------------------
+    # FATO Tempo Real (eventos)
+    # -----------------------------------------
+    if "tr" in fatos:
+        with medir(FATO_TR.name):
+            novos_tr = []
+            if not forcar and fato_inalterado(FATO_TR, entradas_tr, versao):
+                print(f"Gold: entradas de {FATO_TR.name} inalteradas, pulando.")
+            else:
+                novos_tr = build_fato_tr(dims, tamanho_lote_tr)
+                registrar_fato(FATO_TR, entradas_tr, versao)
+                processados.append("tr")
+            with medir("agregados"):
+                atualizar_agregados(FATO_TR, novos_tr)
+            with medir("indice_espacial"):
+                atualizar_indice_espacial(FATO_TR)
+            registrar(dias_novos=len(novos_tr))
 
     # Exibir resumo
     print("Gold: fatos gerados com sucesso.")
-    print(f"- {FATO_MCO}")
-    print(f"- {FATO_TR}")
-
+    for fato in fatos:
+        print(f"- {FATOS[fato][3]}")
+    return bool(processados)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Construir fatos da camada gold.")
+    parser.add_argument(
+        "--backfill", nargs=2, type=int, metavar=("INICIO", "FIM"),
+        help="reconstruir os dias entre dois data_key (YYYYMMDD, inclusivo)",
+    )
+    parser.add_argument(
+        "--politica", choices=["sobrescrever", "manter"], default="sobrescrever",
+    )
+    parser.add_argument("--fatos", nargs="+", choices=list(FATOS), default=list(FATOS))
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.backfill:
+        backfill(*args.backfill, args.politica, tuple(args.fatos), args.workers)
+    else:
+        main(fatos=tuple(args.fatos))
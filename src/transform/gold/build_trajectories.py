@@ -0,0 +1,308 @@
+"""
+Construir segmentos de trajetória dos veículos a partir do fato de eventos.
+
+Para cada dia de `fato_tempo_real_evento`, os eventos são ordenados uma vez
+por (veículo, data_hora) e cada par de eventos consecutivos do mesmo veículo
+vira um segmento, com duração, distância (haversine), velocidade implícita e
+indicação de parada. Tudo é calculado com operações vetorizadas do NumPy sobre
+os arrays deslocados, sem laço por linha. Cada dia é uma partição do dataset
+`fato_trajetoria_segmento`, processada de forma independente (e em paralelo).
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from src.transform.gold.partitions import (
+    escrever_particao,
+    fontes_particoes,
+    ler_dataset,
+    particoes_desatualizadas,
+)
+from src.transform.gold.spatial import distancia_haversine
+from src.transform.manifest import (
+    carregar_manifesto,
+    registrar_chaves,
+    salvar_manifesto,
+    versao_modulos,
+)
+
+# Módulos que definem o conteúdo dos segmentos (versão gravada no manifesto)
+MODULOS = [
+    "src.transform.gold.build_trajectories",
+    "src.transform.gold.partitions",
+    "src.transform.gold.writer",
+    "src.transform.gold.spatial",
+]
+
+GOLD_DIR = Path("data/gold/mobilidade_bh")
+
+FATO_TR = GOLD_DIR / "fato_tempo_real_evento"
+FATO_TRAJETORIA = GOLD_DIR / "fato_trajetoria_segmento"
+
+# Manifesto com as partições do fato de eventos já derivadas, por dia
+MANIFESTO = GOLD_DIR / "_manifest" / f"{FATO_TRAJETORIA.name}.json"
+
+# Colunas do fato de eventos lidas pela etapa
+COLUNAS_EVENTO = [
+    "linha_key",
+    "veiculo_key",
+    "data_hora",
+    "latitude",
+    "longitude",
+    "velocidade_instantanea",
+]
+
+# Segmento parado: deslocamento de até RAIO_PARADA_M em até LACUNA_MAXIMA_S
+RAIO_PARADA_M = 30.0
+LACUNA_MAXIMA_S = 300
+
+# Fração máxima padrão de eventos do dia sem veiculo_key: acima disso a
+# resolução de chaves do fato falhou e o dia é pulado, com aviso (abaixo,
+# avisa a partir de AVISO_SEM_VEICULO)
+AVISO_SEM_VEICULO = 0.05
+MAXIMO_SEM_VEICULO = 0.5
+
+
+def derivar_segmentos(eventos: pd.DataFrame) -> pd.DataFrame:
+    """
+    Derivar os segmentos de trajetória de um conjunto de eventos.
+
+    Eventos sem veículo, data_hora ou coordenadas são ignorados. Uma parada é
+    uma sequência de segmentos parados consecutivos do mesmo veículo; todos
+    os seus segmentos recebem o mesmo `parada_id` e a duração total da parada.
+
+    Args:
+        eventos: Eventos do fato de Tempo Real (colunas de `COLUNAS_EVENTO`).
+
+    Returns:
+        Um registro por segmento, ordenado por veículo e data_hora de início.
+    """
+    validos = (
+        eventos["veiculo_key"].notna()
+        & eventos["data_hora"].notna()
+        & eventos["latitude"].notna()
+        & eventos["longitude"].notna()
+    )
+    eventos = eventos[validos]
+
+    # Ordenar uma vez por (veículo, data_hora)
+    veiculo = eventos["veiculo_key"].to_numpy(dtype="int64")
+    instante = eventos["data_hora"].to_numpy(dtype="datetime64[s]")
+    ordem = np.lexsort((instante, veiculo))
+    veiculo, instante = veiculo[ordem], instante[ordem]
+    lat = eventos["latitude"].to_numpy(dtype="float64")[ordem]
+    lon = eventos["longitude"].to_numpy(dtype="float64")[ordem]
+    velocidade = eventos["velocidade_instantanea"].to_numpy(
+        dtype="float64", na_value=np.nan
+    )[ordem]
+    linha = eventos["linha_key"].astype("Int64").array.take(ordem)
+
+    # Segmento k vai do evento ini[k] ao evento ini[k] + 1 do mesmo veículo
+    ini = np.flatnonzero(veiculo[1:] == veiculo[:-1])
+    fim = ini + 1
+
+    duracao = (instante[fim] - instante[ini]).astype("int64")
+    distancia = distancia_haversine(lat[ini], lon[ini], lat[fim], lon[fim])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocidade_implicita = np.where(duracao > 0, distancia / duracao * 3.6, np.nan)
+
+    # Paradas: sequências de segmentos parados contíguos do mesmo veículo
+    parado = (distancia <= RAIO_PARADA_M) & (duracao <= LACUNA_MAXIMA_S)
+    contiguo = np.r_[False, ini[1:] == fim[:-1]]
+    inicio_parada = parado & ~(contiguo & np.r_[False, parado[:-1]])
+    sequencia = np.cumsum(inicio_parada) - 1
+    parada_id = np.where(parado, sequencia, -1)
+    duracao_parada = np.zeros(len(ini), dtype="int64")
+    if parado.any():
+        total = np.bincount(sequencia[parado], weights=duracao[parado])
+        duracao_parada[parado] = total[sequencia[parado]]
+
+    return pd.DataFrame({
+        "veiculo_key": pd.array(veiculo[ini], dtype="Int64"),
+        "linha_key": linha[fim],
+        "data_hora_inicio": instante[ini],
+        "data_hora_fim": instante[fim],
+        "duracao_s": duracao.astype("int32"),
+        "latitude_inicio": lat[ini].astype("float32"),
+        "longitude_inicio": lon[ini].astype("float32"),
+        "latitude_fim": lat[fim].astype("float32"),
+        "longitude_fim": lon[fim].astype("float32"),
+        "distancia_m": distancia.astype("float32"),
+        "velocidade_implicita": velocidade_implicita.astype("float32"),
+        "velocidade_instantanea": velocidade[fim].astype("float32"),
+        "diferenca_velocidade": (
+            velocidade_implicita - velocidade[fim]
+        ).astype("float32"),
+        "parado": parado,
+        "parada_id": parada_id.astype("int32"),
+        "duracao_parada_s": duracao_parada.astype("int32"),
+    })
+
+
+def verificar_veiculos(
+    eventos: pd.DataFrame,
+    data_key: int,
+    maximo_sem_veiculo: float = MAXIMO_SEM_VEICULO,
+) -> bool:
+    """
+    Avisar quando muitos eventos do dia ficaram sem veiculo_key.
+
+    Eventos sem veículo são descartados em `derivar_segmentos`; se forem quase
+    todos, o dia sairia vazio sem nenhum aviso.
+
+    Args:
+        eventos: Eventos do dia.
+        data_key: Dia dos eventos (para as mensagens).
+        maximo_sem_veiculo: Fração de eventos sem veículo acima da qual o dia
+            não deve ser gravado (1.0 desliga a verificação).
+
+    Returns:
+        False se o dia deve ser pulado, True caso contrário.
+    """
+    if eventos.empty:
+        return True
+    sem_veiculo = int(eventos["veiculo_key"].isna().sum())
+    fracao = sem_veiculo / len(eventos)
+    if fracao > maximo_sem_veiculo:
+        print(
+            f"Gold: {FATO_TRAJETORIA.name} {data_key} - {sem_veiculo} de "
+            f"{len(eventos)} eventos sem veiculo_key, dia pulado"
+        )
+        return False
+    if fracao > AVISO_SEM_VEICULO:
+        print(
+            f"Gold: {FATO_TRAJETORIA.name} {data_key} - {sem_veiculo} de "
+            f"{len(eventos)} eventos sem veiculo_key ignorados"
+        )
+    return True
+
+
+def construir_dia(
+    data_key: int,
+    maximo_sem_veiculo: float = MAXIMO_SEM_VEICULO,
+) -> int | None:
+    """
+    Construir (ou substituir) a partição de trajetórias de um dia.
+
+    Só a partição do dia é lida do fato de eventos. Segmentos não atravessam
+    a meia-noite.
+
+    Args:
+        data_key: Dia a construir.
+        maximo_sem_veiculo: Fração máxima de eventos sem veiculo_key (ver
+            `verificar_veiculos`).
+
+    Returns:
+        Número de segmentos gravados, ou None se o dia foi pulado.
+    """
+    eventos = ler_dataset(FATO_TR, columns=COLUNAS_EVENTO, valores=[data_key])
+    if not verificar_veiculos(eventos, data_key, maximo_sem_veiculo):
+        return None
+    segmentos = derivar_segmentos(eventos)
+    segmentos["data_key"] = np.int32(data_key)
+    escrever_particao(segmentos, FATO_TRAJETORIA, data_key)
+    return len(segmentos)
+
+
+def construir_trajetorias(
+    dias=None,
+    workers: int = 1,
+    maximo_sem_veiculo: float = MAXIMO_SEM_VEICULO,
+) -> dict[int, int]:
+    """
+    Construir as partições de trajetória pendentes, um dia por tarefa.
+
+    Args:
+        dias: data_key a (re)construir. Se None, os dias do fato de eventos
+            novos ou alterados desde a última construção, segundo o manifesto
+            (ver `particoes_desatualizadas`).
+        workers: Número de processos.
+        maximo_sem_veiculo: Fração máxima de eventos sem veiculo_key; os dias
+            acima dela são pulados e ficam pendentes no manifesto.
+
+    Returns:
+        Dicionário {data_key: segmentos gravados}, sem os dias pulados.
+
+    Raises:
+        RuntimeError: Se algum dia falhar. Os demais dias são processados
+            normalmente antes do erro ser levantado.
+    """
+    versao = versao_modulos(*MODULOS)
+    manifesto = carregar_manifesto(MANIFESTO)
+    if dias is None:
+        dias = particoes_desatualizadas([FATO_TR], FATO_TRAJETORIA, manifesto, versao)
+    dias = sorted(int(d) for d in dias)
+
+    resultados = {}
+    erros = {}
+    if workers > 1 and len(dias) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(dias))) as executor:
+            futuros = {
+                executor.submit(construir_dia, dia, maximo_sem_veiculo): dia
+                for dia in dias
+            }
+            for futuro in as_completed(futuros):
+                try:
+                    resultados[futuros[futuro]] = futuro.result()
+                except Exception as e:
+                    erros[futuros[futuro]] = e
+    else:
+        for dia in dias:
+            try:
+                resultados[dia] = construir_dia(dia, maximo_sem_veiculo)
+            except Exception as e:
+                erros[dia] = e
+
+    pulados = sorted(dia for dia, segmentos in resultados.items() if segmentos is None)
+    resultados = {dia: n for dia, n in resultados.items() if n is not None}
+
+    fontes = fontes_particoes([FATO_TR])
+    salvar_manifesto(MANIFESTO, registrar_chaves(
+        manifesto, {dia: fontes[dia] for dia in resultados if dia in fontes}, versao
+    ))
+
+    print(
+        f"Gold: {FATO_TRAJETORIA.name} - {len(resultados)} dias, "
+        f"{sum(resultados.values())} segmentos"
+    )
+    if pulados:
+        print(f"Gold: {FATO_TRAJETORIA.name} - dias pulados: {pulados}")
+    for dia, erro in sorted(erros.items()):
+        print(f"Gold: erro em {FATO_TRAJETORIA.name} {dia}: {erro!r}")
+    if erros:
+        raise RuntimeError(f"Trajetórias falharam em {len(erros)} dias")
+
+    return resultados
+
+
+def main(workers: int = 1, maximo_sem_veiculo: float = MAXIMO_SEM_VEICULO) -> bool:
+    """
+    Construir os segmentos de trajetória dos dias novos ou reconstruídos.
+
+    Args:
+        workers: Número de processos.
+        maximo_sem_veiculo: Fração máxima de eventos sem veiculo_key por dia.
+
+    Returns:
+        True se algum dia foi construído.
+    """
+    return bool(construir_trajetorias(
+        workers=workers, maximo_sem_veiculo=maximo_sem_veiculo
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construir trajetórias da camada gold.")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--dias", nargs="+", type=int, metavar="DATA_KEY",
+        help="dias a reconstruir (padrão: dias novos ou alterados no fato)",
+    )
+    parser.add_argument(
+        "--maximo-sem-veiculo", type=float, default=MAXIMO_SEM_VEICULO,
+        help="fração de eventos sem veiculo_key acima da qual o dia é pulado",
+    )
+    args = parser.parse_args()
+    construir_trajetorias(args.dias, args.workers, args.maximo_sem_veiculo)
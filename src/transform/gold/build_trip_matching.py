@@ -0,0 +1,353 @@
+"""
+Ligar os eventos do Tempo Real às viagens do MCO.
+
+O MCO informa, para cada viagem, o veículo e os horários de saída e chegada;
+o Tempo Real informa as posições do mesmo veículo ao longo do dia. Para cada
+dia, viagens e eventos são ordenados por (veículo, horário) e cada evento é
+associado, por busca binária (`searchsorted`), à última viagem do veículo
+iniciada até aquele instante, se o evento ainda estiver dentro dela; se não
+estiver, à viagem já iniciada que termina mais tarde, se esta o cobrir (ver
+`associar_eventos`). O custo é O(n log n) e a memória se limita a um dia, sem
+o produto cartesiano de um merge por veículo.
+
+Por dia são gravados dois datasets particionados por `data_key`:
+
+* `fato_evento_viagem`: eventos associados a uma viagem, com `viagem_key`;
+* `fato_viagem_gps`: uma linha por viagem do MCO com as estatísticas de GPS.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from src.transform.gold.build_dimensions import MASCARA_CHAVE
+from src.transform.gold.partitions import (
+    escrever_particao,
+    fontes_particoes,
+    ler_dataset,
+    listar_particoes,
+    particoes_desatualizadas,
+    pasta_particao,
+)
+from src.transform.gold.spatial import distancia_haversine
+from src.transform.manifest import (
+    carregar_manifesto,
+    registrar_chaves,
+    salvar_manifesto,
+    versao_modulos,
+)
+
+# Módulos que definem o conteúdo da associação (versão gravada no manifesto)
+MODULOS = [
+    "src.transform.gold.build_trip_matching",
+    "src.transform.gold.partitions",
+    "src.transform.gold.writer",
+    "src.transform.gold.spatial",
+    "src.transform.gold.build_dimensions",  # MASCARA_CHAVE
+]
+
+GOLD_DIR = Path("data/gold/mobilidade_bh")
+
+FATO_MCO = GOLD_DIR / "fato_mco_viagem"
+FATO_TR = GOLD_DIR / "fato_tempo_real_evento"
+FATO_EVENTO_VIAGEM = GOLD_DIR / "fato_evento_viagem"
+FATO_VIAGEM_GPS = GOLD_DIR / "fato_viagem_gps"
+
+# Manifesto com as partições dos dois fatos já associadas, por dia
+MANIFESTO = GOLD_DIR / "_manifest" / f"{FATO_VIAGEM_GPS.name}.json"
+
+# Colunas que identificam uma viagem do MCO (base da viagem_key)
+COLUNAS_VIAGEM = [
+    "data_key",
+    "veiculo_key",
+    "linha_key",
+    "sublinha_numero",
+    "ponto_controle_numero",
+    "hora_saida",
+]
+
+COLUNAS_EVENTO = [
+    "veiculo_key",
+    "data_hora",
+    "latitude",
+    "longitude",
+    "velocidade_instantanea",
+]
+
+SEGUNDOS_DIA = 86_400
+
+
+def gerar_viagem_key(viagens: pd.DataFrame) -> pd.Series:
+    """Chave de 63 bits da viagem, por hash das colunas de `COLUNAS_VIAGEM`."""
+    hashes = pd.util.hash_pandas_object(viagens[COLUNAS_VIAGEM], index=False)
+    return (hashes.to_numpy() & MASCARA_CHAVE).astype("int64")
+
+
+def associar_eventos(
+    viagens: pd.DataFrame,
+    eventos: pd.DataFrame,
+) -> np.ndarray:
+    """
+    Associar cada evento à viagem do mesmo veículo em andamento no instante.
+
+    Veículo e horário são combinados em uma única chave inteira ordenável
+    (código do veículo nos bits altos, segundos do dia nos baixos), então uma
+    só busca binária resolve todos os veículos de uma vez.
+
+    Se viagens do mesmo veículo se sobrepõem, vale a última iniciada até o
+    evento, se ela ainda o cobre; senão, entre as já iniciadas, a que termina
+    mais tarde (a iniciada por último, no empate), se ela cobrir o evento.
+    Essa não é necessariamente a última iniciada que ainda cobre o evento:
+    com A de 100 a 500, B de 150 a 450 e C de 200 a 300, um evento às 350
+    fica com A, e não com B.
+
+    Args:
+        viagens: Viagens do dia com `veiculo_key`, `inicio_s` e `fim_s`
+            (segundos desde a meia-noite).
+        eventos: Eventos do dia com `veiculo_key` e `instante_s`.
+
+    Returns:
+        Para cada evento, a posição (em `viagens`) da viagem associada, ou -1.
+    """
+    if viagens.empty:
+        return np.full(len(eventos), -1, dtype="int64")
+
+    codigos, _ = pd.factorize(
+        pd.concat([viagens["veiculo_key"], eventos["veiculo_key"]], ignore_index=True)
+    )
+    cod_viagem = codigos[: len(viagens)].astype("int64")
+    cod_evento = codigos[len(viagens):].astype("int64")
+
+    # 18 bits comportam até dois dias em segundos (viagens após a meia-noite)
+    chave_viagem = (cod_viagem << 18) | viagens["inicio_s"].to_numpy(dtype="int64")
+    chave_evento = (cod_evento << 18) | eventos["instante_s"].to_numpy(dtype="int64")
+
+    ordem = np.argsort(chave_viagem, kind="stable")
+    pos = np.searchsorted(chave_viagem[ordem], chave_evento, side="right") - 1
+    pos_valida = np.maximum(pos, 0)
+    mesmo_veiculo = (pos >= 0) & (cod_evento >= 0) & (cod_viagem[ordem][pos_valida] == cod_evento)
+
+    # Entre as viagens já iniciadas do veículo, a que termina mais tarde: se
+    # nem ela cobre o evento, nenhuma cobre (máximo acumulado do fim, que não
+    # mistura veículos porque o código do veículo está nos bits altos)
+    fim_ordenado = (cod_viagem[ordem] << 18) | viagens["fim_s"].to_numpy(dtype="int64")[ordem]
+    fim_maximo = np.maximum.accumulate(fim_ordenado)
+    posicoes = np.arange(len(ordem))
+    mais_longa = np.maximum.accumulate(np.where(fim_ordenado == fim_maximo, posicoes, 0))
+
+    instante = eventos["instante_s"].to_numpy(dtype="int64")
+    fim_s = viagens["fim_s"].to_numpy(dtype="int64")
+    candidata = ordem[pos_valida]
+    alternativa = ordem[mais_longa[pos_valida]]
+
+    return np.where(
+        mesmo_veiculo & (instante <= fim_s[candidata]),
+        candidata,
+        np.where(mesmo_veiculo & (instante <= fim_s[alternativa]), alternativa, -1),
+    )
+
+
+def estatisticas_viagem(
+    n_viagens: int,
+    viagem: np.ndarray,
+    eventos: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Estatísticas de GPS por viagem, a partir dos eventos associados.
+
+    Args:
+        n_viagens: Número de viagens do dia.
+        viagem: Posição da viagem de cada evento associado.
+        eventos: Eventos associados, na mesma ordem de `viagem`.
+
+    Returns:
+        Um registro por viagem (na ordem das viagens), inclusive as sem eventos.
+    """
+    instante = eventos["instante_s"].to_numpy(dtype="int64")
+    ordem = np.lexsort((instante, viagem))
+    viagem, instante = viagem[ordem], instante[ordem]
+    lat = eventos["latitude"].to_numpy(dtype="float64")[ordem]
+    lon = eventos["longitude"].to_numpy(dtype="float64")[ordem]
+    velocidade = eventos["velocidade_instantanea"].to_numpy(
+        dtype="float64", na_value=np.nan
+    )[ordem]
+
+    eventos_viagem = np.bincount(viagem, minlength=n_viagens)
+    com_velocidade = ~np.isnan(velocidade)
+    soma_velocidade = np.bincount(
+        viagem[com_velocidade], weights=velocidade[com_velocidade], minlength=n_viagens
+    )
+    n_velocidade = np.bincount(viagem[com_velocidade], minlength=n_viagens)
+
+    velocidade_maxima = np.full(n_viagens, np.nan)
+    primeiro = np.full(n_viagens, -1, dtype="int64")
+    ultimo = np.full(n_viagens, -1, dtype="int64")
+    if len(viagem):
+        inicios = np.flatnonzero(np.r_[True, viagem[1:] != viagem[:-1]])
+        ids = viagem[inicios]
+        velocidade_maxima[ids] = np.fmax.reduceat(velocidade, inicios)
+        primeiro[ids] = instante[inicios]
+        ultimo[ids] = instante[np.r_[inicios[1:], len(viagem)] - 1]
+
+    # distância entre eventos consecutivos da mesma viagem
+    mesma = viagem[1:] == viagem[:-1]
+    trechos = distancia_haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    distancia = np.bincount(
+        viagem[1:][mesma], weights=trechos[mesma], minlength=n_viagens
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocidade_media = np.where(n_velocidade > 0, soma_velocidade / n_velocidade, np.nan)
+
+    sem_eventos = eventos_viagem == 0
+    return pd.DataFrame({
+        "eventos_gps": eventos_viagem.astype("int32"),
+        "primeiro_evento_s": pd.Series(primeiro, dtype="Int32").mask(sem_eventos).array,
+        "ultimo_evento_s": pd.Series(ultimo, dtype="Int32").mask(sem_eventos).array,
+        "distancia_gps_m": distancia.astype("float32"),
+        "velocidade_media": velocidade_media.astype("float32"),
+        "velocidade_maxima": velocidade_maxima.astype("float32"),
+    })
+
+
+def associar_dia(data_key: int) -> tuple[int, int]:
+    """
+    Associar os eventos às viagens de um dia e gravar as duas partições.
+
+    Só as partições do dia são lidas dos fatos. Eventos depois da meia-noite
+    de viagens que atravessam o dia ficam na partição do dia seguinte e não
+    são associados.
+
+    Returns:
+        (eventos associados, viagens do dia).
+    """
+    viagens = ler_dataset(
+        FATO_MCO, columns=COLUNAS_VIAGEM + ["hora_chegada"], valores=[data_key]
+    )
+    viagens = viagens[
+        viagens["veiculo_key"].notna() & viagens["hora_saida"].notna()
+    ].reset_index(drop=True)
+    viagens["viagem_key"] = gerar_viagem_key(viagens)
+
+    # chegada ausente vira a própria saída; chegada antes da saída é no dia seguinte
+    inicio = viagens["hora_saida"].to_numpy(dtype="int64")
+    fim = viagens["hora_chegada"].to_numpy(dtype="float64", na_value=np.nan)
+    fim = np.where(np.isnan(fim), inicio, fim).astype("int64")
+    viagens["inicio_s"] = inicio
+    viagens["fim_s"] = np.where(fim < inicio, fim + SEGUNDOS_DIA, fim)
+
+    eventos = pd.DataFrame(columns=COLUNAS_EVENTO)
+    if pasta_particao(FATO_TR, data_key).is_dir():
+        eventos = ler_dataset(FATO_TR, columns=COLUNAS_EVENTO, valores=[data_key])
+    eventos = eventos[eventos["veiculo_key"].notna() & eventos["data_hora"].notna()]
+    data_hora = pd.to_datetime(eventos["data_hora"])
+    eventos = eventos.assign(
+        instante_s=(data_hora - data_hora.dt.normalize()).dt.total_seconds().astype("int64")
+    ).reset_index(drop=True)
+
+    viagem = associar_eventos(viagens, eventos)
+    associados = viagem >= 0
+    eventos_viagem = eventos[associados].reset_index(drop=True)
+    viagem = viagem[associados]
+
+    # Eventos com a viagem associada
+    evento_viagem = eventos_viagem[COLUNAS_EVENTO].copy()
+    evento_viagem.insert(0, "viagem_key", viagens["viagem_key"].to_numpy()[viagem])
+    evento_viagem["data_key"] = np.int32(data_key)
+    escrever_particao(evento_viagem, FATO_EVENTO_VIAGEM, data_key)
+
+    # Viagens do MCO com as estatísticas de GPS
+    viagem_gps = pd.concat(
+        [
+            viagens[["viagem_key", "veiculo_key", "linha_key", "sublinha_numero",
+                     "ponto_controle_numero", "hora_saida", "hora_chegada"]],
+            estatisticas_viagem(len(viagens), viagem, eventos_viagem),
+        ],
+        axis=1,
+    )
+    viagem_gps["data_key"] = np.int32(data_key)
+    escrever_particao(viagem_gps, FATO_VIAGEM_GPS, data_key)
+
+    return len(evento_viagem), len(viagem_gps)
+
+
+def associar_viagens(dias=None, workers: int = 1) -> dict[int, tuple[int, int]]:
+    """
+    Associar eventos e viagens nos dias pendentes, um dia por tarefa.
+
+    Args:
+        dias: data_key a (re)processar. Se None, os dias do fato do MCO novos
+            ou regravados (no MCO ou no Tempo Real) desde a última associação.
+        workers: Número de processos.
+
+    Returns:
+        Dicionário {data_key: (eventos associados, viagens)}.
+
+    Raises:
+        RuntimeError: Se algum dia falhar. Os demais dias são processados
+            normalmente antes do erro ser levantado.
+    """
+    versao = versao_modulos(*MODULOS)
+    manifesto = carregar_manifesto(MANIFESTO)
+    if dias is None:
+        dias = set(listar_particoes(FATO_MCO)) & set(particoes_desatualizadas(
+            [FATO_MCO, FATO_TR], FATO_VIAGEM_GPS, manifesto, versao
+        ))
+    dias = sorted(int(d) for d in dias)
+
+    resultados = {}
+    erros = {}
+    if workers > 1 and len(dias) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(dias))) as executor:
+            futuros = {executor.submit(associar_dia, dia): dia for dia in dias}
+            for futuro in as_completed(futuros):
+                try:
+                    resultados[futuros[futuro]] = futuro.result()
+                except Exception as e:
+                    erros[futuros[futuro]] = e
+    else:
+        for dia in dias:
+            try:
+                resultados[dia] = associar_dia(dia)
+            except Exception as e:
+                erros[dia] = e
+
+    fontes = fontes_particoes([FATO_MCO, FATO_TR])
+    salvar_manifesto(MANIFESTO, registrar_chaves(
+        manifesto, {dia: fontes[dia] for dia in resultados if dia in fontes}, versao
+    ))
+
+    associados = sum(e for e, _ in resultados.values())
+    viagens = sum(v for _, v in resultados.values())
+    print(
+        f"Gold: {FATO_VIAGEM_GPS.name} - {len(resultados)} dias, {viagens} viagens, "
+        f"{associados} eventos associados"
+    )
+    for dia, erro in sorted(erros.items()):
+        print(f"Gold: erro em {FATO_VIAGEM_GPS.name} {dia}: {erro!r}")
+    if erros:
+        raise RuntimeError(f"Associação de viagens falhou em {len(erros)} dias")
+
+    return resultados
+
+
+def main(workers: int = 1) -> bool:
+    """
+    Associar eventos e viagens dos dias novos ou reconstruídos.
+
+    Returns:
+        True se algum dia foi processado.
+    """
+    return bool(associar_viagens(workers=workers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Associar eventos do Tempo Real às viagens do MCO.")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--dias", nargs="+", type=int, metavar="DATA_KEY",
+        help="dias a reprocessar (padrão: dias novos ou alterados nos fatos)",
+    )
+    args = parser.parse_args()
+    associar_viagens(args.dias, args.workers)
@@ -0,0 +1,238 @@
+"""
+Datasets parquet particionados (estilo Hive) da camada gold.
+
+Cada fato é um diretório com uma subpasta por dia (`data_key=20260201/`).
+Os dias já carregados são descobertos listando o diretório, sem ler dados, e
+cada partição é gravada em uma pasta temporária e publicada com um único
+rename (da pasta, se o dia é novo, ou do arquivo, se o dia já existe), de
+modo que um leitor nunca vê um dia pela metade nem um dia que some.
+"""
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.transform import artifacts
+from src.transform.gold.writer import escrever_parquet
+from src.transform.manifest import chaves_alteradas
+
+COLUNA_PARTICAO = "data_key"
+ARQUIVO_PARTICAO = "part-0.parquet"
+
+
+def pasta_particao(dataset: Path, valor: int, coluna: str = COLUNA_PARTICAO) -> Path:
+    """Caminho da pasta de uma partição (`<dataset>/<coluna>=<valor>`)."""
+    return Path(dataset) / f"{coluna}={valor}"
+
+
+def listar_particoes(dataset: Path, coluna: str = COLUNA_PARTICAO) -> list[int]:
+    """
+    Listar os valores de partição já gravados, só pelos nomes das pastas.
+
+    Args:
+        dataset: Diretório do dataset.
+        coluna: Coluna de partição.
+
+    Returns:
+        Valores de partição em ordem crescente (lista vazia se não existir).
+    """
+    dataset = Path(dataset)
+    if not dataset.is_dir():
+        return []
+
+    prefixo = f"{coluna}="
+    return sorted(
+        int(nome[len(prefixo):])
+        for nome in os.listdir(dataset)
+        if nome.startswith(prefixo)
+    )
+
+
+def fontes_particoes(
+    origens: list[Path],
+    coluna: str = COLUNA_PARTICAO,
+) -> dict[int, list[Path]]:
+    """Arquivos de cada valor de partição nos datasets de origem."""
+    fontes = {}
+    for origem in origens:
+        for valor in listar_particoes(origem, coluna):
+            fontes.setdefault(valor, []).append(
+                pasta_particao(origem, valor, coluna) / ARQUIVO_PARTICAO
+            )
+    return fontes
+
+
+def particoes_desatualizadas(
+    origens: list[Path],
+    destino: Path,
+    manifesto: dict,
+    versao: str,
+    coluna: str = COLUNA_PARTICAO,
+) -> list[int]:
+    """
+    Partições das origens a (re)calcular em um dataset derivado.
+
+    Usado por etapas derivadas de datasets particionados (ex.: trajetórias a
+    partir do fato de eventos). A decisão vem do manifesto da etapa
+    (`manifest.chaves_alteradas`): um dia novo, reconstruído por backfill na
+    origem ou calculado por outra versão do código é refeito, assim como um
+    dia que falta no destino. Só os metadados dos arquivos são consultados.
+
+    Args:
+        origens: Datasets lidos pela etapa.
+        destino: Dataset gravado pela etapa.
+        manifesto: Manifesto da etapa (ver `manifest.registrar_chaves`).
+        versao: Versão atual do código da etapa.
+        coluna: Coluna de partição.
+
+    Returns:
+        Valores de partição em ordem crescente.
+    """
+    fontes = fontes_particoes(origens, coluna)
+    faltando = set(fontes) - set(listar_particoes(destino, coluna))
+    return sorted(set(chaves_alteradas(manifesto, fontes, versao)) | faltando)
+
+
+def _gravar_pasta_temporaria(
+    df: pd.DataFrame,
+    dataset: Path,
+    coluna: str,
+) -> Path:
+    """Grava o DataFrame (sem a coluna de partição) em uma pasta oculta."""
+    tmp = Path(dataset) / f".tmp-{uuid.uuid4().hex}"
+    tmp.mkdir(parents=True)
+    escrever_parquet(
+        df.drop(columns=[coluna]), tmp / ARQUIVO_PARTICAO, tabela=Path(dataset).name
+    )
+    return tmp
+
+
+def publicar_particao(tmp: Path, destino: Path) -> None:
+    """
+    Colocar uma pasta temporária no lugar da partição de forma atômica.
+
+    Uma partição nova é a própria pasta temporária renomeada. Em uma partição
+    que já existe, só o arquivo é trocado (`os.replace` sobre
+    `ARQUIVO_PARTICAO`): a pasta nunca deixa de existir e um leitor abre o
+    arquivo antigo ou o novo, nunca nenhum dos dois.
+    """
+    if not destino.exists():
+        os.rename(tmp, destino)
+        return
+    os.replace(tmp / ARQUIVO_PARTICAO, destino / ARQUIVO_PARTICAO)
+    shutil.rmtree(tmp)
+
+
+def escrever_particao(
+    df: pd.DataFrame,
+    dataset: Path,
+    valor: int,
+    coluna: str = COLUNA_PARTICAO,
+) -> Path:
+    """
+    Gravar (ou substituir) uma partição inteira de forma atômica.
+
+    Args:
+        df: Registros da partição (todos com `coluna == valor`).
+        dataset: Diretório do dataset.
+        valor: Valor da partição.
+        coluna: Coluna de partição.
+
+    Returns:
+        Pasta da partição gravada.
+    """
+    destino = pasta_particao(dataset, valor, coluna)
+    publicar_particao(_gravar_pasta_temporaria(df, dataset, coluna), destino)
+    return destino
+
+
+def escrever_particoes(
+    df: pd.DataFrame,
+    dataset: Path,
+    coluna: str = COLUNA_PARTICAO,
+    sobrescrever: bool = False,
+) -> list[int]:
+    """
+    Gravar um DataFrame como partições por `coluna`.
+
+    Args:
+        df: Registros a gravar.
+        dataset: Diretório do dataset.
+        coluna: Coluna de partição.
+        sobrescrever: Se False, partições já existentes são mantidas e os
+            registros desses dias são descartados.
+
+    Returns:
+        Valores das partições gravadas.
+    """
+    Path(dataset).mkdir(parents=True, exist_ok=True)
+    existentes = set() if sobrescrever else set(listar_particoes(dataset, coluna))
+
+    gravadas = []
+    for valor, parte in df.groupby(coluna, sort=True, observed=True):
+        valor = int(valor)
+        if valor in existentes:
+            continue
+        escrever_particao(parte, dataset, valor, coluna)
+        gravadas.append(valor)
+    return gravadas
+
+
+def ler_dataset(
+    dataset: Path,
+    columns: list[str] | None = None,
+    valores: list[int] | None = None,
+    coluna: str = COLUNA_PARTICAO,
+) -> pd.DataFrame:
+    """
+    Ler um dataset particionado, com a coluna de partição como int32.
+
+    Args:
+        dataset: Diretório do dataset.
+        columns: Colunas a ler (todas se None).
+        valores: Partições a ler (todas se None). As demais nem são abertas.
+        coluna: Coluna de partição.
+    """
+    particionamento = ds.partitioning(pa.schema([(coluna, pa.int32())]), flavor="hive")
+    dados = ds.dataset(dataset, format="parquet", partitioning=particionamento)
+
+    filtro = None
+    if valores is not None:
+        filtro = ds.field(coluna).isin(list(valores))
+
+    return dados.to_table(columns=columns, filter=filtro).to_pandas()
+
+
+def ler_parquets(
+    arquivos: list[Path],
+    columns: list[str] | None = None,
+    filtro: ds.Expression | None = None,
+) -> pd.DataFrame:
+    """
+    Ler vários arquivos parquet de mesmo schema como uma única tabela.
+
+    Usado para a silver do MCO, que tem um arquivo por mês baixado. Dentro de
+    uma sessão de `artifacts`, cada arquivo vem da memória quando possível.
+
+    Args:
+        arquivos: Arquivos a ler.
+        columns: Colunas a ler (todas se None).
+        filtro: Filtro do pyarrow aplicado na leitura.
+
+    Raises:
+        FileNotFoundError: Se a lista de arquivos estiver vazia.
+    """
+    if not arquivos:
+        raise FileNotFoundError("Nenhum arquivo parquet para ler")
+    if artifacts.ativo():
+        tabelas = [artifacts.ler_tabela(a, columns, filtro) for a in arquivos]
+        try:
+            return pa.concat_tables(tabelas, promote_options="default").to_pandas()
+        except pa.ArrowInvalid:
+            pass  # schemas incompatíveis: o dataset abaixo unifica os tipos
+    dados = ds.dataset([str(a) for a in arquivos], format="parquet")
+    return dados.to_table(columns=columns, filter=filtro).to_pandas()
@@ -0,0 +1,337 @@
+"""
+Índice espacial em grade para os eventos do Tempo Real.
+
+Cada posição (latitude, longitude) é quantizada em uma grade regular sobre o
+globo e as duas coordenadas da célula são intercaladas bit a bit (curva de
+Morton / Z-order). O resultado é um inteiro em que células próximas tendem a
+ter códigos próximos, então uma caixa geográfica corresponde a poucos
+intervalos de códigos.
+
+Os eventos de cada dia continuam ordenados por linha e veículo (ver
+`writer.ORDENACAO`), que são as consultas mais comuns. Para a consulta por
+caixa, cada dia tem um índice secundário em `<fato>/_indice_espacial/`, com
+as células presentes em cada row group: `consultar_bbox` lê só os row groups
+com alguma célula dentro dos intervalos da caixa. A pasta começa com "_",
+então o pyarrow e `listar_particoes` a ignoram, e o manifesto dela diz quais
+dias estão com o índice em dia; os demais são lidos pelo filtro comum.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.transform.gold.partitions import fontes_particoes
+from src.transform.gold.writer import escrever_parquet
+from src.transform.manifest import (
+    carregar_manifesto,
+    chaves_alteradas,
+    registrar_chaves,
+    salvar_manifesto,
+    versao_modulos,
+)
+
+# Bits por eixo: 16 dá células de ~0,0055° x 0,0027° (~600 m x 300 m em BH)
+BITS_CELULA = 16
+
+# Raio médio da Terra, em metros
+RAIO_TERRA_M = 6_371_008.8
+
+# Limites usados ao converter uma caixa em intervalos de células
+MAX_CELULAS_CONSULTA = 1 << 20
+MAX_INTERVALOS_CONSULTA = 64
+
+# Índice secundário de células por row group, dentro de cada fato
+PASTA_INDICE = "_indice_espacial"
+MODULOS_INDICE = ["src.transform.gold.spatial"]
+
+
+def _quantizar(valores, minimo: float, maximo: float, bits: int) -> np.ndarray:
+    """Índice da célula (0 .. 2**bits - 1) de cada valor em um eixo."""
+    n = 1 << bits
+    posicao = (np.asarray(valores, dtype="float64") - minimo) / (maximo - minimo) * n
+    return np.clip(np.floor(posicao), 0, n - 1).astype("uint64")
+
+
+def _espalhar_bits(x: np.ndarray) -> np.ndarray:
+    """Intercalar zeros entre os bits de x (até 32 bits)."""
+    x = x & np.uint64(0xFFFFFFFF)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x3333333333333333)
+    x = (x | (x << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return x
+
+
+def _morton(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Código de Morton das células (x nos bits pares, y nos ímpares)."""
+    return (_espalhar_bits(x) | (_espalhar_bits(y) << np.uint64(1))).astype("int64")
+
+
+def celula_espacial(
+    latitude: pd.Series,
+    longitude: pd.Series,
+    bits: int = BITS_CELULA,
+) -> pd.Series:
+    """
+    Calcular a célula da grade de cada posição, de forma vetorizada.
+
+    Args:
+        latitude: Latitudes (WGS84).
+        longitude: Longitudes (WGS84).
+        bits: Resolução, em bits por eixo (1 a 31).
+
+    Returns:
+        Série Int64 com o código da célula (nulo onde faltar coordenada ou a
+        coordenada estiver fora do intervalo válido).
+    """
+    if not 1 <= bits <= 31:
+        raise ValueError(f"Resolução inválida: {bits} bits por eixo")
+
+    lat = pd.to_numeric(latitude, errors="coerce").astype("float64").to_numpy()
+    lon = pd.to_numeric(longitude, errors="coerce").astype("float64").to_numpy()
+    validas = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+
+    codigos = _morton(
+        _quantizar(np.where(validas, lon, 0), -180, 180, bits),
+        _quantizar(np.where(validas, lat, 0), -90, 90, bits),
+    )
+    resultado = pd.Series(codigos, index=latitude.index, dtype="Int64")
+    resultado[~validas] = pd.NA
+    return resultado
+
+
+def distancia_haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Distância em metros entre pares de pontos, pela fórmula de haversine.
+
+    Args:
+        lat1, lon1: Coordenadas de origem (graus, arrays do mesmo tamanho).
+        lat2, lon2: Coordenadas de destino (graus).
+
+    Returns:
+        Array float64 de distâncias (NaN onde faltar coordenada).
+    """
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(v, dtype="float64")) for v in (lat1, lon1, lat2, lon2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * RAIO_TERRA_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def intervalos_bbox(
+    lat_min: float,
+    lat_max: float,
+    lon_min: float,
+    lon_max: float,
+    bits: int = BITS_CELULA,
+    max_intervalos: int = MAX_INTERVALOS_CONSULTA,
+) -> list[tuple[int, int]]:
+    """
+    Converter uma caixa geográfica em intervalos de códigos de célula.
+
+    Toda posição dentro da caixa tem célula dentro de algum intervalo. Os
+    intervalos podem cobrir células fora da caixa (caixas grandes são
+    enumeradas em uma grade mais grossa e intervalos próximos são unidos até
+    `max_intervalos`), por isso a consulta ainda filtra latitude e longitude.
+
+    Returns:
+        Lista de intervalos (início, fim), inclusivos e em ordem crescente.
+    """
+    x0, x1 = _quantizar([lon_min, lon_max], -180, 180, bits)
+    y0, y1 = _quantizar([lat_min, lat_max], -90, 90, bits)
+
+    # nível mais fino em que a caixa cabe no limite de células
+    nivel = bits
+    while nivel > 0 and (
+        ((int(x1) >> (bits - nivel)) - (int(x0) >> (bits - nivel)) + 1)
+        * ((int(y1) >> (bits - nivel)) - (int(y0) >> (bits - nivel)) + 1)
+        > MAX_CELULAS_CONSULTA
+    ):
+        nivel -= 1
+    desloc = bits - nivel
+
+    xs = np.arange(int(x0) >> desloc, (int(x1) >> desloc) + 1, dtype="uint64")
+    ys = np.arange(int(y0) >> desloc, (int(y1) >> desloc) + 1, dtype="uint64")
+    gx, gy = np.meshgrid(xs, ys)
+    codigos = np.unique(_morton(gx.ravel(), gy.ravel()))
+
+    # cada célula do nível grosso cobre 4**desloc células da resolução final
+    inicios = codigos << (2 * desloc)
+    fins = ((codigos + 1) << (2 * desloc)) - 1
+
+    # quebras entre intervalos, mantendo só os maiores vãos
+    vaos = inicios[1:] - fins[:-1]
+    quebras = np.flatnonzero(vaos > 1)
+    if len(quebras) >= max_intervalos:
+        maiores = np.argsort(vaos[quebras], kind="stable")[::-1][: max_intervalos - 1]
+        quebras = np.sort(quebras[maiores])
+
+    comecos = np.concatenate([[0], quebras + 1])
+    finais = np.concatenate([quebras, [len(codigos) - 1]])
+    return [(int(inicios[a]), int(fins[b])) for a, b in zip(comecos, finais)]
+
+
+def filtro_bbox(
+    lat_min: float,
+    lat_max: float,
+    lon_min: float,
+    lon_max: float,
+    bits: int = BITS_CELULA,
+) -> ds.Expression:
+    """Filtro do pyarrow para os eventos dentro de uma caixa geográfica."""
+    celula = ds.field("celula_espacial")
+    filtro = None
+    for inicio, fim in intervalos_bbox(lat_min, lat_max, lon_min, lon_max, bits):
+        termo = (celula >= inicio) & (celula <= fim)
+        filtro = termo if filtro is None else filtro | termo
+
+    return (
+        filtro
+        & (ds.field("latitude") >= lat_min)
+        & (ds.field("latitude") <= lat_max)
+        & (ds.field("longitude") >= lon_min)
+        & (ds.field("longitude") <= lon_max)
+    )
+
+
+def _pasta_indice(dataset: Path) -> Path:
+    """Pasta do índice espacial de um fato."""
+    return Path(dataset) / PASTA_INDICE
+
+
+def _estado_indice(dataset: Path, dias=None) -> tuple[dict, dict, str, list[int]]:
+    """Fontes por dia, manifesto, versão e dias com o índice desatualizado."""
+    fontes = fontes_particoes([dataset])
+    if dias is not None:
+        fontes = {d: fontes[d] for d in {int(d) for d in dias} if d in fontes}
+    manifesto = carregar_manifesto(_pasta_indice(dataset) / "_manifest.json")
+    versao = versao_modulos(*MODULOS_INDICE)
+    return fontes, manifesto, versao, chaves_alteradas(manifesto, fontes, versao)
+
+
+def indexar_particao(arquivo: Path) -> pd.DataFrame:
+    """
+    Células presentes em cada row group de uma partição.
+
+    Returns:
+        DataFrame com os pares distintos (celula_espacial, row_group).
+    """
+    parquet = pq.ParquetFile(arquivo)
+    partes = []
+    for grupo in range(parquet.num_row_groups):
+        celulas = parquet.read_row_group(grupo, columns=["celula_espacial"]).column(0)
+        unicas = pc.unique(pc.drop_null(celulas)).to_numpy(zero_copy_only=False)
+        partes.append(pd.DataFrame({
+            "celula_espacial": unicas.astype("int64"),
+            "row_group": np.full(len(unicas), grupo, dtype="int32"),
+        }))
+    if not partes:
+        return pd.DataFrame({
+            "celula_espacial": pd.Series(dtype="int64"),
+            "row_group": pd.Series(dtype="int32"),
+        })
+    return pd.concat(partes, ignore_index=True)
+
+
+def atualizar_indice_espacial(dataset: Path, dias=None) -> list[int]:
+    """
+    (Re)gravar o índice espacial dos dias cuja partição mudou.
+
+    Args:
+        dataset: Diretório do fato particionado (com a coluna celula_espacial).
+        dias: data_key a considerar (todos os gravados se None).
+
+    Returns:
+        Dias indexados nesta chamada.
+    """
+    pasta = _pasta_indice(dataset)
+    fontes, manifesto, versao, alterados = _estado_indice(dataset, dias)
+    if not alterados:
+        return []
+
+    pasta.mkdir(parents=True, exist_ok=True)
+    for dia in alterados:
+        destino = pasta / f"{dia}.parquet"
+        temporario = pasta / f".{dia}.parquet.tmp"
+        escrever_parquet(indexar_particao(fontes[dia][0]), temporario, "indice_espacial")
+        os.replace(temporario, destino)
+
+    salvar_manifesto(pasta / "_manifest.json", registrar_chaves(
+        manifesto, {dia: fontes[dia] for dia in alterados}, versao
+    ))
+    print(f"Gold: {Path(dataset).name} - índice espacial de {len(alterados)} dias")
+    return alterados
+
+
+def _grupos_na_caixa(indice: pd.DataFrame, intervalos) -> list[int]:
+    """Row groups com alguma célula dentro dos intervalos."""
+    celulas = indice["celula_espacial"].to_numpy()
+    dentro = np.zeros(len(celulas), dtype=bool)
+    for inicio, fim in intervalos:
+        dentro |= (celulas >= inicio) & (celulas <= fim)
+    return sorted(set(indice["row_group"].to_numpy()[dentro].tolist()))
+
+
+def consultar_bbox(
+    dataset: Path,
+    lat_min: float,
+    lat_max: float,
+    lon_min: float,
+    lon_max: float,
+    columns: list[str] | None = None,
+    dias: list[int] | None = None,
+    bits: int = BITS_CELULA,
+) -> pd.DataFrame:
+    """
+    Ler os eventos de um fato dentro de uma caixa geográfica.
+
+    Os dias fora de `dias` nem são abertos. Nos dias com índice espacial em
+    dia, só os row groups com alguma célula na caixa são lidos; nos demais,
+    o filtro vale para o dia inteiro (com a poda que as estatísticas
+    permitirem). O resultado é o mesmo nos dois casos.
+
+    Args:
+        dataset: Diretório do fato particionado (ex.: fato_tempo_real_evento).
+        lat_min, lat_max, lon_min, lon_max: Limites da caixa (inclusivos).
+        columns: Colunas a ler (todas se None).
+        dias: data_key a consultar (todos se None).
+        bits: Resolução usada na gravação da coluna `celula_espacial`.
+
+    Returns:
+        Eventos dentro da caixa, com data_key como int32.
+    """
+    particionamento = ds.partitioning(pa.schema([("data_key", pa.int32())]), flavor="hive")
+    dados = ds.dataset(dataset, format="parquet", partitioning=particionamento)
+
+    filtro = filtro_bbox(lat_min, lat_max, lon_min, lon_max, bits)
+    if dias is not None:
+        filtro = ds.field("data_key").isin(list(dias)) & filtro
+
+    # o índice é gravado na resolução padrão
+    indexados = set()
+    if bits == BITS_CELULA:
+        fontes, _, _, alterados = _estado_indice(dataset, dias)
+        indexados = set(fontes) - set(alterados)
+    intervalos = intervalos_bbox(lat_min, lat_max, lon_min, lon_max, bits)
+    fragmentos = []
+    for fragmento in dados.get_fragments(filter=filtro):
+        dia = ds.get_partition_keys(fragmento.partition_expression).get("data_key")
+        if dia in indexados:
+            indice = pd.read_parquet(_pasta_indice(dataset) / f"{dia}.parquet")
+            grupos = _grupos_na_caixa(indice, intervalos)
+            if not grupos:
+                continue
+            fragmento = fragmento.subset(row_group_ids=grupos)
+        fragmentos.append(fragmento)
+
+    selecionados = ds.FileSystemDataset(fragmentos, dados.schema, dados.format)
+    return selecionados.to_table(columns=columns, filter=filtro).to_pandas()
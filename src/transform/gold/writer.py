@@ -0,0 +1,276 @@
+"""
+Gravação das tabelas da camada gold em parquet.
+
+Centraliza as opções de escrita (compressão, tamanho de row group, estatísticas
+e dicionário) e a ordenação de cada tabela pelas suas chaves de cluster. Com
+os dados ordenados, as estatísticas min/max de cada row group ficam estreitas e
+consultas como "linha X no dia Y" conseguem pular a maior parte do arquivo.
+"""
+import bisect
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Opções de escrita padrão da gold
+CONFIG_GOLD = {
+    "compression": "zstd",
+    "row_group_size": 64_000,
+    "write_statistics": True,
+    "use_dictionary": True,
+}
+
+# Chaves de cluster por tabela (data_key já é a partição dos fatos)
+ORDENACAO = {
+    "dim_data": ["data_key"],
+    "dim_linha": ["linha"],
+    "dim_concessionaria": ["concessionaria_numero"],
+    "dim_empresa": ["empresa_operadora"],
+    "dim_veiculo": ["veiculo_id"],
+    "fato_mco_viagem": ["data_key", "linha_key", "veiculo_key", "hora_saida"],
+    "fato_tempo_real_evento": ["data_key", "linha_key", "veiculo_key", "data_hora"],
+    "fato_trajetoria_segmento": ["data_key", "veiculo_key", "data_hora_inicio"],
+    "fato_evento_viagem": ["data_key", "viagem_key", "data_hora"],
+    "fato_viagem_gps": ["data_key", "veiculo_key", "hora_saida"],
+    "agg_mco_linha_dia": ["data_key", "linha_key", "empresa_key"],
+    "agg_falha_mecanica_veiculo_dia": ["data_key", "veiculo_key"],
+    "agg_tr_linha_hora": ["data_key", "linha_key", "hora"],
+    "indice_espacial": ["celula_espacial", "row_group"],
+}
+
+
+def opcoes_escrita(**sobrescritas) -> dict:
+    """Opções de escrita da gold, com eventuais valores sobrescritos."""
+    opcoes = dict(CONFIG_GOLD)
+    opcoes.update(sobrescritas)
+    return opcoes
+
+
+def tipos_canonicos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Padronizar os tipos que dependem de como os dados foram lidos.
+
+    O mesmo dia pode chegar da silver em memória ou lido do disco, inteiro ou
+    filtrado (backfill). Para que a partição gravada seja sempre a mesma:
+
+    * categorias ficam só com os valores presentes, em ordem crescente (a
+      leitura filtrada traz só as categorias dos row groups lidos);
+    * datetime64[s] vira datetime64[ms], a menor unidade que o parquet guarda
+      (a tabela em memória ainda está em segundos, a lida do disco não).
+    """
+    convertidas = {}
+    for coluna, tipo in df.dtypes.items():
+        if isinstance(tipo, pd.CategoricalDtype):
+            serie = df[coluna].cat.remove_unused_categories()
+            convertidas[coluna] = serie.cat.reorder_categories(
+                serie.cat.categories.sort_values()
+            )
+        elif pd.api.types.is_datetime64_dtype(tipo):
+            if np.datetime_data(tipo)[0] == "s":
+                convertidas[coluna] = df[coluna].dt.as_unit("ms")
+    return df.assign(**convertidas) if convertidas else df
+
+
+def ordenar(df: pd.DataFrame, tabela: str) -> pd.DataFrame:
+    """
+    Ordenar um DataFrame pelas chaves de cluster da tabela.
+
+    A ordenação é estável e as colunas ausentes (ex.: data_key, que vira
+    partição) são ignoradas, então o resultado é determinístico.
+    """
+    chaves = [c for c in ORDENACAO.get(tabela, []) if c in df.columns]
+    if not chaves:
+        return df
+    return df.sort_values(chaves, kind="stable", na_position="last", ignore_index=True)
+
+
+def escrever_parquet(
+    df: pd.DataFrame,
+    caminho: Path,
+    tabela: str | None = None,
+    **sobrescritas,
+) -> pa.Table:
+    """
+    Gravar um DataFrame da gold ordenado, com tipos canônicos e com as opções
+    de escrita padrão.
+
+    Args:
+        df: Dados a gravar.
+        caminho: Arquivo parquet de destino.
+        tabela: Nome da tabela para escolher as chaves de cluster (padrão: nome
+            do arquivo sem extensão).
+        **sobrescritas: Opções do `pyarrow.parquet.write_table` a sobrescrever.
+
+    Returns:
+        A tabela Arrow gravada.
+    """
+    caminho = Path(caminho)
+    df = ordenar(tipos_canonicos(df), tabela or caminho.stem)
+    dados = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(dados, caminho, **opcoes_escrita(**sobrescritas))
+    return dados
+
+
+def abrir_writer(caminho: Path, schema: pa.Schema, **sobrescritas) -> pq.ParquetWriter:
+    """Abrir um ParquetWriter com as opções da gold (exceto row_group_size)."""
+    opcoes = opcoes_escrita(**sobrescritas)
+    opcoes.pop("row_group_size")
+    return pq.ParquetWriter(caminho, schema, **opcoes)
+
+
+def _categorias(arquivos: list[pq.ParquetFile]) -> dict[str, pd.Index]:
+    """Categorias presentes em cada coluna categórica, somando os arquivos."""
+    categorias = {}
+    for arquivo in arquivos:
+        amostra = arquivo.schema_arrow.empty_table().to_pandas()
+        colunas = [
+            c for c, tipo in amostra.dtypes.items()
+            if isinstance(tipo, pd.CategoricalDtype)
+        ]
+        if not colunas:
+            continue
+        for lote in arquivo.iter_batches(columns=colunas):
+            for coluna, serie in lote.to_pandas().items():
+                presentes = serie.cat.remove_unused_categories().cat.categories
+                categorias[coluna] = categorias.get(coluna, presentes[:0]).union(presentes)
+    return {c: valores.sort_values() for c, valores in categorias.items()}
+
+
+def _chaves_linhas(df: pd.DataFrame, chaves: list[str]) -> list[np.ndarray]:
+    """Colunas de ordenação como arrays de objetos (categorias pelo código)."""
+    colunas = []
+    for chave in chaves:
+        serie = df[chave]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.cat.codes.where(serie.notna())
+        colunas.append(serie.to_numpy(dtype=object))
+    return colunas
+
+
+def _chave(colunas: list[np.ndarray], posicao: int) -> tuple:
+    """Chave comparável de uma linha, com os nulos depois de todos os valores."""
+    return tuple(
+        (1, 0) if pd.isna(valor) else (0, valor)
+        for valor in (coluna[posicao] for coluna in colunas)
+    )
+
+
+def _fim_prefixo(colunas: list[np.ndarray], inicio: int, fim: int, limite: tuple,
+                 inclusive: bool) -> int:
+    """Fim do prefixo ordenado [inicio, fim) com chaves abaixo do limite."""
+    busca = bisect.bisect_right if inclusive else bisect.bisect_left
+    return inicio + busca(range(inicio, fim), limite, key=lambda pos: _chave(colunas, pos))
+
+
+def mesclar_ordenados(
+    runs: list[Path],
+    caminho: Path,
+    tabela: str,
+    linhas_em_memoria: int,
+    **sobrescritas,
+) -> int:
+    """
+    Gravar a mescla de arquivos já ordenados, com memória limitada.
+
+    Cada run, gravado por `escrever_parquet`, é lido em blocos. A cada passo
+    vale como limite a menor "última chave" entre os runs que ainda têm
+    linhas por ler: as linhas abaixo dele (e as iguais, dos runs até o que o
+    definiu) já estão na posição final e são gravadas. Empates seguem a ordem
+    dos runs, então o arquivo é o mesmo, byte a byte, que `escrever_parquet`
+    gravaria com a concatenação dos runs, e em memória ficam cerca de
+    `linhas_em_memoria` linhas mais um row group.
+
+    Args:
+        runs: Arquivos ordenados pelas chaves de cluster de `tabela`, na
+            ordem em que os dados chegaram.
+        caminho: Arquivo parquet de destino.
+        tabela: Nome da tabela para escolher as chaves de cluster.
+        linhas_em_memoria: Linhas lidas dos runs, somadas, a cada passo.
+        **sobrescritas: Opções de escrita a sobrescrever.
+
+    Returns:
+        Número de linhas gravadas.
+    """
+    arquivos = [pq.ParquetFile(run) for run in runs]
+    chaves = [
+        c for c in ORDENACAO.get(tabela, []) if c in arquivos[0].schema_arrow.names
+    ]
+    categorias = _categorias(arquivos)
+    row_group = opcoes_escrita(**sobrescritas)["row_group_size"]
+
+    bloco = max(1, linhas_em_memoria // len(arquivos))
+    leitores = [a.iter_batches(batch_size=bloco) for a in arquivos]
+    # por run: bloco em memória, suas chaves e a primeira linha ainda não gravada
+    buffers = [pd.DataFrame() for _ in arquivos]
+    valores = [[] for _ in arquivos]
+    inicio = [0 for _ in arquivos]
+    abertos = set(range(len(arquivos)))
+    pendentes = []
+    writer = None
+    gravadas = 0
+
+    def gravar(df: pd.DataFrame) -> None:
+        nonlocal writer, gravadas
+        dados = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        if writer is None:
+            writer = abrir_writer(caminho, dados.schema, **sobrescritas)
+        writer.write_table(dados, row_group_size=row_group)
+        gravadas += len(df)
+
+    try:
+        while True:
+            for i in list(abertos):
+                if inicio[i] == len(buffers[i]):
+                    lote = next(leitores[i], None)
+                    if lote is None:
+                        abertos.discard(i)
+                        continue
+                    df = lote.to_pandas()
+                    for coluna, categoria in categorias.items():
+                        df[coluna] = df[coluna].cat.set_categories(categoria)
+                    buffers[i], valores[i], inicio[i] = df, _chaves_linhas(df, chaves), 0
+
+            restantes = [i for i in range(len(arquivos)) if inicio[i] < len(buffers[i])]
+            if not restantes:
+                break
+
+            # limite: a menor última chave dos runs abertos (a do menor run, no empate)
+            limite, j = None, None
+            for i in sorted(abertos):
+                ultima = _chave(valores[i], len(buffers[i]) - 1)
+                if limite is None or ultima < limite:
+                    limite, j = ultima, i
+
+            partes = []
+            for i in restantes:
+                fim = len(buffers[i])
+                if limite is not None:
+                    # cada bloco está ordenado: as linhas prontas são um prefixo
+                    fim = _fim_prefixo(valores[i], inicio[i], fim, limite, i <= j)
+                if fim > inicio[i]:
+                    partes.append(buffers[i].iloc[inicio[i]:fim])
+                inicio[i] = fim
+
+            # concatenadas na ordem dos runs, a ordenação estável desempata por ela
+            mescladas = pd.concat(partes, ignore_index=True)
+            if chaves:
+                mescladas = mescladas.sort_values(
+                    chaves, kind="stable", na_position="last", ignore_index=True
+                )
+            prontas = pd.concat([*pendentes, mescladas], ignore_index=True)
+
+            # grava só row groups completos, como o `pq.write_table` do arquivo inteiro
+            completos = len(prontas) - len(prontas) % row_group
+            if completos:
+                gravar(prontas.iloc[:completos])
+            pendentes = [prontas.iloc[completos:]]
+
+        resto = pd.concat(pendentes, ignore_index=True) if pendentes else pd.DataFrame()
+        if not resto.empty or writer is None:
+            gravar(resto)
+    finally:
+        if writer is not None:
+            writer.close()
+    return gravadas
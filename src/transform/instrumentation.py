@@ -0,0 +1,372 @@
+"""
+Instrumentação das etapas do pipeline e relatório de execução.
+
+`medir(nome)` envolve uma etapa ou subetapa (leitura, conversão,
+deduplicação, junção, escrita...) e registra tempo de parede, tempo de CPU
+(do processo e dos filhos), pico de memória residente, bytes lidos/gravados
+(/proc/self/io) e as linhas informadas por `registrar`. Medições aninhadas
+viram subetapas da medição ativa; subetapas de mesmo nome (ex.: uma por bloco
+lido) são somadas em um único registro, com o número de `vezes`.
+
+Fora de uma execução iniciada por `iniciar_execucao`, as medições de primeiro
+nível não são guardadas, então as funções instrumentadas podem ser chamadas
+isoladamente sem custo de memória. `finalizar_execucao` grava o relatório
+JSON da execução em `data/runs/`.
+
+O pico de memória por etapa usa o VmHWM do Linux, zerado no início de cada
+medição (/proc/self/clear_refs); onde isso não é possível, o valor é o pico
+do processo até o fim da etapa. Processos filhos (ex.: silver com
+`workers > 1`) entram no tempo de CPU, mas não no pico nem nos bytes.
+
+Cada thread tem a sua pilha de medições, então etapas podem rodar em
+paralelo em threads. Os contadores são do processo: etapas que rodaram ao
+mesmo tempo recebem `concorrente: true`, e o seu tempo de CPU, pico e bytes
+incluem o trabalho das outras.
+
+Perfis opcionais por etapa: `configurar_perfis({"silver": "cprofile"})` ou a
+variável de ambiente `PIPELINE_PERFIL="silver:cprofile,fatos:tracemalloc"`.
+O cProfile grava um `.prof` ao lado do relatório (abrir com `pstats` ou
+snakeviz) e o tracemalloc registra o pico alocado e as linhas que mais
+alocaram.
+"""
+import cProfile
+import json
+import os
+import platform
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+RELATORIOS_DIR = Path("data/runs")
+VARIAVEL_PERFIL = "PIPELINE_PERFIL"
+PERFIS = ("cprofile", "tracemalloc")
+
+TOP_PERFIL = 15
+
+# Campos somados quando subetapas de mesmo nome são agrupadas
+SOMADOS = (
+    "segundos", "cpu_segundos", "bytes_lidos", "bytes_gravados",
+    "linhas_entrada", "linhas_saida", "vezes",
+)
+
+_execucao = None
+_perfis = {}
+_local = threading.local()
+_trava = threading.Lock()
+# medições de primeiro nível abertas, de todas as threads
+_abertas = []
+
+
+def _pilha() -> list[dict]:
+    """Pilha de medições abertas na thread atual."""
+    if not hasattr(_local, "pilha"):
+        _local.pilha = []
+    return _local.pilha
+
+
+def _ler_proc(arquivo: str) -> dict[str, int]:
+    """Campos numéricos de um arquivo `chave: valor` do /proc (vazio se não houver)."""
+    try:
+        with open(f"/proc/self/{arquivo}", encoding="ascii") as f:
+            linhas = f.read().splitlines()
+    except OSError:
+        return {}
+    campos = {}
+    for linha in linhas:
+        chave, _, valor = linha.partition(":")
+        partes = valor.split()
+        if partes and partes[0].isdigit():
+            campos[chave] = int(partes[0])
+    return campos
+
+
+def _pico_rss_kb() -> int:
+    """Pico de memória residente (KiB) desde o último zeramento."""
+    status = _ler_proc("status")
+    if "VmHWM" in status:
+        return status["VmHWM"]
+    # ru_maxrss: KiB no Linux, bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico // 1024 if sys.platform == "darwin" else pico
+
+
+def _zerar_pico() -> bool:
+    """Zerar o VmHWM do processo (Linux); retorna se foi possível."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _amostra() -> dict:
+    """Contadores acumulados do processo no instante atual."""
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io = _ler_proc("io")
+    return {
+        "parede": time.perf_counter(),
+        "cpu": time.process_time() + filhos.ru_utime + filhos.ru_stime,
+        "lidos": io.get("rchar", 0),
+        "gravados": io.get("wchar", 0),
+    }
+
+
+def configurar_perfis(perfis=None) -> dict[str, str]:
+    """
+    Definir as etapas com perfil ligado.
+
+    Args:
+        perfis: Dicionário {etapa: "cprofile" | "tracemalloc"} ou texto
+            "etapa:modo,etapa:modo". Se None, lê a variável PIPELINE_PERFIL.
+
+    Raises:
+        ValueError: Se algum modo for desconhecido.
+    """
+    if perfis is None:
+        perfis = os.environ.get(VARIAVEL_PERFIL, "")
+    if isinstance(perfis, str):
+        perfis = dict(
+            item.split(":", 1) for item in perfis.replace("=", ":").split(",") if item
+        )
+    invalidos = {m for m in perfis.values() if m not in PERFIS}
+    if invalidos:
+        raise ValueError(f"Perfil desconhecido: {', '.join(sorted(invalidos))}")
+
+    _perfis.clear()
+    _perfis.update(perfis)
+    return dict(_perfis)
+
+
+def iniciar_execucao(
+    nome: str = "run_pipeline",
+    diretorio: Path = RELATORIOS_DIR,
+    **parametros,
+) -> dict:
+    """
+    Iniciar o registro de uma execução (descarta qualquer execução anterior).
+
+    Args:
+        nome: Nome da execução no relatório.
+        diretorio: Pasta dos relatórios e perfis.
+        **parametros: Parâmetros da execução, copiados para o relatório.
+    """
+    global _execucao
+    _pilha().clear()
+    _abertas.clear()
+    if not _perfis:
+        configurar_perfis()
+
+    inicio = datetime.now()
+    _execucao = {
+        "execucao_id": f"{inicio:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}",
+        "nome": nome,
+        "inicio": inicio.isoformat(timespec="seconds"),
+        "parametros": parametros,
+        "perfis": dict(_perfis),
+        "ambiente": {
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "pid": os.getpid(),
+            "cpus": os.cpu_count(),
+        },
+        "pico_rss_por_etapa": _zerar_pico(),
+        "etapas": [],
+        "_diretorio": str(diretorio),
+        "_amostra": _amostra(),
+    }
+    return _execucao
+
+
+def _anexar(registros: list[dict], registro: dict) -> None:
+    """Anexar uma medição, somando-a à de mesmo nome se já existir."""
+    existente = next((r for r in registros if r["nome"] == registro["nome"]), None)
+    if existente is None:
+        registros.append(registro)
+        return
+    for campo in SOMADOS:
+        if campo in registro:
+            existente[campo] = round(existente.get(campo, 0) + registro[campo], 4)
+    existente["pico_rss_mb"] = max(existente["pico_rss_mb"], registro["pico_rss_mb"])
+    for sub in registro.get("subetapas", []):
+        _anexar(existente.setdefault("subetapas", []), sub)
+
+
+def registrar(**valores) -> None:
+    """
+    Acrescentar valores à medição ativa (ex.: `registrar(linhas_saida=n)`).
+
+    Números são somados aos já registrados; outros valores substituem.
+    """
+    pilha = _pilha()
+    if not pilha:
+        return
+    registro = pilha[-1]["registro"]
+    for chave, valor in valores.items():
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            registro[chave] = registro.get(chave, 0) + valor
+        else:
+            registro[chave] = valor
+
+
+def _iniciar_perfil(nome: str):
+    modo = _perfis.get(nome)
+    if modo == "cprofile" and not any(f.get("perfil") == "cprofile" for f in _pilha()):
+        perfil = cProfile.Profile()
+        perfil.enable()
+        return modo, perfil
+    if modo == "tracemalloc":
+        iniciado = not tracemalloc.is_tracing()
+        if iniciado:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        return modo, iniciado
+    return None, None
+
+
+def _finalizar_perfil(nome: str, modo: str, estado, registro: dict) -> None:
+    if modo == "cprofile":
+        estado.disable()
+        if _execucao is not None:
+            diretorio = Path(_execucao["_diretorio"])
+            diretorio.mkdir(parents=True, exist_ok=True)
+            arquivo = diretorio / f"{_execucao['execucao_id']}_{nome.replace(':', '_')}.prof"
+            estado.dump_stats(arquivo)
+            registro["perfil_arquivo"] = str(arquivo)
+        estatisticas = pstats.Stats(estado).sort_stats("cumulative")
+        registro["perfil_top"] = [
+            {
+                "funcao": f"{arquivo}:{linha}({funcao})",
+                "chamadas": chamadas,
+                "cumulativo_s": round(cumulativo, 4),
+            }
+            for (arquivo, linha, funcao), (_, chamadas, _, cumulativo, _) in sorted(
+                estatisticas.stats.items(), key=lambda item: item[1][3], reverse=True
+            )[:TOP_PERFIL]
+        ]
+    elif modo == "tracemalloc":
+        _, pico = tracemalloc.get_traced_memory()
+        registro["tracemalloc_pico_mb"] = round(pico / 1024**2, 1)
+        registro["tracemalloc_top"] = [
+            str(estatistica)
+            for estatistica in tracemalloc.take_snapshot().statistics("lineno")[:TOP_PERFIL]
+        ]
+        if estado:
+            tracemalloc.stop()
+
+
+@contextmanager
+def medir(nome: str, **atributos):
+    """
+    Medir uma etapa ou subetapa.
+
+    Args:
+        nome: Nome da etapa (subetapas repetidas com o mesmo nome são somadas).
+        **atributos: Valores fixos copiados para o registro (ex.: arquivo).
+
+    Yields:
+        O registro da medição, que também pode ser alterado diretamente.
+    """
+    registro = {"nome": nome, **atributos}
+    pilha = _pilha()
+    if _execucao is None and not pilha:
+        # fora de uma execução: nada é medido nem guardado
+        yield registro
+        return
+
+    quadro = {"registro": registro}
+    with _trava:
+        # o pico das medições abertas até aqui é guardado antes de zerar o
+        # contador, que só é zerado se nenhuma outra thread estiver medindo
+        for aberto in _abertas:
+            aberto["pico_kb"] = max(aberto["pico_kb"], _pico_rss_kb())
+        if pilha:
+            pilha[-1]["pico_kb"] = max(pilha[-1]["pico_kb"], _pico_rss_kb())
+        else:
+            if _abertas:
+                registro["concorrente"] = True
+                for aberto in _abertas:
+                    aberto["registro"]["concorrente"] = True
+            _abertas.append(quadro)
+        zerado = (
+            _execucao is not None and _execucao["pico_rss_por_etapa"]
+            and len(_abertas) == 1 and _zerar_pico()
+        )
+        quadro["amostra"] = _amostra()
+        quadro["pico_kb"] = _pico_rss_kb() if zerado else 0
+    modo, estado = _iniciar_perfil(nome)
+    quadro["perfil"] = modo
+    pilha.append(quadro)
+
+    try:
+        yield registro
+    except BaseException as e:
+        registro["erro"] = repr(e)
+        raise
+    finally:
+        pilha.pop()
+        if modo:
+            _finalizar_perfil(nome, modo, estado, registro)
+
+        fim = _amostra()
+        inicio = quadro["amostra"]
+        pico_kb = max(quadro["pico_kb"], _pico_rss_kb())
+        registro.update({
+            "segundos": round(fim["parede"] - inicio["parede"], 4),
+            "cpu_segundos": round(fim["cpu"] - inicio["cpu"], 4),
+            "pico_rss_mb": round(pico_kb / 1024, 1),
+            "bytes_lidos": fim["lidos"] - inicio["lidos"],
+            "bytes_gravados": fim["gravados"] - inicio["gravados"],
+            "vezes": 1,
+        })
+
+        if pilha:
+            pilha[-1]["pico_kb"] = max(pilha[-1]["pico_kb"], pico_kb)
+            _anexar(pilha[-1]["registro"].setdefault("subetapas", []), registro)
+        else:
+            with _trava:
+                _abertas[:] = [q for q in _abertas if q is not quadro]
+                if _execucao is not None:
+                    _anexar(_execucao["etapas"], registro)
+
+
+def finalizar_execucao(status: str = "ok", erro: BaseException | None = None) -> Path | None:
+    """
+    Encerrar a execução e gravar o relatório JSON.
+
+    Returns:
+        Caminho do relatório, ou None se não houver execução iniciada.
+    """
+    global _execucao
+    if _execucao is None:
+        return None
+    execucao, _execucao = _execucao, None
+
+    inicio = execucao.pop("_amostra")
+    fim = _amostra()
+    diretorio = Path(execucao.pop("_diretorio"))
+    execucao.update({
+        "fim": datetime.now().isoformat(timespec="seconds"),
+        "status": status,
+        "erro": repr(erro) if erro is not None else None,
+        "segundos": round(fim["parede"] - inicio["parede"], 3),
+        "cpu_segundos": round(fim["cpu"] - inicio["cpu"], 3),
+        "pico_rss_mb": max((e["pico_rss_mb"] for e in execucao["etapas"]), default=0),
+        "bytes_lidos": fim["lidos"] - inicio["lidos"],
+        "bytes_gravados": fim["gravados"] - inicio["gravados"],
+    })
+
+    diretorio.mkdir(parents=True, exist_ok=True)
+    caminho = diretorio / f"run_{execucao['execucao_id']}.json"
+    tmp = caminho.with_name(caminho.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(execucao, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, caminho)
+    return caminho
@@ -0,0 +1,187 @@
+"""
+Manifesto de entradas processadas pelas camadas silver e gold.
+
+Cada etapa guarda a impressão digital (tamanho, mtime e hash) das entradas que
+consumiu e a versão do código que as processou. Na execução seguinte, se nada
+disso mudou e as saídas ainda existem, a etapa pode ser pulada.
+
+É a única fonte da decisão "já processado": a silver (por arquivo bronze), as
+dimensões e os fatos (por etapa) e as tabelas derivadas por dia (por partição)
+consultam as funções deste módulo, e o run_pipeline deixa cada etapa decidir.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+BLOCO_HASH = 1024 * 1024
+
+
+def hash_arquivo(caminho) -> str:
+    """Calcula o SHA-256 do conteúdo do arquivo, lendo em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(BLOCO_HASH), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def impressao_digital(caminho, com_hash: bool = True) -> dict:
+    """
+    Gera a impressão digital de um arquivo.
+
+    Args:
+        caminho: Arquivo a ser identificado.
+        com_hash: Se True, inclui o SHA-256 do conteúdo.
+
+    Returns:
+        Dicionário com tamanho, mtime (ns) e, opcionalmente, sha256.
+    """
+    st = os.stat(caminho)
+    digital = {"tamanho": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if com_hash:
+        digital["sha256"] = hash_arquivo(caminho)
+    return digital
+
+
+def mesma_impressao(caminho, anterior: dict | None) -> bool:
+    """
+    Verifica se o arquivo ainda corresponde à impressão digital registrada.
+
+    Tamanho e mtime iguais bastam. Se só o mtime mudou (arquivo baixado de novo,
+    por exemplo) e há hash registrado, compara o conteúdo.
+    """
+    if not anterior or not os.path.exists(caminho):
+        return False
+
+    atual = impressao_digital(caminho, com_hash=False)
+    if atual["tamanho"] != anterior.get("tamanho"):
+        return False
+    if atual["mtime_ns"] == anterior.get("mtime_ns"):
+        return True
+    return "sha256" in anterior and hash_arquivo(caminho) == anterior["sha256"]
+
+
+def versao_codigo(*arquivos) -> str:
+    """Gera uma versão curta a partir do código-fonte dos módulos informados."""
+    h = hashlib.sha256()
+    for arquivo in arquivos:
+        h.update(Path(arquivo).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def versao_modulos(*modulos) -> str:
+    """
+    Como `versao_codigo`, a partir dos nomes dos módulos, sem importá-los.
+
+    Cada etapa lista os módulos que definem o conteúdo das suas saídas (não só
+    o próprio arquivo): uma mudança no writer ou nas partições também refaz
+    a etapa.
+    """
+    return versao_codigo(*(importlib.util.find_spec(m).origin for m in modulos))
+
+
+def carregar_manifesto(caminho) -> dict:
+    """Lê o manifesto em JSON, retornando um dicionário vazio se não existir."""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return {}
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_manifesto(caminho, manifesto: dict) -> None:
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    tmp = caminho.with_name(caminho.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, caminho)
+
+
+def entradas_alteradas(manifesto: dict, entradas, versao: str) -> list:
+    """
+    Entradas novas ou alteradas desde o registro no manifesto.
+
+    Args:
+        manifesto: Manifesto da etapa, como gravado por `registrar_etapa`.
+        entradas: Arquivos lidos pela etapa.
+        versao: Versão atual do código da etapa.
+
+    Returns:
+        As entradas cuja impressão digital não confere, ou todas se a versão
+        do código mudou.
+    """
+    if manifesto.get("versao") != versao:
+        return list(entradas)
+    registradas = manifesto.get("entradas", {})
+    return [e for e in entradas if not mesma_impressao(e, registradas.get(str(e)))]
+
+
+def etapa_inalterada(manifesto: dict, entradas, saidas, versao: str) -> bool:
+    """
+    Verifica se uma etapa pode ser pulada.
+
+    Args:
+        manifesto: Manifesto da etapa, como gravado por `registrar_etapa`.
+        entradas: Arquivos lidos pela etapa.
+        saidas: Arquivos (ou diretórios) produzidos pela etapa.
+        versao: Versão atual do código da etapa.
+
+    Returns:
+        True se a versão e todas as entradas são as mesmas e as saídas existem.
+    """
+    if not all(Path(s).exists() for s in saidas):
+        return False
+    if set(manifesto.get("entradas", {})) != {str(e) for e in entradas}:
+        return False
+    return not entradas_alteradas(manifesto, entradas, versao)
+
+
+def registrar_etapa(entradas, versao: str, com_hash: bool = False) -> dict:
+    """Monta o manifesto de uma etapa a partir das entradas que ela consumiu."""
+    return {
+        "versao": versao,
+        "entradas": {
+            str(e): impressao_digital(e, com_hash=com_hash) for e in entradas
+        },
+    }
+
+
+def chaves_alteradas(manifesto: dict, fontes: dict, versao: str) -> list:
+    """
+    Chaves (ex.: dias de uma tabela derivada) cujas fontes mudaram.
+
+    Args:
+        manifesto: Manifesto gravado por `registrar_chaves`.
+        fontes: Dicionário {chave: arquivos lidos para produzir a chave}.
+        versao: Versão atual do código.
+
+    Returns:
+        Chaves nunca registradas ou com alguma fonte alterada (todas, se a
+        versão do código mudou), em ordem crescente.
+    """
+    registradas = manifesto.get("chaves", {}) if manifesto.get("versao") == versao else {}
+    return sorted(
+        chave for chave, arquivos in fontes.items()
+        if set(registradas.get(str(chave), ())) != {str(a) for a in arquivos}
+        or entradas_alteradas(
+            {"versao": versao, "entradas": registradas[str(chave)]}, arquivos, versao
+        )
+    )
+
+
+def registrar_chaves(manifesto: dict, fontes: dict, versao: str) -> dict:
+    """
+    Acrescenta ao manifesto as fontes das chaves processadas.
+
+    As chaves já registradas com a mesma versão do código são mantidas.
+    """
+    chaves = manifesto.get("chaves", {}) if manifesto.get("versao") == versao else {}
+    for chave, arquivos in fontes.items():
+        chaves[str(chave)] = {
+            str(a): impressao_digital(a, com_hash=False) for a in arquivos
+        }
+    return {"versao": versao, "chaves": chaves}
@@ -1,9 +1,298 @@
+import csv
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime
+from src.ingest.bronze.compressao import abrir_leitura, nome_sem_compressao
+from src.ingest.bronze.download_csv import filtrar_datasets
+from src.transform import artifacts
+from src.transform.instrumentation import medir, registrar
+from src.transform.manifest import (
+    carregar_manifesto,
+    impressao_digital,
+    mesma_impressao,
+    salvar_manifesto,
+    versao_modulos,
+)
+
+# Módulos que definem o conteúdo da silver (versão gravada no manifesto)
+MODULOS = ["src.transform.silver.clean_data", "src.ingest.bronze.compressao"]
 
 bronze_path = "data/bronze/mobilidade_bh"
 silver_path = "data/silver/mobilidade_bh"
+manifest_path = os.path.join(silver_path, "_manifest.json")
+
+# leitura em blocos (modo streaming)
+CHUNK_SIZE = 500_000  # linhas por bloco, define o pico de memória
+TAMANHO_AMOSTRA = 64 * 1024  # bytes lidos para detectar separador e cabeçalho
+SEPARADORES = ";,\t|"
+LINHAS_POR_GRUPO = 128_000  # row groups menores = estatísticas min/max mais úteis
+
+# arquivos bronze: CSV puro ou comprimido (lido com descompressão em fluxo)
+EXTENSOES_BRONZE = (".csv", ".csv.gz", ".csv.zst")
+
+# esquema declarado da silver: tipos compactos aplicados no pandas e no parquet
+CODIGO = pa.dictionary(pa.int32(), pa.string())  # códigos de baixa cardinalidade
+
+SCHEMA_MCO = pa.schema([
+    ("viagem_data", pa.timestamp("s")),
+    ("linha_numero", CODIGO),
+    ("sublinha_numero", pa.int16()),
+    ("ponto_controle_numero", pa.int16()),
+    ("concessionaria_numero", CODIGO),
+    ("hora_saida", pa.int32()),  # segundos desde a meia-noite
+    ("numero_ordem_veiculo", pa.int32()),
+    ("hora_chegada", pa.int32()),  # segundos desde a meia-noite
+    ("catraca_saida", pa.int32()),
+    ("catraca_chegada", pa.int32()),
+    ("indicador_ocorrencia", CODIGO),
+    ("indicador_justificativa", CODIGO),
+    ("tipo_dia", CODIGO),
+    ("extensao_viagem", pa.int32()),
+    ("indicador_falha_mecanica", CODIGO),
+    ("indicador_evento_inseguro", CODIGO),
+    ("indicador_fechamento", CODIGO),
+    ("data_fechamento_viagem", pa.timestamp("s")),
+    ("total_usuarios_viagem", pa.int32()),
+    ("empresa_operadora", CODIGO),
+    ("dt_ingestao", pa.timestamp("s")),
+])
+
+SCHEMA_TEMPO_REAL = pa.schema([
+    ("codigo_evento", pa.int16()),
+    ("data_hora", pa.timestamp("s")),
+    ("latitude", pa.float32()),
+    ("longitude", pa.float32()),
+    ("numero_ordem_veiculo", pa.int32()),
+    ("velocidade_instantanea", pa.int16()),
+    ("codigo_numero_linha", pa.int32()),
+    ("direcao_veiculo", pa.int16()),
+    ("sentido_veiculo", pa.int8()),
+    ("distancia_percorrida", pa.int32()),
+    ("dt_ingestao", pa.timestamp("s")),
+])
+
+SCHEMAS = {"mco": SCHEMA_MCO, "tempo_real": SCHEMA_TEMPO_REAL}
+
+def detectar_formato(caminho, tamanho_amostra=TAMANHO_AMOSTRA):
+    """
+    Detecta separador e cabeçalho lendo apenas o início do arquivo.
+
+    Returns:
+        Tupla (separador, colunas) com os nomes de colunas já padronizados.
+    """
+    with io.TextIOWrapper(abrir_leitura(caminho), encoding="utf-8", newline="") as f:
+        amostra = f.read(tamanho_amostra)
+
+    # descarta a última linha, que pode ter sido cortada no meio
+    if "\n" in amostra:
+        amostra = amostra[:amostra.rfind("\n") + 1]
+
+    cabecalho = amostra.splitlines()[0] if amostra else ""
+    try:
+        sep = csv.Sniffer().sniff(amostra, delimiters=SEPARADORES).delimiter
+    except csv.Error:
+        # amostra ambígua: usa o separador mais frequente no cabeçalho
+        sep = max(SEPARADORES, key=cabecalho.count)
+
+    colunas = next(csv.reader([cabecalho], delimiter=sep), [])
+    return sep, padronizar_colunas(colunas)
+
+def padronizar_colunas(colunas):
+    """Padroniza nomes de colunas (minúsculo e sem espaços nas pontas)."""
+    return [c.lower().strip() for c in colunas]
+
+def remover_colunas_sem_nome(df):
+    """Remove as colunas sem nome (separador sobrando no fim da linha)."""
+    return df.loc[:, ~df.columns.str.startswith("unnamed:")]
+
+def remover_colunas_do_parquet(destino, colunas):
+    """
+    Regrava um parquet sem as colunas informadas, um row group por vez.
+
+    Usado no modo em blocos, que só sabe quais colunas ficaram totalmente
+    vazias depois de gravar o arquivo inteiro.
+    """
+    arquivo = pq.ParquetFile(destino)
+    schema = arquivo.schema_arrow
+    manter = [c for c in schema.names if c not in colunas]
+    # os metadados do pandas continuam válidos para um subconjunto das colunas
+    novo_schema = pa.schema([schema.field(c) for c in manter], metadata=schema.metadata)
+
+    temporario = f"{destino}.tmp"
+    with pq.ParquetWriter(temporario, novo_schema) as writer:
+        for i in range(arquivo.num_row_groups):
+            writer.write_table(arquivo.read_row_group(i, columns=manter))
+    arquivo.close()
+    os.replace(temporario, destino)
+
+def identificar_dataset(colunas):
+    """Identifica o tipo de arquivo pelas colunas ('mco', 'tempo_real' ou None)."""
+    if 'viagem' in colunas and 'saida' in colunas:
+        return "mco"
+    if 'hr' in colunas:
+        return "tempo_real"
+    return None
+
+def _converter_coluna(serie, tipo):
+    """Converte uma coluna pandas para o tipo compacto equivalente ao tipo Arrow."""
+    if pa.types.is_dictionary(tipo):
+        # códigos numéricos viram texto sem o '.0' que o pandas põe em floats
+        if pd.api.types.is_numeric_dtype(serie) and not isinstance(
+            serie.dtype, pd.CategoricalDtype
+        ):
+            serie = pd.to_numeric(serie, errors="coerce").astype("Int64")
+        return serie.astype("string").str.strip().astype("category")
+
+    if pa.types.is_integer(tipo):
+        valores = pd.to_numeric(serie, errors="coerce")
+        limites = np.iinfo(f"int{tipo.bit_width}")
+        # fracionários e valores fora da faixa do tipo viram nulo, como texto inválido
+        invalidos = valores.notna() & (
+            (valores % 1 != 0) | (valores < limites.min) | (valores > limites.max)
+        )
+        if invalidos.any():
+            print(f"Silver - {serie.name}: {int(invalidos.sum())} valores inválidos "
+                  f"para int{tipo.bit_width} viraram nulos")
+            valores = valores.mask(invalidos)
+        return valores.astype(f"Int{tipo.bit_width}")
+
+    if pa.types.is_floating(tipo):
+        return pd.to_numeric(serie, errors="coerce").astype(f"float{tipo.bit_width}")
+
+    if pa.types.is_timestamp(tipo):
+        return pd.to_datetime(serie, errors="coerce")
+
+    return serie
+
+def aplicar_schema(df, schema):
+    """
+    Aplica o esquema declarado às colunas presentes no DataFrame.
+
+    Colunas fora do esquema são mantidas com o tipo inferido pelo pandas.
+    """
+    for campo in schema:
+        if campo.name in df.columns:
+            df[campo.name] = _converter_coluna(df[campo.name], campo.type)
+    return df
+
+def para_tabela_arrow(df, dataset, schema=None):
+    """
+    Converte o DataFrame em tabela Arrow com os tipos do esquema declarado.
+
+    Args:
+        df: DataFrame já processado.
+        dataset: Tipo do arquivo ('mco', 'tempo_real' ou None).
+        schema: Esquema a seguir. Se None, usa o esquema declarado do dataset
+            para as colunas conhecidas e o tipo inferido para as demais.
+    """
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+
+    if schema is None:
+        declarado = SCHEMAS.get(dataset, pa.schema([]))
+        schema = pa.schema([
+            declarado.field(nome) if nome in declarado.names
+            else tabela.schema.field(nome)
+            for nome in tabela.column_names
+        ])
+
+    # o cast descarta os metadados do pandas; sem eles as colunas Int* com
+    # nulos voltariam como float64 na leitura
+    return (
+        tabela.select(schema.names)
+        .cast(schema)
+        .replace_schema_metadata(tabela.schema.metadata)
+    )
+
+def parse_timestamp_numerico(serie, formato='%Y%m%d%H%M%S'):
+    """
+    Converte timestamps no formato YYYYMMDDHHMMSS (ex.: 20260201010644) em datetime.
+
+    O caminho rápido decompõe o número com aritmética de inteiros e monta o
+    datetime64 direto no NumPy, sem criar cópias em texto da coluna. Só as
+    linhas que falham nele (texto fora do padrão, data inválida) passam pelo
+    parsing por string.
+
+    Returns:
+        Tupla (série datetime64[s], número de linhas no caminho lento).
+    """
+    valores = pd.to_numeric(serie, errors="coerce").to_numpy(
+        dtype="float64", na_value=np.nan
+    )
+    ok = np.isfinite(valores) & (valores == np.floor(valores))
+    v = np.where(ok, valores, 0).astype(np.int64)
+
+    ano, v = np.divmod(v, 10**10)
+    mes, v = np.divmod(v, 10**8)
+    dia, v = np.divmod(v, 10**6)
+    hora, v = np.divmod(v, 10**4)
+    minuto, segundo = np.divmod(v, 100)
+
+    ok &= (ano >= 1900) & (ano <= 2200) & (mes >= 1) & (mes <= 12)
+    ok &= (dia >= 1) & (dia <= 31) & (hora < 24) & (minuto < 60) & (segundo < 60)
+
+    meses = np.where(ok, (ano - 1970) * 12 + mes - 1, 0).astype("datetime64[M]")
+    datas = meses.astype("datetime64[D]") + np.where(ok, dia - 1, 0).astype("timedelta64[D]")
+    # dias que transbordam o mês (ex.: 31/02) caem no mês seguinte
+    ok &= datas.astype("datetime64[M]") == meses
+
+    resultado = datas.astype("datetime64[s]") + (
+        hora * 3600 + minuto * 60 + segundo
+    ).astype("timedelta64[s]")
+    resultado[~ok] = np.datetime64("NaT")
+    resultado = pd.Series(resultado, index=serie.index)
+
+    # caminho lento: linhas preenchidas que não passaram no caminho rápido
+    lento = ~ok & serie.notna().to_numpy()
+    n_lento = int(lento.sum())
+    if n_lento:
+        resultado[lento] = pd.to_datetime(
+            serie[lento].astype(str).str.split('.').str[0], # remove .0 se existir
+            format=formato,
+            errors="coerce",
+        ).astype("datetime64[s]")
+
+    return resultado, n_lento
+
+def horario_para_segundos(serie, formato='%H:%M'):
+    """
+    Converte horários HH:MM em segundos desde a meia-noite.
+
+    O caminho rápido lê os códigos dos caracteres direto de um array NumPy de
+    largura fixa. Valores fora do padrão HH:MM (ex.: '5:30') vão para o
+    parsing por string.
+
+    Returns:
+        Tupla (série Int32, número de linhas no caminho lento).
+    """
+    # U6: um caractere a mais que HH:MM para detectar textos maiores
+    texto = serie.to_numpy(dtype=object, na_value="").astype("U6")
+    cod = texto.view(np.uint32).reshape(len(texto), 6).astype(np.int32)
+    dig = cod - ord("0")
+
+    ok = (cod[:, 2] == ord(":")) & (cod[:, 5] == 0)
+    ok &= ((dig[:, [0, 1, 3, 4]] >= 0) & (dig[:, [0, 1, 3, 4]] <= 9)).all(axis=1)
+    hora = dig[:, 0] * 10 + dig[:, 1]
+    minuto = dig[:, 3] * 10 + dig[:, 4]
+    ok &= (hora < 24) & (minuto < 60)
+
+    resultado = pd.Series(
+        np.where(ok, hora * 3600 + minuto * 60, 0), index=serie.index
+    ).astype("Int32")
+    resultado[~ok] = pd.NA
+
+    # caminho lento: linhas preenchidas que não passaram no caminho rápido
+    lento = ~ok & serie.notna().to_numpy()
+    n_lento = int(lento.sum())
+    if n_lento:
+        horario = pd.to_datetime(serie[lento], format=formato, errors="coerce")
+        resultado[lento] = (horario.dt.hour * 3600 + horario.dt.minute * 60).astype("Int32")
+
+    return resultado, n_lento
 
 def processar_mco(df):
     """Lógica específica para a base MCO"""
@@ -13,10 +302,12 @@ def processar_mco(df):
         if col in df.columns:
             df[col] = pd.to_datetime(df[col], dayfirst=True, errors="coerce")
     
-    # saída e Chegada são horários (HH:MM)
+    # saída e Chegada são horários (HH:MM), guardados em segundos
     for col in ['saida', 'chegada']:
         if col in df.columns:
-            df[col] = pd.to_datetime(df[col], format='%H:%M', errors="coerce").dt.time
+            df[col], n_lento = horario_para_segundos(df[col])
+            if n_lento:
+                print(f"MCO - {col}: {n_lento} linhas pelo parsing lento")
     
     # renomeia colunas  
     df = df.rename(columns={       
@@ -42,17 +333,18 @@ def processar_mco(df):
         'empresa operadora': 'empresa_operadora'
     })
     
+    # tipos compactos do esquema declarado
+    df = aplicar_schema(df, SCHEMA_MCO)
+
     return df
 
 def processar_tempo_real(df):
     """Lógica específica para a base de Tempo Real."""
     
     # converte o formato 20260201010644 
-    df['hr'] = pd.to_datetime(
-        df['hr'].astype(str).str.split('.').str[0], # remove .0 se existir
-        format='%Y%m%d%H%M%S', 
-        errors="coerce"
-    )
+    df['hr'], n_lento = parse_timestamp_numerico(df['hr'])
+    if n_lento:
+        print(f"Tempo Real - hr: {n_lento} linhas pelo parsing lento")
     
     # renomeia colunas
     df = df.rename(columns={       
@@ -80,43 +372,299 @@ def processar_tempo_real(df):
                 errors='coerce'
             )
 
+    # tipos compactos do esquema declarado
+    df = aplicar_schema(df, SCHEMA_TEMPO_REAL)
+
     return df
 
-def run_silver():
-    """Direciona cada arquivo para sua função de processamento."""
-    os.makedirs(silver_path, exist_ok=True)
+def aplicar_logica(df, dataset):
+    """Aplica a função de processamento do dataset e as limpezas comuns."""
+    with medir("conversao"):
+        if dataset == "mco":
+            df = processar_mco(df)
+        elif dataset == "tempo_real":
+            df = processar_tempo_real(df)
+
+    # limpezas comuns
+    with medir("deduplicacao"):
+        registrar(linhas_entrada=len(df))
+        df = df.dropna(how="all") # remove linhas totalmente vazias
+        df = df.drop_duplicates() # remove linhas duplicadas
+        registrar(linhas_saida=len(df))
+    return df
+
+def _processar_em_memoria(caminho, sep, dataset, destino, dt_ingestao):
+    """Lê o arquivo inteiro de uma vez e grava o parquet silver."""
+    with medir("leitura"), abrir_leitura(caminho) as f:
+        df = pd.read_csv(f, sep=sep, engine="c")
+        registrar(linhas_saida=len(df))
+
+    # padronizar nomes de colunas (minusculo e espaços)
+    df.columns = padronizar_colunas(df.columns)
+
+    # remove colunas sem nome e colunas totalmente vazias
+    df = remover_colunas_sem_nome(df)
+    df = df.dropna(axis=1, how='all')
+
+    df = aplicar_logica(df, dataset)
+    df["dt_ingestao"] = dt_ingestao # adiciona coluna de data de ingestão
+
+    with medir("escrita"):
+        tabela = para_tabela_arrow(df, dataset)
+        pq.write_table(tabela, destino, row_group_size=LINHAS_POR_GRUPO)
+        registrar(linhas_entrada=len(df))
+    # dentro do run_pipeline, as etapas seguintes recebem a tabela sem reler
+    artifacts.guardar(destino, tabela)
+    return len(df)
+
+def _processar_em_blocos(caminho, sep, dataset, destino, dt_ingestao, chunksize):
+    """
+    Lê o arquivo em blocos de `chunksize` linhas e grava cada bloco no parquet.
+
+    Duplicatas entre blocos são removidas por um hash de linha (8 bytes por
+    linha mantidos em memória). Como no modo em memória, colunas sem nome e
+    colunas totalmente vazias no arquivo não vão para a silver: as vazias só
+    são conhecidas no fim da leitura e são removidas regravando o parquet.
+    """
+    hashes_vistos = np.empty(0, dtype="uint64")
+    preenchidas = set()  # colunas do CSV com algum valor
+    nomes = {}  # coluna do CSV -> coluna na silver
+    writer = None
+    schema = None
+    total = 0
+
+    try:
+        with abrir_leitura(caminho) as f, pd.read_csv(
+            f, sep=sep, engine="c", chunksize=chunksize
+        ) as blocos:
+            while True:
+                # a leitura de cada bloco é medida à parte do processamento
+                with medir("leitura"):
+                    chunk = next(blocos, None)
+                    if chunk is not None:
+                        registrar(linhas_saida=len(chunk))
+                if chunk is None:
+                    break
+
+                chunk.columns = padronizar_colunas(chunk.columns)
+                chunk = remover_colunas_sem_nome(chunk)
+                originais = chunk.columns
+                preenchidas.update(originais[chunk.notna().any().to_numpy()])
+                chunk = aplicar_logica(chunk, dataset)
+                # as funções de cada dataset só renomeiam, sem mudar a ordem
+                nomes = dict(zip(originais, chunk.columns))
+
+                # remove linhas já gravadas em blocos anteriores
+                with medir("deduplicacao"):
+                    registrar(linhas_entrada=len(chunk))
+                    hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+                    pos = np.searchsorted(hashes_vistos, hashes)
+                    pos[pos == len(hashes_vistos)] = 0
+                    novas = (
+                        hashes_vistos[pos] != hashes if len(hashes_vistos)
+                        else np.ones(len(hashes), dtype=bool)
+                    )
+                    hashes_vistos = np.union1d(hashes_vistos, hashes[novas])
+                    chunk = chunk[novas].assign(dt_ingestao=dt_ingestao)
+                    registrar(linhas_saida=len(chunk))
+
+                with medir("escrita"):
+                    # colunas fora do esquema declarado seguem os tipos do 1º bloco
+                    tabela = para_tabela_arrow(chunk, dataset, schema)
+                    if writer is None:
+                        schema = tabela.schema
+                        writer = pq.ParquetWriter(destino, schema)
+
+                    writer.write_table(tabela, row_group_size=LINHAS_POR_GRUPO)
+                    registrar(linhas_entrada=len(chunk))
+                total += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    vazias = [nomes[c] for c in nomes if c not in preenchidas]
+    if vazias:
+        with medir("escrita"):
+            remover_colunas_do_parquet(destino, vazias)
 
-    for file in os.listdir(bronze_path):
-        if not file.endswith(".csv"):
+    return total
+
+def processar_arquivo(file, streaming=False, chunksize=CHUNK_SIZE):
+    """
+    Processa um arquivo bronze e grava o parquet silver correspondente.
+
+    Returns:
+        Tupla (arquivo silver gerado, número de linhas gravadas).
+    """
+    print(f"Silver - lendo {file}")
+    caminho = os.path.join(bronze_path, file)
+
+    # detecta o separador pelo início do arquivo e lê com o parser em C
+    sep, colunas = detectar_formato(caminho)
+
+    # edentifica o tipo de arquivo pelas colunas e aplica a função correta
+    dataset = identificar_dataset(colunas)
+    if dataset == "mco":
+        print(f"Aplicando lógica MCO em {file}")
+    elif dataset == "tempo_real":
+        print(f"Aplicando lógica Tempo Real em {file}")
+
+    output_file = nome_sem_compressao(file).replace(".csv", ".parquet")
+    destino = os.path.join(silver_path, output_file)
+    dt_ingestao = datetime.now().replace(microsecond=0)
+
+    # salvar em Parquet (em processos filhos a medição não chega ao relatório)
+    with medir(file, dataset=dataset, streaming=streaming):
+        if streaming:
+            linhas = _processar_em_blocos(
+                caminho, sep, dataset, destino, dt_ingestao, chunksize
+            )
+        else:
+            linhas = _processar_em_memoria(caminho, sep, dataset, destino, dt_ingestao)
+        registrar(linhas_saida=linhas)
+    print(f"Arquivo silver gerado: {output_file} ({linhas} linhas)")
+    return output_file, linhas
+
+def _arquivo_inalterado(file, registro, versao):
+    """Verifica pelo manifesto se o arquivo bronze já foi processado como está."""
+    if not registro or registro.get("versao") != versao:
+        return False
+    if not os.path.exists(os.path.join(silver_path, registro["saida"])):
+        return False
+    return mesma_impressao(os.path.join(bronze_path, file), registro["entrada"])
+
+def silver_atualizada(datasets=None):
+    """
+    Verifica pelo manifesto se todos os arquivos bronze já estão na silver.
+
+    Args:
+        datasets: Considerar só os arquivos destes datasets; None considera
+            todos.
+    """
+    versao = versao_modulos(*MODULOS)
+    registros = carregar_manifesto(manifest_path).get("arquivos", {})
+    return all(
+        _arquivo_inalterado(file, registros.get(file), versao)
+        for file in filtrar_datasets(listar_bronze(), datasets)
+    )
+
+def listar_bronze():
+    """
+    Lista os arquivos bronze a processar, puros ou comprimidos.
+
+    Se o mesmo CSV existir em mais de um formato (ex.: `x.csv` baixado pelo
+    navegador e `x.csv.gz` pela API), só o mais recente é usado, já que os
+    dois gerariam o mesmo parquet silver.
+    """
+    escolhidos = {}
+    for f in os.listdir(bronze_path):
+        if not f.endswith(EXTENSOES_BRONZE):
             continue
+        base = nome_sem_compressao(f)
+        atual = escolhidos.get(base)
+        if atual is None or (
+            os.path.getmtime(os.path.join(bronze_path, f))
+            > os.path.getmtime(os.path.join(bronze_path, atual))
+        ):
+            escolhidos[base] = f
+    return sorted(escolhidos.values())
 
-        print(f"Silver - lendo {file}")
-        
-        # tenta ler com separador padrão, se falhar ou vier 1 coluna só, tenta ';'
-        df = pd.read_csv(os.path.join(bronze_path, file), sep=None, engine='python')
+def run_silver(
+    streaming=False, chunksize=CHUNK_SIZE, workers=1, forcar=False, datasets=None
+):
+    """
+    Direciona cada arquivo para sua função de processamento.
 
-        # padronizar nomes de colunas (minusculo e espaços)
-        df.columns = [c.lower().strip() for c in df.columns]
+    Arquivos bronze cujo conteúdo e versão do código não mudaram desde a última
+    execução (conforme o manifesto em `manifest_path`) não são reprocessados.
 
-        # remove colunas totalmente vazias
-        df = df.dropna(axis=1, how='all')
+    Args:
+        streaming: Se True, lê cada CSV em blocos de `chunksize` linhas e grava
+            o parquet incrementalmente, limitando o pico de memória ao tamanho
+            do bloco e não ao tamanho do arquivo.
+        chunksize: Número de linhas por bloco no modo streaming.
+        workers: Número de processos. Com mais de 1, cada arquivo bronze é
+            processado em um processo separado.
+        forcar: Se True, reprocessa todos os arquivos ignorando o manifesto.
+        datasets: Processar só os arquivos destes datasets ("mco",
+            "tempo_real"); None processa todos.
 
-        # edentifica o tipo de arquivo pelas colunas e aplica a função correta
-        if 'viagem' in df.columns and 'saida' in df.columns:
-            print(f"Aplicando lógica MCO em {file}")
-            df = processar_mco(df)
-            
-        elif 'hr' in df.columns:
-            print(f"Aplicando lógica Tempo Real em {file}")
-            df = processar_tempo_real(df)
+    Returns:
+        Dicionário {arquivo bronze: (arquivo silver, linhas)}.
+
+    Raises:
+        RuntimeError: Se algum arquivo falhar. Os demais arquivos são
+            processados normalmente antes do erro ser levantado.
+    """
+    os.makedirs(silver_path, exist_ok=True)
+
+    todos = listar_bronze()
+    arquivos = filtrar_datasets(todos, datasets)
+    resultados = {}
+    erros = {}
+
+    versao = versao_modulos(*MODULOS)
+    registros = carregar_manifesto(manifest_path).get("arquivos", {})
+    registros = {f: r for f, r in registros.items() if f in todos}
+
+    pendentes = []
+    digitais = {}
+    for file in arquivos:
+        caminho = os.path.join(bronze_path, file)
+        if not forcar and _arquivo_inalterado(file, registros.get(file), versao):
+            print(f"Silver - {file} inalterado, pulando")
+            registro = registros[file]
+            # atualiza o mtime para não recalcular o hash na próxima execução
+            registro["entrada"].update(impressao_digital(caminho, com_hash=False))
+            resultados[file] = (registro["saida"], registro["linhas"])
+        else:
+            # impressão digital tirada antes de ler, para não mascarar
+            # alterações feitas durante o processamento
+            digitais[file] = impressao_digital(caminho)
+            pendentes.append(file)
+
+    if workers > 1 and len(pendentes) > 1:
+        workers = min(workers, len(pendentes))
+        print(f"Silver - processando {len(pendentes)} arquivos com {workers} processos")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = {
+                executor.submit(processar_arquivo, file, streaming, chunksize): file
+                for file in pendentes
+            }
+            for futuro in as_completed(futuros):
+                file = futuros[futuro]
+                try:
+                    resultados[file] = futuro.result()
+                except Exception as e:
+                    erros[file] = e
+    else:
+        for file in pendentes:
+            try:
+                resultados[file] = processar_arquivo(file, streaming, chunksize)
+            except Exception as e:
+                erros[file] = e
+
+    for file in pendentes:
+        if file in erros:
+            # força o reprocessamento na próxima execução
+            registros.pop(file, None)
+            continue
+        output_file, linhas = resultados[file]
+        registros[file] = {
+            "entrada": digitais[file],
+            "versao": versao,
+            "saida": output_file,
+            "linhas": linhas,
+        }
+    salvar_manifesto(manifest_path, {"arquivos": registros})
 
-        # limpezas comuns
-        df.dropna(how="all", inplace=True) # remove linhas totalmente vazias
-        df.drop_duplicates(inplace=True) # remove linhas duplicadas
-        df["dt_ingestao"] = datetime.now() # adiciona coluna de data de ingestão
+    for file, erro in erros.items():
+        print(f"Silver - erro em {file}: {erro!r}")
 
-        # salvar em Parquet
-        output_file = file.replace(".csv", ".parquet")
-        df.to_parquet(os.path.join(silver_path, output_file), index=False)
-        print(f"Arquivo silver gerado: {output_file}")
+    if erros:
+        raise RuntimeError(
+            f"Silver falhou para {len(erros)} de {len(arquivos)} arquivos: "
+            f"{', '.join(sorted(erros))}"
+        )
 
+    return resultados
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from benchmarks import synthetic_data
+
+
+@pytest.fixture(scope="session")
+def pipeline_sintetica(tmp_path_factory):
+    """Rodar a pipeline inteira (silver em diante) sobre a bronze sintética.
+
+    Returns:
+        Diretório da camada gold gerada.
+    """
+    import run_pipeline
+
+    raiz = tmp_path_factory.mktemp("pipeline")
+    synthetic_data.gerar_bronze(str(raiz / "data/bronze/mobilidade_bh"), 20_000)
+
+    anterior = os.getcwd()
+    os.chdir(raiz)
+    try:
+        run_pipeline.main(a_partir_de="silver", workers=1)
+    finally:
+        os.chdir(anterior)
+    return raiz / "data/gold/mobilidade_bh"
@@ -0,0 +1,55 @@
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.transform import artifacts
+
+
+def _gravar(caminho, tabela):
+    pq.write_table(tabela, caminho)
+    artifacts.guardar(caminho, tabela)
+
+
+def test_tabela_gravada_e_entregue_sem_reler(tmp_path):
+    caminho = tmp_path / "t.parquet"
+    tabela = pa.table({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+
+    with artifacts.sessao():
+        _gravar(caminho, tabela)
+        assert artifacts.obter(caminho) is tabela
+        assert artifacts.ler_tabela(caminho, ["b"]).column_names == ["b"]
+        filtrada = artifacts.ler_parquet(caminho, filtro=ds.field("a") > 1)
+        assert filtrada["a"].tolist() == [2, 3]
+
+        # arquivo regravado por fora: a tabela guardada deixa de valer
+        pq.write_table(pa.table({"a": [9]}), caminho)
+        os.utime(caminho, ns=(1, 1))
+        assert artifacts.obter(caminho) is None
+        assert artifacts.ler_tabela(caminho)["a"].to_pylist() == [9]
+
+    # fora da sessão nada fica guardado
+    assert not artifacts.ativo()
+    _gravar(caminho, tabela)
+    assert artifacts.obter(caminho) is None
+
+
+def test_leitura_parcial_nao_serve_para_outras_colunas(tmp_path):
+    caminho = tmp_path / "t.parquet"
+    pq.write_table(pa.table({"a": [1], "b": [2]}), caminho)
+
+    with artifacts.sessao():
+        artifacts.ler_tabela(caminho, ["a"])
+        assert artifacts.obter(caminho, ["a"]) is not None
+        assert artifacts.obter(caminho, ["a", "b"]) is None
+        assert artifacts.obter(caminho) is None
+
+
+def test_limite_descarta_as_menos_usadas(tmp_path):
+    tabela = pa.table({"a": list(range(100_000))})  # ~0,8 MB
+    with artifacts.sessao(limite_mb=1):
+        _gravar(tmp_path / "1.parquet", tabela)
+        _gravar(tmp_path / "2.parquet", tabela)
+        assert artifacts.obter(tmp_path / "1.parquet") is None
+        assert artifacts.obter(tmp_path / "2.parquet") is tabela
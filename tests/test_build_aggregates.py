@@ -0,0 +1,72 @@
+import pandas as pd
+
+from src.transform.gold import build_aggregates as agg
+from src.transform.gold.partitions import escrever_particao, pasta_particao
+
+
+def _viagens(data_key, linhas, usuarios, falhas):
+    return pd.DataFrame({
+        "data_key": data_key,
+        "linha_key": pd.array(linhas, dtype="Int64"),
+        "empresa_key": pd.array([7] * len(linhas), dtype="Int64"),
+        "veiculo_key": pd.array([100 + i % 2 for i in range(len(linhas))], dtype="Int64"),
+        "total_usuarios_viagem": pd.array(usuarios, dtype="Int32"),
+        "indicador_falha_mecanica": falhas,
+    })
+
+
+def test_agregados_do_mco():
+    fato = _viagens(20260105, [1, 1, 2], [10, None, 5], ["S", " n", "s"])
+
+    linha_dia = agg.agregar_mco_linha_dia(fato)
+    assert linha_dia[["linha_key", "viagens", "total_usuarios"]].values.tolist() == [
+        [1, 2, 10], [2, 1, 5],
+    ]
+
+    falhas = agg.agregar_falha_veiculo_dia(fato)
+    assert falhas[["veiculo_key", "viagens", "falhas_mecanicas"]].values.tolist() == [
+        [100, 2, 2], [101, 1, 0],
+    ]
+
+
+def test_velocidade_media_por_linha_e_hora():
+    fato = pd.DataFrame({
+        "data_key": 20260105,
+        "linha_key": pd.array([1, 1, 1, 2], dtype="Int64"),
+        "data_hora": pd.to_datetime(
+            ["2026-01-05 08:10", "2026-01-05 08:50", "2026-01-05 09:00", "2026-01-05 08:00"]
+        ),
+        "velocidade_instantanea": pd.array([20, None, 30, None], dtype="Int16"),
+    })
+
+    resultado = agg.agregar_tr_linha_hora(fato)
+
+    assert resultado[["linha_key", "hora", "eventos", "eventos_com_velocidade"]].values.tolist() == [
+        [1, 8, 2, 1], [1, 9, 1, 1], [2, 8, 1, 0],
+    ]
+    assert resultado["velocidade_media"].tolist()[:2] == [20, 30]
+    assert pd.isna(resultado["velocidade_media"].iloc[2])
+
+
+def test_atualizar_agregados_so_calcula_dias_novos(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for data_key in (20260105, 20260106):
+        escrever_particao(_viagens(data_key, [1, 2], [3, 4], ["N", "S"]), agg.FATO_MCO, data_key)
+
+    assert agg.atualizar_agregados(agg.FATO_MCO)[agg.AGG_MCO_LINHA_DIA.name] == [
+        20260105, 20260106,
+    ]
+    arquivo = pasta_particao(agg.AGG_MCO_LINHA_DIA, 20260105) / "part-0.parquet"
+    gravado = arquivo.stat().st_mtime_ns
+
+    escrever_particao(_viagens(20260107, [1], [8], ["N"]), agg.FATO_MCO, 20260107)
+    atualizados = agg.atualizar_agregados(agg.FATO_MCO, [20260107])
+
+    # o histórico não é relido nem regravado
+    assert atualizados == {
+        agg.AGG_MCO_LINHA_DIA.name: [20260107],
+        agg.AGG_FALHA_VEICULO_DIA.name: [20260107],
+    }
+    assert arquivo.stat().st_mtime_ns == gravado
+    total = pd.read_parquet(agg.AGG_MCO_LINHA_DIA)
+    assert total.groupby("data_key")["total_usuarios"].sum().tolist() == [7, 7, 8]
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from src.transform.gold import build_dimensions
+from src.transform.gold.build_dimensions import anexar_novos, generate_hash_keys
+
+
+def test_generate_hash_keys_deterministico_e_vazios():
+    valores = pd.Series(["4103", "SC01A", None, "", "4103"])
+
+    chaves = generate_hash_keys(valores, "linha")
+
+    assert chaves.dtype == "int64"
+    assert chaves.tolist() == generate_hash_keys(valores.iloc[::-1], "linha").tolist()[::-1]
+    assert chaves.iloc[0] == chaves.iloc[4] > 0
+    assert chaves.iloc[2] == chaves.iloc[3] == build_dimensions.CHAVE_VAZIA
+    assert build_dimensions.generate_hash_key("4103") == chaves.iloc[0]
+
+
+def test_generate_hash_keys_reatribui_colisoes(monkeypatch, capsys):
+    hash_original = build_dimensions._hash_valores
+
+    def hash_colidindo(texto):
+        # "a" e "b" caem na mesma chave; valores com sufixo usam o hash real
+        chaves = hash_original(texto)
+        chaves[np.isin(texto, ["a", "b"])] = 42
+        return chaves
+
+    monkeypatch.setattr(build_dimensions, "_hash_valores", hash_colidindo)
+
+    chaves = generate_hash_keys(pd.Series(["b", "a", "c", "b"]), "teste")
+
+    assert "1 colisões de chave em teste" in capsys.readouterr().out
+    # o primeiro em ordem alfabética fica com a chave, o outro ganha sufixo;
+    # a chave nova é exata (não passa por float)
+    assert chaves.iloc[1] == 42
+    assert chaves.iloc[0] == chaves.iloc[3] == hash_original(np.array(["b#1"], dtype=object))[0]
+
+
+def _registro(natural, valores, chave):
+    registro = pd.DataFrame({natural: valores})
+    registro[chave] = generate_hash_keys(registro[natural].astype(str), chave)
+    return registro
+
+
+def test_anexar_novos_compara_chaves_de_tipos_diferentes():
+    registro = _registro("veiculo_id", ["10356", "20411"], "veiculo_key")
+    candidatos = pd.DataFrame({"veiculo_id": [10356.0, 20411.0, 30512.0]})
+
+    dim = anexar_novos(registro, candidatos, "veiculo_id", "veiculo_key", "dim_veiculo")
+
+    # só 30512 é novo; as chaves existentes não são refeitas com sufixo
+    assert len(dim) == 3
+    assert dim["veiculo_key"].iloc[:2].tolist() == registro["veiculo_key"].tolist()
+    assert dim["veiculo_key"].is_unique
+
+
+def test_anexar_novos_categorias_e_inteiros():
+    registro = _registro("concessionaria_numero", ["801", " 802"], "concessionaria_key")
+    candidatos = pd.DataFrame({
+        "concessionaria_numero": pd.Series(["801", "802", "803"], dtype="category")
+    })
+    dim = anexar_novos(
+        registro, candidatos, "concessionaria_numero", "concessionaria_key", "x"
+    )
+    assert dim["concessionaria_numero"].tolist()[2:] == ["803"]
+
+    datas = pd.DataFrame({"data_key": pd.array([20260105], dtype="int32")})
+    novas = pd.DataFrame({"data_key": [20260105, 20260106]})
+    assert anexar_novos(datas, novas, "data_key", None, "dim_data")["data_key"].tolist() == [
+        20260105, 20260106
+    ]
+
+
+def _silver_mco(caminho, data, veiculos):
+    pd.DataFrame({
+        "viagem_data": pd.to_datetime([data] * len(veiculos)),
+        "linha_numero": pd.Series(["4103"] * len(veiculos), dtype="category"),
+        "concessionaria_numero": pd.Series(["801"] * len(veiculos), dtype="category"),
+        "empresa_operadora": pd.Series(["10"] * len(veiculos), dtype="category"),
+        "numero_ordem_veiculo": pd.array(veiculos, dtype="Int32"),
+    }).to_parquet(caminho)
+
+
+def test_incremental_le_so_a_silver_nova(tmp_path, monkeypatch):
+    silver = tmp_path / "silver"
+    silver.mkdir()
+    monkeypatch.setattr(build_dimensions, "SILVER_DIR", silver)
+    monkeypatch.setattr(build_dimensions, "GOLD_DIR", tmp_path / "gold")
+    monkeypatch.setattr(build_dimensions, "TR_PATH", silver / "onibus_tempo_real.parquet")
+    monkeypatch.setattr(build_dimensions, "MANIFEST_DIR", tmp_path / "gold" / "_manifest")
+
+    _silver_mco(silver / "mco_consolidado_mco_2026_01.parquet", "2026-01-05", [1, 2])
+    pd.DataFrame({
+        "data_hora": pd.to_datetime(["2026-01-05 08:00"]),
+        "codigo_numero_linha": pd.array([4103], dtype="Int32"),
+        "numero_ordem_veiculo": pd.array([None], dtype="Int32"),
+    }).to_parquet(silver / "onibus_tempo_real.parquet")
+    build_dimensions.main(workers=1)
+    antes = pd.read_parquet(tmp_path / "gold" / "dim_veiculo.parquet")
+
+    lidos = []
+    ler_parquets = build_dimensions.ler_parquets
+    monkeypatch.setattr(
+        build_dimensions, "ler_parquets",
+        lambda arquivos, **kw: lidos.extend(arquivos) or ler_parquets(arquivos, **kw),
+    )
+    _silver_mco(silver / "mco_consolidado.parquet", "2026-02-02", [2, 3])
+    build_dimensions.main(workers=1)
+
+    # cada dimensão lê as suas colunas, mas só do arquivo novo
+    assert {a.name for a in lidos} == {"mco_consolidado.parquet"}
+    depois = pd.read_parquet(tmp_path / "gold" / "dim_veiculo.parquet")
+    assert depois["veiculo_id"].tolist() == ["1", "2", "3"]
+    assert depois["veiculo_key"].iloc[:2].tolist() == antes["veiculo_key"].tolist()
+    datas = pd.read_parquet(tmp_path / "gold" / "dim_data.parquet")["data_key"]
+    assert datas.tolist() == [20260105, 20260202]
+
+
+def test_cada_dimensao_tem_o_proprio_manifesto(tmp_path, monkeypatch):
+    silver = tmp_path / "silver"
+    silver.mkdir()
+    monkeypatch.setattr(build_dimensions, "SILVER_DIR", silver)
+    monkeypatch.setattr(build_dimensions, "GOLD_DIR", tmp_path / "gold")
+    monkeypatch.setattr(build_dimensions, "TR_PATH", silver / "onibus_tempo_real.parquet")
+    monkeypatch.setattr(build_dimensions, "MANIFEST_DIR", tmp_path / "gold" / "_manifest")
+    _silver_mco(silver / "mco_consolidado.parquet", "2026-01-05", [1, 2])
+
+    # só o MCO: concessionária e empresa não dependem do Tempo Real
+    assert build_dimensions.construir_dimensao("dim_empresa")
+    assert not build_dimensions.construir_dimensao("dim_empresa")
+    assert build_dimensions.construir_dimensao("dim_concessionaria")
+    assert sorted(p.name for p in (tmp_path / "gold").glob("*.parquet")) == [
+        "dim_concessionaria.parquet", "dim_empresa.parquet",
+    ]
@@ -0,0 +1,184 @@
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from src.transform.gold import build_facts
+from src.transform.gold.build_aggregates import agregados_de
+from src.transform.gold.build_facts import resolver_chave
+from src.transform.gold.partitions import escrever_particao
+from src.transform.gold.writer import escrever_parquet
+
+
+def _silver_tr(caminho, n=5_000):
+    rng = np.random.default_rng(0)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({
+        "codigo_evento": pd.array(rng.integers(100, 110, n), dtype="Int16"),
+        "data_hora": pd.Timestamp("2026-01-04")
+        + pd.to_timedelta(rng.integers(0, 4 * 86_400, n), unit="s"),
+        "latitude": rng.uniform(-20, -19.8, n).astype("float32"),
+        "longitude": rng.uniform(-44, -43.8, n).astype("float32"),
+        "numero_ordem_veiculo": pd.array(rng.integers(1, 30, n), dtype="Int32"),
+        "velocidade_instantanea": pd.array(rng.integers(0, 60, n), dtype="Int16"),
+        "codigo_numero_linha": pd.array(rng.choice([4103, 5201, 9999], n), dtype="Int32"),
+        "direcao_veiculo": pd.array(rng.integers(0, 360, n), dtype="Int16"),
+        "sentido_veiculo": pd.array(rng.integers(1, 3, n), dtype="Int8"),
+        "distancia_percorrida": pd.array(rng.integers(0, 5_000, n), dtype="Int32"),
+        "dt_ingestao": pd.Timestamp("2026-01-10"),
+    }).to_parquet(caminho, row_group_size=1_000)
+
+
+def _dims():
+    veiculos = [str(v) for v in range(1, 30)]
+    return {
+        "linha": pd.Series([11, 12], index=pd.Index(["4103", "5201"], name="linha")),
+        "data": pd.Index([20260104, 20260105, 20260106]),  # 07/01 fora da dimensão
+        "veiculo": pd.Series(
+            range(100, 129), index=pd.Index(veiculos, name="veiculo_id")
+        ),
+    }
+
+
+def test_fato_tr_em_lotes_igual_ao_fato_em_memoria(tmp_path, monkeypatch):
+    silver = tmp_path / "onibus_tempo_real.parquet"
+    _silver_tr(silver)
+    monkeypatch.setattr(build_facts, "TR_SILVER", silver)
+
+    fatos = {}
+    for modo, tamanho_lote in [("memoria", None), ("lotes", 700)]:
+        monkeypatch.setattr(build_facts, "FATO_TR", tmp_path / modo)
+        assert build_facts.build_fato_tr(_dims(), tamanho_lote) == [
+            20260104, 20260105, 20260106,
+        ]
+        fatos[modo] = {
+            dia: (tmp_path / modo / f"data_key={dia}" / "part-0.parquet").read_bytes()
+            for dia in (20260104, 20260105, 20260106)
+        }
+
+    # cada dia chega em vários lotes, ordenados e mesclados: o arquivo é o
+    # mesmo da ordenação do dia inteiro em memória
+    assert fatos["lotes"] == fatos["memoria"]
+    # linha fora da dimensão fica sem chave, nos dois modos
+    lotes = pd.read_parquet(tmp_path / "lotes" / "data_key=20260105")
+    assert lotes["linha_key"].isna().any()
+
+    # dias já carregados não são regravados
+    assert build_facts.build_fato_tr(_dims(), 700) == []
+
+
+def test_filtro_dias_novos_pula_row_groups_carregados(tmp_path):
+    dias = pd.date_range("2026-01-04", "2026-01-09", freq="D")
+    silver = pa.table({"viagem_data": pa.array(dias.repeat(3), type=pa.timestamp("s"))})
+    pq.write_table(silver, tmp_path / "mco.parquet", row_group_size=3)  # um dia por grupo
+
+    filtro = build_facts.filtro_dias_novos("viagem_data", [20260105, 20260106, 20260108])
+
+    lidos = ds.dataset(tmp_path / "mco.parquet").to_table(filter=filtro)
+    assert sorted(set(build_facts.calcular_data_key(lidos.to_pandas()["viagem_data"]))) == [
+        20260104, 20260107, 20260109,
+    ]
+    # os dias carregados são descartados pelas estatísticas, sem ler os grupos
+    fragmento = next(ds.dataset(tmp_path / "mco.parquet").get_fragments())
+    assert len(fragmento.split_by_row_group(filtro)) == 3
+    assert build_facts.filtro_dias_novos("viagem_data", []) is None
+
+
+CONSULTA = pd.Series(
+    [101, 102, 103],
+    index=pd.Index(["10356", "20411", "7"], name="veiculo_id"),
+    name="veiculo_key",
+)
+
+
+@pytest.mark.parametrize("dtype", ["float64", "Int64", "Int32", "category"])
+def test_resolver_chave_com_nulos(dtype):
+    valores = pd.Series([10356, np.nan, 7, 99999, 20411])
+    if dtype == "category":
+        valores = valores.astype("Int64").astype("string").astype("category")
+    else:
+        valores = valores.astype(dtype)
+    relatorio = {}
+
+    chaves = resolver_chave(valores, CONSULTA, "veiculo", relatorio)
+
+    assert chaves.dtype == "Int64"
+    assert chaves.tolist() == [101, pd.NA, 103, pd.NA, 102]
+    # nulo não conta como sem correspondência, valor ausente da dimensão sim
+    assert relatorio == {"veiculo": 1}
+
+
+def test_resolver_chave_float_fracionario_compara_como_texto():
+    valores = pd.Series([7.0, 7.5])
+    consulta = pd.Series([1, 2], index=pd.Index(["7.0", "7.5"]))
+
+    assert resolver_chave(valores, consulta, "x").tolist() == [1, 2]
+
+
+def test_backfill_grava_as_mesmas_particoes_da_execucao_normal(
+    pipeline_sintetica, tmp_path, monkeypatch
+):
+    # cópia da execução normal, que leu a silver da memória
+    shutil.copytree(pipeline_sintetica.parents[1], tmp_path / "data")
+    monkeypatch.chdir(tmp_path)
+    gold = Path("data/gold/mobilidade_bh")
+    datasets = [build_facts.FATO_MCO, build_facts.FATO_TR, *(
+        agregado for fato in (build_facts.FATO_MCO, build_facts.FATO_TR)
+        for agregado in agregados_de(fato)
+    )]
+
+    def particoes():
+        return {
+            arquivo: arquivo.read_bytes()
+            for dataset in datasets
+            for arquivo in sorted((gold / Path(dataset).name).glob("*/*.parquet"))
+        }
+
+    cargas = []
+    carregar = build_facts.carregar_dimensoes
+    monkeypatch.setattr(
+        build_facts, "carregar_dimensoes",
+        lambda *a: cargas.append(a) or carregar(*a),
+    )
+
+    antes = particoes()
+    build_facts.backfill(0, 99991231)
+
+    assert antes and particoes() == antes
+    # as dimensões são carregadas uma vez, e não uma por (fato, dia)
+    assert len(cargas) == 1
+
+
+def test_substituir_particao_nao_remove_a_pasta(tmp_path):
+    df = pd.DataFrame({"data_key": [20260105] * 2, "valor": [1, 2]})
+    pasta = escrever_particao(df, tmp_path, 20260105)
+    inode = pasta.stat().st_ino
+
+    escrever_particao(df.assign(valor=[3, 4]), tmp_path, 20260105)
+
+    # só o arquivo é trocado: a pasta do dia é a mesma e nada sobra ao lado
+    assert pasta.stat().st_ino == inode
+    assert os.listdir(tmp_path) == ["data_key=20260105"]
+    assert pd.read_parquet(pasta)["valor"].tolist() == [3, 4]
+
+
+def test_particao_nao_depende_das_categorias_nem_da_unidade(tmp_path):
+    base = pd.DataFrame({
+        "indicador": pd.Categorical(["B", "A", "B"], categories=["A", "B"]),
+        "instante": pd.to_datetime(["2026-01-05 08:00"] * 3).as_unit("ms"),
+    })
+    variante = base.assign(
+        indicador=pd.Categorical(["B", "A", "B"], categories=["C", "B", "A"]),
+        instante=base["instante"].dt.as_unit("s"),
+    )
+
+    escrever_parquet(base, tmp_path / "a.parquet")
+    escrever_parquet(variante, tmp_path / "b.parquet")
+
+    assert (tmp_path / "a.parquet").read_bytes() == (tmp_path / "b.parquet").read_bytes()
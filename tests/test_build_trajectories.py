@@ -0,0 +1,58 @@
+import pandas as pd
+
+from src.transform.gold import build_trajectories
+from src.transform.gold.partitions import escrever_particao, listar_particoes
+
+
+def _eventos(veiculos):
+    return pd.DataFrame({
+        "linha_key": pd.array([1] * len(veiculos), dtype="Int64"),
+        "veiculo_key": pd.array(veiculos, dtype="Int64"),
+        "data_hora": pd.date_range("2026-01-05 08:00", periods=len(veiculos), freq="30s"),
+        "latitude": -19.92,
+        "longitude": -43.94,
+        "velocidade_instantanea": 0,
+    })
+
+
+def test_dia_sem_veiculo_key_e_pulado_em_vez_de_sair_vazio(capsys):
+    eventos = _eventos([None] * 8 + [1, 1])
+    assert not build_trajectories.verificar_veiculos(eventos, 20260105)
+    assert "dia pulado" in capsys.readouterr().out
+    # o limite é configurável
+    assert build_trajectories.verificar_veiculos(eventos, 20260105, maximo_sem_veiculo=0.9)
+    # poucos eventos sem veículo só geram aviso
+    assert build_trajectories.verificar_veiculos(_eventos([None] + [1] * 9), 20260105)
+
+
+def test_dia_pulado_fica_pendente(tmp_path, monkeypatch):
+    fato_tr = tmp_path / "fato_tempo_real_evento"
+    destino = tmp_path / "fato_trajetoria_segmento"
+    monkeypatch.setattr(build_trajectories, "FATO_TR", fato_tr)
+    monkeypatch.setattr(build_trajectories, "FATO_TRAJETORIA", destino)
+    monkeypatch.setattr(build_trajectories, "MANIFESTO", tmp_path / "manifesto.json")
+    escrever_particao(_eventos([1] * 10).assign(data_key=20260105), fato_tr, 20260105)
+    escrever_particao(
+        _eventos([None] * 9 + [1]).assign(data_key=20260106), fato_tr, 20260106
+    )
+
+    assert build_trajectories.construir_trajetorias() == {20260105: 9}
+    assert listar_particoes(destino) == [20260105]
+    # o dia pulado não entra no manifesto e é tentado de novo na próxima vez
+    assert build_trajectories.construir_trajetorias() == {}
+    assert build_trajectories.construir_trajetorias(maximo_sem_veiculo=1.0) == {
+        20260106: 0,
+    }
+
+
+def test_segmentos_da_bronze_sintetica(pipeline_sintetica):
+    segmentos = pd.read_parquet(pipeline_sintetica / "fato_trajetoria_segmento")
+    eventos = pd.read_parquet(pipeline_sintetica / "fato_tempo_real_evento")
+
+    assert eventos["veiculo_key"].notna().mean() > 0.9
+    # um segmento por par de eventos consecutivos do mesmo veículo e dia
+    validos = eventos.dropna(subset=["veiculo_key", "data_hora", "latitude", "longitude"])
+    grupos = validos.groupby(["data_key", "veiculo_key"]).size()
+    assert len(segmentos) == (grupos - 1).sum() > 0
+    assert segmentos["veiculo_key"].notna().all()
+    assert (segmentos["data_hora_fim"] >= segmentos["data_hora_inicio"]).all()
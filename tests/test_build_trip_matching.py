@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from src.transform.gold.build_trip_matching import associar_eventos, estatisticas_viagem
+
+
+def test_associar_eventos_a_viagem_em_andamento():
+    viagens = pd.DataFrame({
+        "veiculo_key": [11, 11, 22],
+        "inicio_s": [100, 200, 100],
+        "fim_s": [500, 300, 200],
+    })
+    eventos = pd.DataFrame({
+        "veiculo_key": [11, 11, 11, 11, 11, 22, 22, 33],
+        "instante_s": [50, 150, 250, 400, 600, 150, 250, 150],
+    })
+
+    viagem = associar_eventos(viagens, eventos)
+
+    # antes da primeira saída e depois da última chegada ficam sem viagem; com
+    # viagens sobrepostas vale a última iniciada, enquanto ela cobre o evento
+    assert viagem.tolist() == [-1, 0, 1, 0, -1, 2, -1, -1]
+
+
+def test_associar_eventos_com_viagens_sobrepostas():
+    # A: 100-500, B: 150-450, C: 200-300 (mesmo veículo); D: 600-700 termina
+    # mais tarde, mas ainda não começou nos eventos antes das 600
+    viagens = pd.DataFrame({
+        "veiculo_key": [7, 7, 7, 7],
+        "inicio_s": [100, 150, 200, 600],
+        "fim_s": [500, 450, 300, 700],
+    })
+    eventos = pd.DataFrame({
+        "veiculo_key": [7, 7, 7, 7, 7, 7],
+        "instante_s": [120, 180, 250, 350, 480, 550],
+    })
+
+    viagem = associar_eventos(viagens, eventos)
+
+    # a última iniciada enquanto cobre o evento (B às 180, C às 250); depois
+    # dela, a já iniciada que termina mais tarde (A às 350, e não B, que
+    # também cobre); entre A e D, nenhuma
+    assert viagem.tolist() == [0, 1, 2, 0, 0, -1]
+
+
+def test_associar_eventos_sem_viagens():
+    eventos = pd.DataFrame({"veiculo_key": [1], "instante_s": [10]})
+    vazias = pd.DataFrame({"veiculo_key": [], "inicio_s": [], "fim_s": []})
+    assert associar_eventos(vazias, eventos).tolist() == [-1]
+
+
+def test_estatisticas_viagem():
+    eventos = pd.DataFrame({
+        "instante_s": [300, 100, 200],
+        "latitude": [-19.92, -19.90, -19.91],
+        "longitude": [-43.94, -43.94, -43.94],
+        "velocidade_instantanea": [30.0, 10.0, np.nan],
+    })
+
+    estatisticas = estatisticas_viagem(2, np.array([0, 0, 0]), eventos)
+
+    assert estatisticas["eventos_gps"].tolist() == [3, 0]
+    assert estatisticas["primeiro_evento_s"].tolist() == [100, pd.NA]
+    assert estatisticas["ultimo_evento_s"].tolist() == [300, pd.NA]
+    assert estatisticas["velocidade_media"].iloc[0] == 20
+    assert estatisticas["velocidade_maxima"].iloc[0] == 30
+    # 0,02 grau de latitude em dois trechos
+    assert abs(estatisticas["distancia_gps_m"].iloc[0] - 2224) < 5
+
+
+def test_viagens_da_bronze_sintetica(pipeline_sintetica):
+    viagens = pd.read_parquet(pipeline_sintetica / "fato_viagem_gps")
+    eventos = pd.read_parquet(pipeline_sintetica / "fato_evento_viagem")
+    mco = pd.read_parquet(pipeline_sintetica / "fato_mco_viagem")
+
+    assert len(viagens) == mco.dropna(subset=["veiculo_key", "hora_saida"]).shape[0] > 0
+    assert viagens["viagem_key"].is_unique
+    assert (viagens["eventos_gps"] > 0).any()
+    assert len(eventos) == viagens["eventos_gps"].sum()
+    assert eventos["viagem_key"].isin(viagens["viagem_key"]).all()
@@ -0,0 +1,151 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.transform.silver import clean_data
+
+MCO_CABECALHO = "VIAGEM;LINHA;SUBLINHA;PC;CONCESSIONARIA;SAIDA;VEICULO;CHEGADA;TOTAL USUARIOS;"
+
+
+def _gravar_bronze(nome, linhas):
+    pasta = Path(clean_data.bronze_path)
+    pasta.mkdir(parents=True, exist_ok=True)
+    (pasta / nome).write_text("\n".join(linhas) + "\n")
+    return pasta / nome
+
+
+def _ler_silver(nome, **opcoes):
+    shutil.rmtree(clean_data.silver_path, ignore_errors=True)
+    clean_data.run_silver(**opcoes)
+    return pd.read_parquet(Path(clean_data.silver_path) / nome).drop(columns="dt_ingestao")
+
+
+def test_detectar_formato_pelo_inicio_do_arquivo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    viagem = "05/01/2026;4103;1;1;801;05:30;10356;06:10;12;"
+    mco = _gravar_bronze("mco.csv", [MCO_CABECALHO, *[viagem] * 100])
+    tr = _gravar_bronze("tr.csv", ["EV,HR,LT,LG,NV", "105,20260105083000,-19.9,-43.9,10356"])
+
+    # amostra menor que o arquivo: a última linha, cortada, é descartada
+    sep, colunas = clean_data.detectar_formato(mco, tamanho_amostra=200)
+    assert sep == ";"
+    assert colunas[:3] == ["viagem", "linha", "sublinha"]
+    assert clean_data.identificar_dataset(colunas) == "mco"
+
+    sep, colunas = clean_data.detectar_formato(tr)
+    assert sep == ","
+    assert clean_data.identificar_dataset(colunas) == "tempo_real"
+
+
+def test_streaming_grava_o_mesmo_que_o_modo_em_memoria(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    viagens = [
+        "05/01/2026;4103;1;1;801;05:30;10356;06:10;12;",
+        "05/01/2026;4103;1;1;801;05:45;10357;06:20;8;",
+        "06/01/2026;5201;2;1;802;07:00;20411;07:40;30;",
+    ]
+    # com blocos de 2 linhas, as duplicatas caem em blocos diferentes
+    _gravar_bronze("mco.csv", [MCO_CABECALHO, *viagens, viagens[0], viagens[2], viagens[1]])
+
+    memoria = _ler_silver("mco.parquet")
+    blocos = _ler_silver("mco.parquet", streaming=True, chunksize=2)
+
+    assert len(memoria) == 3
+    assert not memoria.columns.str.startswith("unnamed").any()
+    pd.testing.assert_frame_equal(memoria, blocos)
+
+
+def test_parse_timestamp_numerico_caminho_rapido_e_lento():
+    serie = pd.Series(
+        [20260201010644, 20260201010644.0, "20260229235959", " 20260201010644",
+         "2026-02-01 01:06:44", "abc", None, 20260231120000],
+        dtype=object,
+    )
+
+    datas, n_lento = clean_data.parse_timestamp_numerico(serie)
+
+    esperado = pd.Timestamp("2026-02-01 01:06:44")
+    assert datas.tolist()[:2] == [esperado, esperado]
+    # 2026 não é bissexto e fevereiro não tem 31: inválidos viram NaT
+    assert datas.isna().tolist() == [False, False, True, False, True, True, True, True]
+    assert datas.iloc[3] == esperado
+    # só as linhas preenchidas que falharam no caminho numérico vão ao lento
+    assert n_lento == 4
+
+
+def test_horario_para_segundos_caminho_rapido_e_lento():
+    serie = pd.Series(["05:30", "23:59", "5:45", "24:00", "", None, "12:3"])
+
+    segundos, n_lento = clean_data.horario_para_segundos(serie)
+
+    assert segundos.dtype == "Int32"
+    assert segundos.tolist()[:3] == [5 * 3600 + 30 * 60, 23 * 3600 + 59 * 60, 5 * 3600 + 45 * 60]
+    assert segundos.isna().tolist()[3:6] == [True, True, True]
+    # o parsing por string aceita minuto com um dígito, como antes
+    assert segundos.iloc[6] == 12 * 3600 + 3 * 60
+    assert n_lento == 4
+
+
+def test_inteiros_com_nulos_voltam_como_inteiros(tmp_path):
+    df = clean_data.aplicar_schema(pd.DataFrame({
+        "numero_ordem_veiculo": [10356.0, None, 20411.0],
+        "linha_numero": [4103.0, None, 5201.0],
+        "extra": [1.5, 2.5, None],
+    }), clean_data.SCHEMA_MCO)
+
+    pq.write_table(clean_data.para_tabela_arrow(df, "mco"), tmp_path / "mco.parquet")
+    lido = pd.read_parquet(tmp_path / "mco.parquet")
+
+    assert str(lido["numero_ordem_veiculo"].dtype) == "Int32"
+    assert lido["numero_ordem_veiculo"].tolist()[::2] == [10356, 20411]
+    assert lido["numero_ordem_veiculo"].isna().tolist() == [False, True, False]
+    assert lido["linha_numero"].dropna().tolist() == ["4103", "5201"]
+    assert lido["extra"].dtype == "float64"
+
+
+def test_inteiros_fracionarios_ou_fora_da_faixa_viram_nulos():
+    serie = pd.Series([12.0, 12.5, 70000, -1, "abc", None], name="x")
+    convertida = clean_data._converter_coluna(serie, clean_data.pa.int16())
+
+    assert str(convertida.dtype) == "Int16"
+    assert convertida.isna().tolist() == [False, True, True, False, True, True]
+    assert convertida.dropna().tolist() == [12, -1]
+
+
+def _processar(bronze, silver, monkeypatch, **opcoes):
+    monkeypatch.setattr(clean_data, "bronze_path", str(bronze))
+    monkeypatch.setattr(clean_data, "silver_path", str(silver))
+    silver.mkdir()
+    arquivo, _ = clean_data.processar_arquivo("mco.csv", **opcoes)
+    return pd.read_parquet(silver / arquivo).drop(columns="dt_ingestao")
+
+
+def test_streaming_igual_ao_modo_em_memoria(tmp_path, monkeypatch):
+    bronze = tmp_path / "bronze"
+    bronze.mkdir()
+    linhas = [
+        "05/01/2026;4103;1;1;801;05:30;10356;06:10;;10;20;;;;;;;;;;1;",
+        "05/01/2026;4103;1;1;801;5:45;;06:20;;10;20;;;;;;;;;;1;",
+        "05/01/2026;4103;1;1;801;05:30;10356;06:10;;10;20;;;;;;;;;;1;",
+        "06/01/2026;SC01A;2;1;802;07:00;20411;07:40;;10;20;;;;;;;;;;2;",
+        "05/01/2026;4103;1;1;801;05:30;10356;06:10;;10;20;;;;;;;;;;1;",
+    ]
+    cabecalho = (
+        "VIAGEM;LINHA;SUBLINHA;PC;CONCESSIONARIA;SAIDA;VEICULO;CHEGADA;JUSTIFICATIVA;"
+        "CATRACA SAIDA;CATRACA CHEGADA;OCORRENCIA;TIPO DIA;EXTENSAO;FALHA MECANICA;"
+        "EVENTO INSEGURO;INDICADOR FECHAMENTO;DATA FECHAMENTO;TOTAL USUARIOS;"
+        "EXTRA;EMPRESA OPERADORA;"
+    )
+    (bronze / "mco.csv").write_text("\n".join([cabecalho, *linhas]) + "\n")
+
+    memoria = _processar(bronze, tmp_path / "a", monkeypatch)
+    blocos = _processar(bronze, tmp_path / "b", monkeypatch, streaming=True, chunksize=2)
+
+    # colunas vazias no arquivo inteiro e a sem nome saem nos dois modos
+    assert "indicador_justificativa" not in memoria.columns
+    assert "catraca_saida" in memoria.columns
+    assert not memoria.columns.str.startswith("unnamed").any()
+    assert len(memoria) == 3
+    pd.testing.assert_frame_equal(memoria, blocos)
@@ -1,32 +1,30 @@
-import pandas as pd
-from pathlib import Path
+import pytest
 
-GOLD = Path("data/gold/mobilidade_bh")
+from src.quality.engine import avaliar_regras
 
-def test_dim_data_data_key_unica():
-    df = pd.read_parquet(GOLD / "dim_data.parquet")
-    assert df["data_key"].is_unique
 
-def test_dim_linha_sem_linha_nula():
-    df = pd.read_parquet(GOLD / "dim_linha.parquet")
-    assert df["linha"].notna().all()
+@pytest.fixture(scope="module")
+def resultados():
+    # todas as regras em uma única avaliação (metadados + uma varredura por tabela)
+    relatorio = avaliar_regras(relatorio=None)
+    return {r["nome"]: r for r in relatorio["regras"]}
 
-def test_fato_mco_tem_data_key():
-    df = pd.read_parquet(GOLD / "fato_mco_viagem.parquet")
-    assert df["data_key"].notna().all()
+def _assert_ok(resultados, nome):
+    resultado = resultados[nome]
+    assert resultado["status"] == "ok", resultado
 
-def test_fato_mco_linha_key_existe_na_dim_linha():
-    fato = pd.read_parquet(GOLD / "fato_mco_viagem.parquet")
-    dim = pd.read_parquet(GOLD / "dim_linha.parquet")
+def test_dim_data_data_key_unica(resultados):
+    _assert_ok(resultados, "dim_data_data_key_unico")
 
-    assert set(fato["linha_key"].dropna()).issubset(set(dim["linha_key"]))
+def test_dim_linha_sem_linha_nula(resultados):
+    _assert_ok(resultados, "dim_linha_linha_nao_nulo")
 
-def test_fato_tempo_real_lat_long_validas():
-   
-    df = pd.read_parquet(GOLD / "fato_tempo_real_evento.parquet")
+def test_fato_mco_tem_data_key(resultados):
+    _assert_ok(resultados, "fato_mco_viagem_data_key_nao_nulo")
 
-    if "latitude" in df.columns:
-        assert df["latitude"].dropna().between(-90, 90).all()
+def test_fato_mco_linha_key_existe_na_dim_linha(resultados):
+    _assert_ok(resultados, "fato_mco_viagem_linha_key_existe_em_dim_linha")
 
-    if "longitude" in df.columns:
-        assert df["longitude"].dropna().between(-180, 180).all()
+def test_fato_tempo_real_lat_long_validas(resultados):
+    _assert_ok(resultados, "fato_tempo_real_evento_latitude_intervalo")
+    _assert_ok(resultados, "fato_tempo_real_evento_longitude_intervalo")
@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import http.client
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.ingest.bronze import download_csv
+
+CONTEUDO = b"linha;veiculo\n" + b"".join(b"%d;%d\n" % (i, i * 7) for i in range(50_000))
+ANTIGO = b"linha;veiculo\n1;2\n"
+ETAG = '"v1"'
+CORTE = 300_000
+
+
+class PortalFalso(BaseHTTPRequestHandler):
+    """Servidor local que imita a API CKAN e o download de arquivos do portal."""
+
+    requisicoes = []
+    cortar = True
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, corpo):
+        dados = json.dumps(corpo).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        self.requisicoes.append((self.path, dict(self.headers)))
+        base = f"http://127.0.0.1:{self.server.server_port}"
+
+        if self.path.startswith("/api/3/action/package_search"):
+            self._json({"success": True, "result": {"results": [
+                {"name": "mco", "title": "Mapa de Controle Operacional (MCO) Consolidado"},
+                {"name": "tempo-real", "title": "Tempo Real Ônibus - Coordenada atualizada"},
+            ]}})
+        elif self.path.startswith("/api/3/action/package_show?id=mco"):
+            self._json({"success": True, "result": {"resources": [
+                {"name": "MCO-2026-01", "format": "CSV", "url": f"{base}/antigo.csv",
+                 "hash": hashlib.sha256(ANTIGO).hexdigest()},
+                {"name": "MCO-2026-02", "format": "CSV", "url": f"{base}/arquivo.csv"},
+            ]}})
+        elif self.path.startswith("/api/3/action/package_show?id=tempo-real"):
+            self._json({"success": True, "result": {"resources": [
+                {"name": "Dicionário", "format": "PDF", "url": f"{base}/dicionario.pdf"},
+                {"name": "ARQUIVO CSV", "format": "CSV", "url": f"{base}/arquivo.csv"},
+            ]}})
+        elif self.path == "/antigo.csv":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(ANTIGO)))
+            self.end_headers()
+            self.wfile.write(ANTIGO)
+        elif self.path == "/cortado.csv" and PortalFalso.cortar:
+            # primeira resposta: conexão cai no meio do corpo
+            PortalFalso.cortar = False
+            self.send_response(200)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", str(len(CONTEUDO)))
+            self.end_headers()
+            self.wfile.write(CONTEUDO[:CORTE])
+            self.close_connection = True
+        elif self.path in ("/arquivo.csv", "/cortado.csv"):
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            inicio = 0
+            intervalo = self.headers.get("Range")
+            if intervalo and self.headers.get("If-Range") == ETAG:
+                inicio = int(intervalo.split("=")[1].rstrip("-"))
+            self.send_response(206 if inicio else 200)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", str(len(CONTEUDO) - inicio))
+            self.end_headers()
+            self.wfile.write(CONTEUDO[inicio:])
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+
+@pytest.fixture
+def portal():
+    PortalFalso.requisicoes = []
+    PortalFalso.cortar = True
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), PortalFalso)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{servidor.server_port}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_baixar_via_ckan_resolve_recurso_mais_recente(portal, tmp_path):
+    baixado = download_csv.baixar_via_ckan(
+        "mco_consolidado.csv", f"{portal}/api/3/action", str(tmp_path)
+    )
+    assert baixado
+    assert gzip.decompress((tmp_path / "mco_consolidado.csv.gz").read_bytes()) == CONTEUDO
+    assert not (tmp_path / "mco_consolidado.csv.gz.part").exists()
+
+
+def test_baixar_arquivo_inalterado_nao_baixa_de_novo(portal, tmp_path):
+    destino = str(tmp_path / "arquivo.csv")
+    assert download_csv.baixar_arquivo(f"{portal}/arquivo.csv", destino)
+    assert not download_csv.baixar_arquivo(f"{portal}/arquivo.csv", destino)
+    assert PortalFalso.requisicoes[-1][1].get("If-None-Match") == ETAG
+
+
+def test_baixar_arquivo_retoma_download_parcial(portal, tmp_path):
+    destino = str(tmp_path / "arquivo.csv")
+    url = f"{portal}/arquivo.csv"
+    download_csv.baixar_arquivo(url, destino)
+
+    # simula um download interrompido na metade
+    (tmp_path / "arquivo.csv").unlink()
+    (tmp_path / "arquivo.csv.part").write_bytes(CONTEUDO[:1000])
+
+    assert download_csv.baixar_arquivo(url, destino)
+    assert (tmp_path / "arquivo.csv").read_bytes() == CONTEUDO
+    assert PortalFalso.requisicoes[-1][1].get("Range") == "bytes=1000-"
+
+
+def test_baixar_arquivo_comprimido_retoma_do_ultimo_trecho(portal, tmp_path):
+    destino = str(tmp_path / "cortado.csv.gz")
+    url = f"{portal}/cortado.csv"
+    opcoes = dict(tamanho_bloco=10_000, compressao="gz", tamanho_trecho=100_000)
+
+    with pytest.raises(http.client.IncompleteRead):
+        download_csv.baixar_arquivo(url, destino, **opcoes)
+    meta = json.loads((tmp_path / "cortado.csv.gz.meta.json").read_text())
+    assert meta["bytes_brutos"] == CORTE
+
+    assert download_csv.baixar_arquivo(url, destino, **opcoes)
+    assert PortalFalso.requisicoes[-1][1].get("Range") == f"bytes={CORTE}-"
+    assert gzip.decompress((tmp_path / "cortado.csv.gz").read_bytes()) == CONTEUDO
+    meta = json.loads((tmp_path / "cortado.csv.gz.meta.json").read_text())
+    assert meta["sha256_bruto"] == hashlib.sha256(CONTEUDO).hexdigest()
+
+
+def test_baixar_recursos_historico_mco_com_manifesto(portal, tmp_path):
+    planejados = download_csv.planejar_downloads("todos", f"{portal}/api/3/action")
+    assert sorted(planejados) == [
+        "mco_consolidado.csv", "mco_consolidado_mco_2026_01.csv", "onibus_tempo_real.csv"
+    ]
+
+    baixados, inalterados, erros = download_csv.baixar_recursos(
+        planejados, str(tmp_path), workers=3
+    )
+    assert not erros and len(baixados) == 3 and not inalterados
+    antigo = (tmp_path / "mco_consolidado_mco_2026_01.csv.gz").read_bytes()
+    assert gzip.decompress(antigo) == ANTIGO
+
+    manifesto = json.loads((tmp_path / "_manifest.json").read_text())["arquivos"]
+    registro = manifesto["mco_consolidado.csv.gz"]
+    assert registro["sha256_bruto"] == hashlib.sha256(CONTEUDO).hexdigest()
+    assert registro["arquivo"]["sha256"] == hashlib.sha256(
+        (tmp_path / "mco_consolidado.csv.gz").read_bytes()
+    ).hexdigest()
+
+    # segunda execução: arquivos com ETag não são baixados de novo
+    baixados, inalterados, erros = download_csv.baixar_recursos(
+        planejados, str(tmp_path), workers=3
+    )
+    assert not erros
+    assert inalterados == ["mco_consolidado.csv.gz", "onibus_tempo_real.csv.gz"]
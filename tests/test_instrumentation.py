@@ -0,0 +1,41 @@
+import json
+
+from src.transform import instrumentation
+from src.transform.instrumentation import (
+    configurar_perfis,
+    finalizar_execucao,
+    iniciar_execucao,
+    medir,
+    registrar,
+)
+
+
+def test_relatorio_soma_subetapas_repetidas(tmp_path):
+    configurar_perfis({"etapa": "tracemalloc"})
+    iniciar_execucao("teste", diretorio=tmp_path, escala="10k")
+    with medir("etapa"):
+        for _ in range(3):
+            with medir("leitura"):
+                registrar(linhas_saida=10)
+        with medir("escrita"):
+            registrar(linhas_entrada=30)
+    caminho = finalizar_execucao()
+    configurar_perfis({})
+
+    relatorio = json.loads(caminho.read_text(encoding="utf-8"))
+    assert relatorio["status"] == "ok"
+    assert relatorio["parametros"] == {"escala": "10k"}
+    (etapa,) = relatorio["etapas"]
+    assert "tracemalloc_pico_mb" in etapa
+    leitura, escrita = etapa["subetapas"]
+    assert (leitura["nome"], leitura["vezes"], leitura["linhas_saida"]) == ("leitura", 3, 30)
+    assert escrita["linhas_entrada"] == 30
+    assert etapa["segundos"] >= leitura["segundos"]
+
+
+def test_medir_fora_de_execucao_nao_guarda_nada():
+    with medir("solta") as registro:
+        registrar(linhas_saida=5)
+    assert registro == {"nome": "solta"}
+    assert instrumentation._execucao is None
+    assert finalizar_execucao() is None
@@ -0,0 +1,54 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.quality import engine
+from src.quality.rules import chave_estrangeira, taxa_nulos
+from src.transform.gold.partitions import ARQUIVO_PARTICAO, pasta_particao
+
+
+@pytest.fixture
+def gold(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "GOLD_DIR", tmp_path)
+    pq.write_table(pa.table({"veiculo_key": [1, 2, 3]}), tmp_path / "dim_veiculo.parquet")
+    return tmp_path
+
+
+def _gravar_fato(gold, dias, **opcoes):
+    for data_key, chaves in dias.items():
+        pasta = pasta_particao(gold / "fato", data_key)
+        pasta.mkdir(parents=True)
+        tabela = pa.table({"veiculo_key": pa.array(chaves, type=pa.int64())})
+        pq.write_table(tabela, pasta / ARQUIVO_PARTICAO, **opcoes)
+
+
+@pytest.mark.parametrize("estatisticas", [True, False])
+def test_chave_toda_nula_falha_na_taxa_de_nulos(gold, estatisticas):
+    _gravar_fato(
+        gold,
+        {20260105: [None] * 4, 20260106: [1, 2, None, None]},
+        write_statistics=estatisticas,
+    )
+    regras = [
+        chave_estrangeira("fato", "veiculo_key", "dim_veiculo"),
+        taxa_nulos("fato", "veiculo_key", 0.05),
+    ]
+
+    resultados = engine.avaliar_regras(regras, relatorio=None)["regras"]
+
+    # nulos não violam a chave estrangeira; a taxa de nulos pega
+    assert resultados[0]["status"] == "ok"
+    assert resultados[1]["status"] == "falha"
+    assert resultados[1]["violacoes"] == 6
+    assert resultados[1]["exemplos"] == [0.75]
+    assert resultados[1]["fonte"] == ("metadados" if estatisticas else "varredura")
+
+
+def test_poucos_nulos_dentro_da_taxa(gold):
+    _gravar_fato(gold, {20260105: [1, 2, 3] * 10 + [None]})
+    regra = taxa_nulos("fato", "veiculo_key", 0.05)
+
+    resultado = engine.avaliar_regras([regra], relatorio=None)["regras"][0]
+
+    assert resultado["status"] == "ok"
+    assert resultado["violacoes"] == 0
@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+import run_pipeline
+from run_pipeline import executar_etapas, selecionar_etapas
+
+
+def test_selecionar_etapas():
+    assert selecionar_etapas(a_partir_de="fatos_tr") == ["fatos_tr", "trajetorias", "viagens"]
+    assert selecionar_etapas(datasets=["mco"]) == [
+        "bronze", "silver", "dim_data", "dim_linha", "dim_concessionaria",
+        "dim_empresa", "dim_veiculo", "fatos_mco", "viagens",
+    ]
+    # o Tempo Real não precisa das dimensões que só vêm do MCO
+    assert "dim_empresa" not in selecionar_etapas(datasets=["tempo_real"])
+    assert selecionar_etapas(["fatos_mco"], a_partir_de="silver") == ["fatos_mco"]
+    with pytest.raises(ValueError):
+        selecionar_etapas(["ouro"])
+
+
+@pytest.fixture
+def grafo(tmp_path, monkeypatch):
+    """Grafo de teste: a -> (b, c) -> d, com saídas em tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    rodadas = []
+    barreira = threading.Barrier(2, timeout=5)
+
+    def etapa(nome, falha=False, paralela=False):
+        def executar(opcoes):
+            # como as etapas reais: nada a fazer se a saída já existe
+            if (tmp_path / f"{nome}.out").exists() and not opcoes["forcar"]:
+                return False
+            if paralela:
+                barreira.wait()  # b e c precisam estar rodando ao mesmo tempo
+            rodadas.append(nome)
+            if falha:
+                raise ValueError(nome)
+            (tmp_path / f"{nome}.out").write_text(nome)
+            return True
+        return executar
+
+    def definir(falha_em=None):
+        definicoes = {}
+        for nome, depende in [("a", []), ("b", ["a"]), ("c", ["a"]), ("d", ["b", "c"])]:
+            definicoes[nome] = {
+                "executar": etapa(nome, nome == falha_em, nome in "bc"),
+                "depende": depende,
+                "datasets": {"mco"},
+            }
+        monkeypatch.setattr(run_pipeline, "ETAPAS", definicoes)
+
+    return rodadas, definir
+
+
+def test_executar_etapas_paralelo_e_pula_inalteradas(grafo):
+    rodadas, definir = grafo
+    definir()
+    opcoes = {"forcar": False, "datasets": None}
+
+    resultados = executar_etapas(list("abcd"), opcoes)
+    assert resultados == dict.fromkeys("abcd", "ok")
+    assert rodadas[0] == "a" and rodadas[-1] == "d"
+
+    rodadas.clear()
+    assert executar_etapas(list("abcd"), opcoes) == dict.fromkeys("abcd", "pulada")
+    assert rodadas == []
+
+
+def test_falha_bloqueia_so_os_dependentes(grafo):
+    rodadas, definir = grafo
+    definir(falha_em="b")
+
+    with pytest.raises(RuntimeError, match="b"):
+        executar_etapas(list("abcd"), {"forcar": False, "datasets": None})
+    assert sorted(rodadas) == ["a", "b", "c"]
+
+
+
+def test_workers_chegam_as_etapas_por_dia(monkeypatch):
+    from src.transform.gold import build_trajectories, build_trip_matching
+
+    recebidos = []
+    for modulo in (build_trajectories, build_trip_matching):
+        monkeypatch.setattr(modulo, "main", lambda workers=1: recebidos.append(workers))
+    opcoes = {"forcar": False, "datasets": None, "workers": 3}
+
+    run_pipeline.ETAPAS["trajetorias"]["executar"](opcoes)
+    run_pipeline.ETAPAS["viagens"]["executar"](opcoes)
+    assert recebidos == [3, 3]
+
+
+def test_etapa_derivada_refaz_so_os_dias_alterados(tmp_path):
+    from src.transform.manifest import chaves_alteradas, registrar_chaves
+
+    fontes = {}
+    for dia in (1, 2):
+        (tmp_path / f"{dia}.parquet").write_text(str(dia))
+        fontes[dia] = [tmp_path / f"{dia}.parquet"]
+
+    assert chaves_alteradas({}, fontes, "v1") == [1, 2]
+    manifesto = registrar_chaves({}, fontes, "v1")
+    assert chaves_alteradas(manifesto, fontes, "v1") == []
+
+    (tmp_path / "2.parquet").write_text("backfill")
+    assert chaves_alteradas(manifesto, fontes, "v1") == [2]
+    assert chaves_alteradas(manifesto, fontes, "v2") == [1, 2]
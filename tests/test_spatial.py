@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.transform.gold import spatial, writer
+from src.transform.gold.partitions import escrever_particao, escrever_particoes
+from src.transform.gold.spatial import (
+    PASTA_INDICE,
+    atualizar_indice_espacial,
+    celula_espacial,
+    consultar_bbox,
+    intervalos_bbox,
+)
+
+# Caixa aproximada de Belo Horizonte
+BH = (-20.06, -19.77, -44.07, -43.85)
+CENTRO = (-19.93, -19.91, -43.95, -43.93)
+
+
+def eventos_sinteticos(linhas: int = 200_000) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    # cada linha de ônibus roda em uma faixa da cidade
+    linha_key = rng.integers(0, 40, linhas)
+    faixa = (BH[1] - BH[0]) / 40
+    df = pd.DataFrame({
+        "data_key": rng.choice([20260201, 20260202], linhas),
+        "linha_key": linha_key,
+        "latitude": (BH[0] + (linha_key + rng.uniform(0, 1, linhas)) * faixa).astype("float32"),
+        "longitude": rng.uniform(BH[2], BH[3], linhas).astype("float32"),
+        "velocidade_instantanea": rng.integers(0, 80, linhas).astype("int16"),
+    })
+    df["celula_espacial"] = celula_espacial(df["latitude"], df["longitude"])
+    return df
+
+
+def test_celula_espacial_nula_sem_coordenada():
+    lat = pd.Series([-19.92, np.nan, 95.0])
+    lon = pd.Series([-43.94, -43.94, -43.94])
+    celulas = celula_espacial(lat, lon)
+    assert celulas.notna().tolist() == [True, False, False]
+
+
+def test_intervalos_bbox_cobrem_celulas_da_caixa():
+    df = eventos_sinteticos(20_000)
+    dentro = df[
+        df["latitude"].between(CENTRO[0], CENTRO[1])
+        & df["longitude"].between(CENTRO[2], CENTRO[3])
+    ]
+    intervalos = intervalos_bbox(*CENTRO, max_intervalos=4)
+    assert len(intervalos) <= 4
+    assert all(
+        any(a <= c <= b for a, b in intervalos) for c in dentro["celula_espacial"]
+    )
+
+
+def test_consultar_bbox_igual_a_varredura(tmp_path, monkeypatch):
+    monkeypatch.setitem(writer.CONFIG_GOLD, "row_group_size", 5_000)
+    df = eventos_sinteticos()
+    fato = tmp_path / "fato_tempo_real_evento"
+    escrever_particoes(df, fato)
+    esperado = df[
+        df["latitude"].between(CENTRO[0], CENTRO[1])
+        & df["longitude"].between(CENTRO[2], CENTRO[3])
+    ]
+
+    # cada dia fica ordenado por linha, não por célula
+    arquivo = fato / "data_key=20260201" / "part-0.parquet"
+    assert pd.read_parquet(arquivo)["linha_key"].is_monotonic_increasing
+
+    # sem índice, o dia inteiro passa pelo filtro; o resultado é o mesmo
+    sem_indice = consultar_bbox(fato, *CENTRO)
+    assert len(sem_indice) == len(esperado) > 0
+
+    assert atualizar_indice_espacial(fato) == [20260201, 20260202]
+    assert atualizar_indice_espacial(fato) == []
+
+    lidos = []
+    grupos_na_caixa = spatial._grupos_na_caixa
+    monkeypatch.setattr(
+        spatial, "_grupos_na_caixa",
+        lambda *a: lidos.append(grupos_na_caixa(*a)) or lidos[-1],
+    )
+    resultado = consultar_bbox(fato, *CENTRO)
+    assert resultado.equals(sem_indice)
+    assert resultado["velocidade_instantanea"].sum() == esperado["velocidade_instantanea"].sum()
+
+    # com o índice, só os row groups com células na caixa são lidos
+    grupos = pq.ParquetFile(arquivo).num_row_groups
+    assert len(lidos) == 2
+    assert all(0 < len(ids) < grupos / 2 for ids in lidos)
+
+
+def test_indice_espacial_acompanha_a_particao(tmp_path):
+    df = eventos_sinteticos(20_000)
+    fato = tmp_path / "fato_tempo_real_evento"
+    escrever_particoes(df, fato)
+    atualizar_indice_espacial(fato)
+    assert (fato / PASTA_INDICE / "20260201.parquet").exists()
+
+    # dia regravado: o índice antigo não vale mais até ser refeito
+    dia = df[df["data_key"] == 20260201].head(100)
+    escrever_particao(dia, fato, 20260201)
+    resultado = consultar_bbox(fato, *BH, dias=[20260201])
+    assert len(resultado) == 100
+
+    assert atualizar_indice_espacial(fato) == [20260201]
+    assert len(consultar_bbox(fato, *BH, dias=[20260201])) == 100
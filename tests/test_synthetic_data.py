@@ -0,0 +1,53 @@
+import gzip
+import time
+
+import pandas as pd
+
+from benchmarks import synthetic_data
+from src.transform.silver import clean_data
+
+
+def test_gerar_bronze_deterministico(tmp_path):
+    a = synthetic_data.gerar_bronze(str(tmp_path / "a"), 5_000, semente=7)
+    b = synthetic_data.gerar_bronze(str(tmp_path / "b"), 5_000, semente=7)
+    assert a == b == {"mco_consolidado.csv": 500, "onibus_tempo_real.csv": 5_000}
+    for arquivo in a:
+        assert (tmp_path / "a" / arquivo).read_bytes() == (tmp_path / "b" / arquivo).read_bytes()
+
+
+def test_gerar_bronze_gz_deterministico(tmp_path):
+    # destinos diferentes e gerações em instantes diferentes
+    a = synthetic_data.gerar_bronze(str(tmp_path / "a"), 5_000, semente=7, compressao="gz")
+    time.sleep(1.1)
+    b = synthetic_data.gerar_bronze(str(tmp_path / "outro"), 5_000, semente=7, compressao="gz")
+    assert a == b and all(arquivo.endswith(".csv.gz") for arquivo in a)
+    for arquivo in a:
+        bytes_a = (tmp_path / "a" / arquivo).read_bytes()
+        assert bytes_a == (tmp_path / "outro" / arquivo).read_bytes()
+        assert gzip.decompress(bytes_a).startswith(b"VIAGEM;" if "mco" in arquivo else b"EV;")
+
+
+def test_bronze_sintetica_passa_pela_silver(tmp_path, monkeypatch):
+    bronze = tmp_path / "bronze"
+    silver = tmp_path / "silver"
+    synthetic_data.gerar_bronze(str(bronze), 20_000, sep_tr=",", compressao="gz")
+    monkeypatch.setattr(clean_data, "bronze_path", str(bronze))
+    monkeypatch.setattr(clean_data, "silver_path", str(silver))
+    monkeypatch.setattr(clean_data, "manifest_path", str(silver / "_manifest.json"))
+
+    resultados = clean_data.run_silver()
+
+    # duplicatas exatas removidas, nulos e horários fora do padrão mantidos
+    _, linhas_tr = resultados["onibus_tempo_real.csv.gz"]
+    assert 19_000 < linhas_tr < 20_000
+    tr = pd.read_parquet(silver / "onibus_tempo_real.parquet")
+    assert tr["latitude"].isna().any()
+    assert tr["latitude"].dropna().between(-20.05, -19.78).all()
+    assert tr["data_hora"].notna().all()
+
+    mco = pd.read_parquet(silver / "mco_consolidado.parquet")
+    assert mco["hora_saida"].notna().all()
+    assert mco["numero_ordem_veiculo"].isna().any()
+    # inteiros com nulos continuam inteiros (não float64) depois da silver
+    assert str(mco["numero_ordem_veiculo"].dtype) == "Int32"
+    assert str(tr["numero_ordem_veiculo"].dtype) == "Int32"
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.transform.gold.writer import escrever_parquet, mesclar_ordenados, ordenar
+
+
+def test_ordenar_pelas_chaves_de_cluster():
+    fato = pd.DataFrame({
+        "linha_key": [2, 1, 1, None],
+        "veiculo_key": [1, 3, 2, 1],
+        "hora_saida": [10, 20, 30, 40],
+    })
+
+    ordenado = ordenar(fato, "fato_mco_viagem")
+
+    # data_key ausente (é a partição) é ignorada; nulos vão para o fim
+    assert ordenado["hora_saida"].tolist() == [30, 20, 10, 40]
+    assert ordenar(fato, "tabela_sem_cluster") is fato
+
+
+def test_escrever_parquet_com_row_groups_estatisticas_e_dicionario(tmp_path):
+    n = 150_000
+    rng = np.random.default_rng(0)
+    fato = pd.DataFrame({
+        "linha_key": rng.integers(0, 50, n),
+        "veiculo_key": rng.integers(0, 1000, n),
+        "hora_saida": rng.integers(0, 86_400, n),
+        "indicador": pd.Categorical(rng.choice(["N", "S"], n)),
+    })
+    caminho = tmp_path / "fato_mco_viagem.parquet"
+
+    escrever_parquet(fato, caminho)
+
+    meta = pq.read_metadata(caminho)
+    assert meta.num_row_groups == 3  # 64 mil linhas por grupo
+    primeira = meta.row_group(0).column(0)
+    assert primeira.compression == "ZSTD"
+    assert "RLE_DICTIONARY" in meta.row_group(0).column(3).encodings
+    # ordenado por linha_key: os grupos cobrem faixas que não se sobrepõem
+    faixas = [
+        (meta.row_group(i).column(0).statistics.min, meta.row_group(i).column(0).statistics.max)
+        for i in range(meta.num_row_groups)
+    ]
+    assert all(fim <= inicio for (_, fim), (inicio, _) in zip(faixas, faixas[1:]))
+
+    # as opções padrão podem ser sobrescritas por tabela
+    escrever_parquet(fato, caminho, compression="snappy", row_group_size=100_000)
+    meta = pq.read_metadata(caminho)
+    assert meta.num_row_groups == 2
+    assert meta.row_group(0).column(0).compression == "SNAPPY"
+
+
+def test_mesclar_ordenados_igual_a_ordenar_tudo(tmp_path):
+    rng = np.random.default_rng(1)
+    partes = []
+    for i in range(4):
+        n = 500 + 100 * i
+        partes.append(pd.DataFrame({
+            # muitos empates e nulos nas chaves; no disco, cada run só tem as
+            # categorias que usa
+            "linha_key": pd.array(rng.integers(0, 5, n), dtype="Int64"),
+            "veiculo_key": pd.array(
+                np.where(rng.random(n) < 0.1, None, rng.integers(0, 3, n)), dtype="Int64"
+            ),
+            "hora_saida": rng.integers(0, 4, n),
+            "indicador": pd.Categorical(
+                rng.choice(["N", "S", "X"][: i + 1], n), categories=["X", "S", "N"]
+            ),
+            "ordem": np.arange(n) + 10_000 * i,
+        }))
+    runs = []
+    for i, parte in enumerate(partes):
+        runs.append(tmp_path / f"run-{i}.parquet")
+        escrever_parquet(parte, runs[-1], "fato_mco_viagem")
+
+    esperado = tmp_path / "tudo.parquet"
+    escrever_parquet(pd.concat(partes, ignore_index=True), esperado, "fato_mco_viagem",
+                     row_group_size=700)
+    mesclado = tmp_path / "mesclado.parquet"
+    gravadas = mesclar_ordenados(runs, mesclado, "fato_mco_viagem", 200, row_group_size=700)
+
+    # mesmo arquivo, byte a byte, lendo 50 linhas de cada run por vez
+    assert gravadas == sum(map(len, partes))
+    assert mesclado.read_bytes() == esperado.read_bytes()